@@ -0,0 +1,134 @@
+"""
+admin_db_cache.py — Read-through кэш поверх AdminDB для Flask-панели.
+
+Раньше каждый HTTP-запрос admin_panel.py шёл в Supabase напрямую:
+get_settings / get_faq / get_users — на каждый показ страницы, а дашборд и
+JSON API считали одну и ту же статистику дважды. CachedAdminDB оборачивает
+AdminDB с тем же интерфейсом:
+
+    чтение (get_*)      — результат кэшируется на TTL метода (READ_TTLS),
+                          ключ — имя метода и аргументы;
+    запись (update_*, create_faq, ban_user, …) — вызывается как есть, после
+                          успеха сбрасываются зависимые чтения (INVALIDATES);
+    cached(name, fn)    — кэш производных значений (сводка дашборда);
+    cache_stats()       — попадания / промахи по методам для /api/cache/stats.
+
+Остальные атрибуты (db.supabase, log_admin_action, …) проксируются без
+изменений. ADMIN_DB_CACHE=0 отключает кэш (все вызовы идут насквозь).
+"""
+
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Callable
+
+from ttl_cache import TTLCache
+
+ADMIN_DB_CACHE = os.getenv("ADMIN_DB_CACHE", "1") == "1"
+
+# TTL чтений, сек: настройки и FAQ меняются только через панель (и сбрасываются
+# при записи), отчёты тяжёлые и не требуют точности до секунды
+READ_TTLS: dict[str, float] = {
+    "get_settings": 300,
+    "get_faq": 300,
+    "get_users": 30,
+    "get_user": 30,
+    "get_logs": 10,
+    "get_conversation_logs": 10,
+    "get_report_summary": 300,
+    "get_platform_report": 300,
+    "get_topics_report": 300,
+    "dashboard_stats": 60,
+}
+
+# Какие чтения устаревают после записи
+INVALIDATES: dict[str, tuple[str, ...]] = {
+    "update_settings": ("get_settings",),
+    "create_faq": ("get_faq",),
+    "update_faq": ("get_faq",),
+    "delete_faq": ("get_faq",),
+    "ban_user": ("get_users", "get_user", "dashboard_stats"),
+    "unban_user": ("get_users", "get_user", "dashboard_stats"),
+    "update_user_notes": ("get_users", "get_user"),
+    "log_admin_action": ("get_logs",),
+}
+
+
+class CachedAdminDB:
+    """Прокси AdminDB с кэшем чтений и сбросом по записям."""
+
+    def __init__(self, db, ttls: dict[str, float] | None = None,
+                 invalidates: dict[str, tuple[str, ...]] | None = None,
+                 maxsize: int = 512, enabled: bool = ADMIN_DB_CACHE):
+        self._db = db
+        self._ttls = dict(READ_TTLS if ttls is None else ttls)
+        self._invalidates = dict(INVALIDATES if invalidates is None else invalidates)
+        self._enabled = enabled
+        self._cache = TTLCache(ttl=max(self._ttls.values(), default=60), maxsize=maxsize)
+        self._stats: dict[str, dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._stats_lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._db, name)
+        if not callable(attr):
+            return attr
+        if name in self._ttls:
+            return lambda *args, **kwargs: self._read(name, attr, args, kwargs)
+        if name in self._invalidates:
+            return lambda *args, **kwargs: self._write(name, attr, args, kwargs)
+        return attr
+
+    # ─── Чтение / запись ──────────────────────────────────────────────────────
+
+    def _count(self, name: str, outcome: str) -> None:
+        with self._stats_lock:
+            self._stats[name][outcome] += 1
+
+    def cached(self, name: str, compute: Callable[[], Any], *key) -> Any:
+        """Значение compute() под ключом (name, *key) на TTL метода name."""
+        if not self._enabled:
+            return compute()
+        cache_key = (name, *key)
+        missing = object()
+        value = self._cache.get(cache_key, missing)
+        if value is missing:
+            self._count(name, "misses")
+            value = compute()
+            self._cache.set(cache_key, value, ttl=self._ttls.get(name))
+        else:
+            self._count(name, "hits")
+        return value
+
+    def _read(self, name: str, method, args: tuple, kwargs: dict):
+        try:
+            key = (args, tuple(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:
+            # Нехэшируемые аргументы (dict/list) — без кэша
+            return method(*args, **kwargs)
+        return self.cached(name, lambda: method(*args, **kwargs), key)
+
+    def _write(self, name: str, method, args: tuple, kwargs: dict):
+        result = method(*args, **kwargs)
+        self.invalidate(*self._invalidates[name])
+        return result
+
+    def invalidate(self, *names: str) -> int:
+        """Сбрасывает кэш указанных чтений (без аргументов — весь кэш)."""
+        if not names:
+            return self._cache.invalidate()
+        return self._cache.invalidate(lambda key: key[0] in names)
+
+    def cache_stats(self) -> dict:
+        with self._stats_lock:
+            methods = {name: dict(counts) for name, counts in self._stats.items()}
+        hits = sum(m["hits"] for m in methods.values())
+        misses = sum(m["misses"] for m in methods.values())
+        return {
+            "enabled": self._enabled,
+            "entries": len(self._cache),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "methods": methods,
+        }
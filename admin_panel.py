@@ -3,18 +3,30 @@ Admin Panel для управления Goszakup Bot
 Веб-интерфейс для администраторов с контролем всех функций бота
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, g, render_template, send_from_directory, stream_with_context, request, jsonify, session, redirect, url_for
 from flask_cors import CORS
 from datetime import datetime, timedelta
 from functools import wraps
+import hmac
 import os
 import json
 import logging
+import time
 from dotenv import load_dotenv
 
 # Импорты из проекта
 from admin_db import AdminDB
+from admin_db_cache import CachedAdminDB
 from admin_config import ADMIN_CONFIG, ADMIN_USERS
+import admin_views
+import export_stream
+from http_cache import CachedBody, build_response
+from keyset_pagination import InvalidCursor, keyset_page
+from live_feed import Broadcaster, FeedPoller
+from llm_usage import fetch_report
+from metrics import CONTENT_TYPE, REGISTRY, callback, histogram
+from stats_rollup import fetch_daily, fetch_summary
+from ttl_cache import TTLCache
 
 load_dotenv()
 
@@ -26,8 +38,56 @@ CORS(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Инициализируем БД для админ панели
-db = AdminDB()
+# Инициализируем БД для админ панели (чтения кэшируются, см. admin_db_cache.py)
+db = CachedAdminDB(AdminDB())
+
+# Счётчики сообщений для пагинации /api/messages
+MESSAGES_COUNT_TTL = float(os.getenv("MESSAGES_COUNT_TTL", "30"))
+MESSAGES_MAX_LIMIT = 500
+message_counts = TTLCache(ttl=MESSAGES_COUNT_TTL)
+
+# Агрегированный API для admin/index.html: токен (Bearer) и кэш ответов
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+ADMIN_API_CACHE_TTL = float(os.getenv("ADMIN_API_CACHE_TTL", "15"))
+admin_api_cache = TTLCache(ttl=ADMIN_API_CACHE_TTL, maxsize=256)
+
+# Живая лента (SSE): один опрос Supabase на все открытые страницы
+live_feed = Broadcaster()
+live_poller = FeedPoller(db.supabase, live_feed)
+
+# Метрики для GET /metrics (metrics.py): задержка запросов по маршруту, кэши, SSE
+HTTP_SECONDS = histogram("admin_http_request_duration_seconds",
+                         "Admin panel request latency by endpoint.", ["endpoint", "method", "status"])
+
+
+def _cache_lookups() -> dict:
+    db_stats = db.cache_stats()
+    values = {("admin_db", "hit"): db_stats["hits"], ("admin_db", "miss"): db_stats["misses"]}
+    for name, cache in (("admin_api", admin_api_cache), ("message_counts", message_counts)):
+        values[(name, "hit")], values[(name, "miss")] = cache.hits, cache.misses
+    return values
+
+
+callback("cache_lookups_total", "Cache lookups by cache and result.", "counter",
+         _cache_lookups, labels=["cache", "result"])
+callback("live_feed_subscribers", "Open SSE connections of the live feed.", "gauge",
+         lambda: live_feed.subscribers)
+callback("live_feed_dropped_total", "SSE clients dropped for falling behind.", "counter",
+         lambda: live_feed.dropped)
+
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _observe_request(response):
+    started = g.get("request_started")
+    if started is not None:
+        HTTP_SECONDS.labels(endpoint=request.endpoint or "unknown", method=request.method,
+                            status=response.status_code).observe(time.perf_counter() - started)
+    return response
 
 # ─── Decorators ───────────────────────────────────────────────────────────
 
@@ -51,6 +111,39 @@ def admin_required(f):
     return decorated_function
 
 
+def _api_authorized(allow_query_token: bool = False) -> bool:
+    if "admin_id" in session:
+        return True
+    token = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not token and allow_query_token:
+        token = request.args.get("token", "")
+    return bool(ADMIN_API_TOKEN and token and hmac.compare_digest(token, ADMIN_API_TOKEN))
+
+
+def api_token_required(f):
+    """Сессия панели или заголовок Authorization: Bearer ADMIN_API_TOKEN (admin/index.html)."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not _api_authorized():
+            return jsonify({"error": "Не авторизован"}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def stream_token_required(f):
+    """
+    Как api_token_required, но токен можно передать и в ?token= — только для
+    SSE: EventSource не умеет передавать заголовки. Остальные маршруты токен в
+    URL не принимают (он попадал бы в логи прокси и историю браузера).
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not _api_authorized(allow_query_token=True):
+            return jsonify({"error": "Не авторизован"}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
 # ─── Authentication Routes ────────────────────────────────────────────────
 
 @app.route("/")
@@ -101,11 +194,17 @@ def logout():
 
 # ─── Dashboard Routes ─────────────────────────────────────────────────────
 
+@app.route("/panel")
+def admin_page():
+    """admin/index.html с того же сервера: API_URL пустой, CORS не нужен"""
+    return send_from_directory(os.path.join(app.root_path, "admin"), "index.html")
+
+
 @app.route("/dashboard")
 @login_required
 def dashboard():
     """Главная панель администратора"""
-    stats = db.get_dashboard_stats()
+    stats = get_dashboard_stats()
     return render_template("dashboard.html", stats=stats, admin_name=session.get("admin_name"))
 
 
@@ -113,10 +212,45 @@ def dashboard():
 @admin_required
 def api_stats():
     """API для получения статистики"""
-    stats = db.get_dashboard_stats()
+    stats = get_dashboard_stats()
     return jsonify(stats)
 
 
+def get_dashboard_stats() -> dict:
+    """
+    Сводка для дашборда: одна строка stats_summary + stats_daily за 14 дней
+    (stats_rollup.py) вместо COUNT(*) по users/conversations/feedback.
+    Таблица пересчитывается раз в 5 минут — кэш на минуту ничего не теряет;
+    бан/разбан сбрасывает его (INVALIDATES в admin_db_cache.py).
+    """
+    def compute() -> dict:
+        stats = fetch_summary(db.supabase)
+        stats["daily"] = fetch_daily(db.supabase, days=14)
+        return stats
+
+    return db.cached("dashboard_stats", compute)
+
+
+@app.route("/api/cache/stats")
+@admin_required
+def api_cache_stats():
+    """API: Статистика кэшей панели (AdminDB, агрегированный API, счётчики)"""
+    return jsonify({
+        "admin_db": db.cache_stats(),
+        "admin_api": {"entries": len(admin_api_cache),
+                      "hits": admin_api_cache.hits, "misses": admin_api_cache.misses},
+        "message_counts": {"entries": len(message_counts),
+                           "hits": message_counts.hits, "misses": message_counts.misses},
+    })
+
+
+@app.route("/metrics")
+@api_token_required
+def metrics_endpoint():
+    """Метрики процесса панели в текстовом формате Prometheus"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
 # ─── Users Management Routes ──────────────────────────────────────────────
 
 @app.route("/users")
@@ -236,44 +370,214 @@ def api_conversations_logs():
 @app.route("/api/messages")
 @admin_required
 def api_messages():
-    """API: Получить все сообщения (переписку)"""
+    """
+    API: Переписка, курсорная пагинация.
+
+    ?cursor=...&direction=next|prev — продолжение от курсора (keyset,
+    стоимость страницы не зависит от её номера); без курсора — новейшие.
+    page только отражается в ответе для подписи «Страница N из M».
+    total — кэшированный счётчик (MESSAGES_COUNT_TTL), без фильтра — оценка
+    планировщика (total_approximate=true).
+    """
     page = request.args.get("page", 1, type=int)
-    limit = request.args.get("limit", 100, type=int)
+    limit = min(max(request.args.get("limit", 100, type=int), 1), MESSAGES_MAX_LIMIT)
     user_id = request.args.get("user_id", None, type=int)
+    cursor = request.args.get("cursor") or None
+    direction = request.args.get("direction", "next")
 
     try:
         if not db.supabase:
             return jsonify({"error": "Supabase not connected"}), 500
 
-        query = db.supabase.table("conversations")
+        query = db.supabase.table("conversations").select(admin_views.CONVERSATION_FIELDS)
 
         # Фильтр по пользователю если указан
         if user_id:
             query = query.eq("chat_id", user_id)
 
-        # Сортировка по дате (новые сверху)
-        query = query.order("created_at", desc=True)
-
-        # Пагинация
-        start = (page - 1) * limit
-        result = query.range(start, start + limit - 1).execute()
-
-        # Получить общее количество
-        count_result = db.supabase.table("conversations").select("id", count="exact").execute()
-        total = count_result.count if hasattr(count_result, 'count') else 0
+        # Новые сверху: (created_at DESC, id DESC), индекс — supabase_conversations_keyset.sql
+        result = keyset_page(query, limit, cursor, direction)
+        total = count_conversations(user_id)
 
         return jsonify({
-            "messages": result.data,
+            "messages": result["rows"],
             "total": total,
+            "total_approximate": not user_id,
             "page": page,
             "limit": limit,
-            "total_pages": (total + limit - 1) // limit
+            "total_pages": max((total + limit - 1) // limit, 1),
+            "next_cursor": result["next_cursor"],
+            "prev_cursor": result["prev_cursor"],
+            "has_more": result["has_more"],
         })
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting messages: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/messages/search")
+@admin_required
+def api_messages_search():
+    """
+    API: Полнотекстовый поиск по переписке (вопросы и ответы).
+    ?q=демпинг&user_id=...&cursor=... — результаты по рангу с подсветкой <mark>.
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Пустой запрос"}), 400
+    limit = min(max(request.args.get("limit", admin_views.SEARCH_LIMIT, type=int), 1), 100)
+    try:
+        return jsonify(admin_views.search_messages(
+            db.supabase, query,
+            chat_id=request.args.get("user_id", None, type=int),
+            cursor=request.args.get("cursor") or None,
+            limit=limit,
+        ))
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error searching messages: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+def count_conversations(user_id: int | None = None) -> int:
+    """
+    Число сообщений (всего или одного пользователя) с кэшем на MESSAGES_COUNT_TTL сек.
+
+    Для одного пользователя — точный COUNT по индексу chat_id; для всей
+    таблицы — оценка планировщика (count="estimated"): точный COUNT(*)
+    по растущей conversations — полный проход, а для подписи
+    «Страница N из M» хватает приблизительного числа.
+    """
+    def compute() -> int:
+        query = db.supabase.table("conversations").select(
+            "id", count="exact" if user_id else "estimated"
+        )
+        if user_id:
+            query = query.eq("chat_id", user_id)
+        # Строки не нужны — только Content-Range с числом
+        return query.limit(1).execute().count or 0
+
+    return message_counts.get_or_set(("conversations", user_id), compute)
+
+
+# ─── Aggregated Admin API (admin/index.html) ──────────────────────────────
+# Одна вкладка — один запрос; ответ кэшируется на ADMIN_API_CACHE_TTL сек,
+# отдаётся со сжатием и ETag (повторный показ вкладки — 304 без тела).
+
+def cached_json(key: tuple, compute) -> Response:
+    """JSON из admin_api_cache (или compute()) с ETag/304 и gzip/br."""
+    cached = admin_api_cache.get_or_set(key, lambda: CachedBody.from_payload(compute()))
+    status, headers, body = build_response(
+        cached,
+        request.headers.get("If-None-Match"),
+        request.headers.get("Accept-Encoding"),
+    )
+    return Response(body, status=status, headers=headers)
+
+
+@app.route("/api/admin/overview")
+@api_token_required
+def api_admin_overview():
+    """API: Вкладка «Обзор» — сводка и последние сообщения"""
+    return cached_json(("overview",), lambda: admin_views.overview(db.supabase))
+
+
+@app.route("/api/admin/users")
+@api_token_required
+def api_admin_users():
+    """API: Вкладка «Пользователи» — страница с поиском на сервере"""
+    page = max(request.args.get("page", 0, type=int), 0)
+    search = request.args.get("q", "")
+    return cached_json(("users", page, search),
+                       lambda: admin_views.users(db.supabase, page, search))
+
+
+@app.route("/api/admin/users/<int:chat_id>/history")
+@api_token_required
+def api_admin_user_history(chat_id):
+    """API: История диалога пользователя"""
+    return cached_json(("history", chat_id), lambda: admin_views.user_history(db.supabase, chat_id))
+
+
+@app.route("/api/admin/conversations")
+@api_token_required
+def api_admin_conversations():
+    """API: Вкладка «Переписка»"""
+    page = max(request.args.get("page", 0, type=int), 0)
+    ktru_only = request.args.get("ktru") == "1"
+    search = request.args.get("q", "")
+    return cached_json(("conversations", page, ktru_only, search),
+                       lambda: admin_views.conversations(db.supabase, page, ktru_only, search))
+
+
+@app.route("/api/admin/feedback")
+@api_token_required
+def api_admin_feedback():
+    """API: Вкладка «Отзывы»"""
+    page = max(request.args.get("page", 0, type=int), 0)
+    rating = request.args.get("rating", "all")
+    return cached_json(("feedback", page, rating),
+                       lambda: admin_views.feedback(db.supabase, page, rating))
+
+
+@app.route("/api/admin/cost")
+@api_token_required
+def api_admin_cost():
+    """API: Токены и стоимость Claude по дням, чатам и секциям (llm_usage.py)"""
+    days = min(max(request.args.get("days", 7, type=int), 1), 90)
+    return cached_json(("cost", days), lambda: fetch_report(db.supabase, days))
+
+
+@app.route("/api/stream/conversations")
+@stream_token_required
+def api_stream_conversations():
+    """SSE: новые сообщения, отклонённые ответы и отзывы (live_feed.py)"""
+    live_poller.ensure_started()
+    last_event_id = request.headers.get("Last-Event-ID", type=int)
+    return Response(
+        stream_with_context(live_feed.stream(last_event_id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/export/<table>")
+@api_token_required
+def api_export(table):
+    """
+    API: Потоковая выгрузка conversations / feedback (export_stream.py).
+    ?format=ndjson|csv&gzip=1&since=YYYY-MM-DD&until=YYYY-MM-DD&chat_id=N
+    """
+    fmt = request.args.get("format", "ndjson")
+    gzip = request.args.get("gzip") == "1"
+    if table not in export_stream.EXPORT_COLUMNS or fmt not in export_stream.FORMATS:
+        return jsonify({"error": "Неизвестная таблица или формат"}), 400
+
+    filters = {
+        "since": request.args.get("since") or None,
+        "until": request.args.get("until") or None,
+        "chat_id": request.args.get("chat_id", None, type=int),
+    }
+    chunks = export_stream.export(db.supabase, table, fmt, gzip, **filters)
+    filename = f"{table}_{datetime.now():%Y%m%d_%H%M}.{fmt}" + (".gz" if gzip else "")
+    mimetype = "application/gzip" if gzip else (
+        "application/x-ndjson" if fmt == "ndjson" else "text/csv; charset=utf-8"
+    )
+    db.log_admin_action(
+        admin_id=session.get("admin_id", "api"),
+        action="EXPORT",
+        details=f"Export {table} ({fmt}) {filters}"
+    )
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 # ─── FAQ Management Routes ────────────────────────────────────────────────
 
 @app.route("/faq")
@@ -0,0 +1,135 @@
+"""
+admin_views.py — Данные вкладок admin/index.html одним ответом на вкладку.
+
+Раньше статическая страница ходила в Supabase напрямую из браузера
+(URL и anon-ключ в исходнике): обзор — 6 запросов, вкладка «Пользователи»
+загружала всю таблицу users и фильтровала её в JS. Теперь каждая вкладка —
+один запрос к admin_panel (/api/admin/*), а сервер собирает всё нужное
+здесь. Функции принимают клиент Supabase и возвращают JSON-совместимые
+словари; кэширование и ETag — в admin_panel.py / http_cache.py.
+"""
+
+import html
+
+from keyset_pagination import decode_cursor, encode_cursor
+from stats_rollup import fetch_summary
+
+PAGE_SIZE = 25
+RECENT_LIMIT = 15
+HISTORY_LIMIT = 100
+SEARCH_LIMIT = 20
+
+# Колонки переписки без служебной fts (supabase_conversations_search.sql)
+CONVERSATION_FIELDS = "id,chat_id,question,answer,chunks_used,ktru_found,source,created_at"
+# Вложенный select: имя пользователя к строке переписки (FK conversations.chat_id → users)
+CONVERSATION_COLUMNS = CONVERSATION_FIELDS + ", users(first_name, last_name, username)"
+
+
+def _ilike(value: str) -> str:
+    # Шаблон для or=(...): кавычки защищают запятые и скобки в строке поиска
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"*{escaped}*"'
+
+
+def _page(rows: list, total: int | None, page: int) -> dict:
+    total = total or 0
+    return {
+        "rows": rows,
+        "total": total,
+        "page": page,
+        "pages": (total + PAGE_SIZE - 1) // PAGE_SIZE,
+    }
+
+
+def overview(client) -> dict:
+    """Сводка (stats_summary) и последние сообщения."""
+    recent = (
+        client.table("conversations").select(CONVERSATION_COLUMNS)
+        .order("created_at", desc=True).limit(RECENT_LIMIT).execute().data
+        or []
+    )
+    return {"summary": fetch_summary(client), "recent": recent}
+
+
+def users(client, page: int = 0, search: str = "") -> dict:
+    """Страница пользователей по last_seen; поиск по имени, @username и chat_id."""
+    query = client.table("users").select("*", count="exact")
+    search = search.strip()
+    if search:
+        pattern = _ilike(search)
+        conditions = [f"first_name.ilike.{pattern}", f"last_name.ilike.{pattern}",
+                      f"username.ilike.{pattern}"]
+        if search.isdigit():
+            conditions.append(f"chat_id.eq.{search}")
+        query = query.or_(",".join(conditions))
+    result = (
+        query.order("last_seen", desc=True)
+        .range(page * PAGE_SIZE, (page + 1) * PAGE_SIZE - 1).execute()
+    )
+    return _page(result.data or [], result.count, page)
+
+
+def conversations(client, page: int = 0, ktru_only: bool = False, search: str = "") -> dict:
+    query = client.table("conversations").select(CONVERSATION_COLUMNS, count="exact")
+    if ktru_only:
+        query = query.eq("ktru_found", True)
+    if search.strip():
+        query = query.ilike("question", f"%{search.strip()}%")
+    result = (
+        query.order("created_at", desc=True)
+        .range(page * PAGE_SIZE, (page + 1) * PAGE_SIZE - 1).execute()
+    )
+    return _page(result.data or [], result.count, page)
+
+
+def feedback(client, page: int = 0, rating: str = "all") -> dict:
+    query = client.table("feedback").select("*", count="exact")
+    if rating in ("like", "dislike"):
+        query = query.eq("rating", rating)
+    result = (
+        query.order("created_at", desc=True)
+        .range(page * PAGE_SIZE, (page + 1) * PAGE_SIZE - 1).execute()
+    )
+    return _page(result.data or [], result.count, page)
+
+
+def user_history(client, chat_id: int) -> dict:
+    rows = (
+        client.table("conversations").select(CONVERSATION_FIELDS).eq("chat_id", chat_id)
+        .order("created_at").limit(HISTORY_LIMIT).execute().data
+        or []
+    )
+    return {"chat_id": chat_id, "rows": rows}
+
+
+# Границы подсветки ts_headline (StartSel/StopSel в supabase_conversations_search.sql)
+MARK_START, MARK_STOP = "\x02", "\x03"
+
+
+def _snippet(text: str | None) -> str:
+    # ts_headline не экранирует HTML: экранируем весь текст (и «<mark>» из самого
+    # сообщения), затем превращаем в теги только свои управляющие символы
+    escaped = html.escape(text or "")
+    return escaped.replace(MARK_START, "<mark>").replace(MARK_STOP, "</mark>")
+
+
+def search_messages(client, query: str, chat_id: int | None = None,
+                    cursor: str | None = None, limit: int = SEARCH_LIMIT) -> dict:
+    """
+    Полнотекстовый поиск по переписке (RPC search_conversations,
+    supabase_conversations_search.sql): по рангу, с подсвеченными
+    фрагментами; следующая страница — по next_cursor (ранг, id).
+    """
+    params = {"p_query": query, "p_chat_id": chat_id, "p_limit": limit + 1}
+    if cursor:
+        params["p_after_rank"], params["p_after_id"] = decode_cursor(cursor)
+    rows = client.rpc("search_conversations", params).execute().data or []
+    more = len(rows) > limit
+    rows = rows[:limit]
+    for row in rows:
+        row["question_snippet"] = _snippet(row.get("question_snippet"))
+        row["answer_snippet"] = _snippet(row.get("answer_snippet"))
+    return {
+        "results": rows,
+        "next_cursor": encode_cursor(rows[-1]["rank"], rows[-1]["id"]) if more else None,
+    }
@@ -0,0 +1,221 @@
+"""
+async_http.py — Минимальный HTTP/1.1 сервер на asyncio для встраивания в бота.
+
+Нужен для webhook-режима (POST от Telegram) и служебных эндпоинтов
+(/healthz, /readyz), чтобы не тянуть aiohttp/tornado ради пары маршрутов.
+Поддерживает keep-alive и Content-Length; chunked-тела запросов не принимает
+(Telegram их не использует).
+
+Пример:
+    async def hello(request: Request) -> Response:
+        return Response.text("ok")
+
+    server = HttpServer({("GET", "/hello"): hello}, host="0.0.0.0", port=8080)
+    await server.start()
+    ...
+    await server.stop()
+"""
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Awaitable, Callable
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Максимальный размер заголовков и тела запроса
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+# Сколько ждать следующий запрос на keep-alive соединении
+KEEPALIVE_TIMEOUT = 75.0
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: dict[str, list[str]]
+    headers: dict[str, str]          # имена в нижнем регистре
+    body: bytes = b""
+    remote: str = ""
+
+    def json(self):
+        return json.loads(self.body)
+
+
+@dataclass
+class Response:
+    status: int = 200
+    body: bytes = b""
+    content_type: str = "text/plain; charset=utf-8"
+    headers: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def text(cls, text: str, status: int = 200) -> "Response":
+        return cls(status, text.encode("utf-8"))
+
+    @classmethod
+    def json(cls, payload, status: int = 200) -> "Response":
+        return cls(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                   "application/json; charset=utf-8")
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str = ""):
+        super().__init__(message)
+        self.status = status
+
+
+class HttpServer:
+    """Маршрутизация по точному (метод, путь)."""
+
+    def __init__(self, routes: dict[tuple[str, str], Handler],
+                 host: str = "0.0.0.0", port: int = 8080,
+                 max_body: int = MAX_BODY_BYTES):
+        self.routes = dict(routes)
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self._server: asyncio.base_events.Server | None = None
+        self._connections: set[asyncio.Task] = set()
+
+    def add_route(self, method: str, path: str, handler: Handler) -> None:
+        self.routes[(method.upper(), path)] = handler
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES
+        )
+        if self.port == 0:
+            self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"[http] Слушаю {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        self._server = None
+
+    # ─── Обработка соединения ─────────────────────────────────────────────────
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        peer = writer.get_extra_info("peername")
+        remote = peer[0] if peer else ""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader, remote),
+                                                     KEEPALIVE_TIMEOUT)
+                except HttpError as e:
+                    await self._write(writer, Response.text(str(e) or HTTPStatus(e.status).phrase,
+                                                            e.status), keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                response = await self._dispatch(request)
+                await self._write(writer, response, keep_alive, head=request.method == "HEAD")
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader, remote: str) -> Request | None:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                return None  # клиент закрыл keep-alive соединение
+            raise
+        except asyncio.LimitOverrunError:
+            raise HttpError(431)
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "Bad request line")
+
+        headers: dict[str, str] = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise HttpError(400, "Bad header")
+            headers[name.strip().lower()] = value.strip()
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HttpError(411)
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HttpError(400, "Bad Content-Length")
+        if length < 0:
+            raise HttpError(400, "Bad Content-Length")
+        if length > self.max_body:
+            raise HttpError(413)
+        body = await reader.readexactly(length) if length else b""
+
+        url = urlsplit(target)
+        return Request(method.upper(), url.path or "/", parse_qs(url.query), headers, body, remote)
+
+    async def _dispatch(self, request: Request) -> Response:
+        method = "GET" if request.method == "HEAD" else request.method
+        handler = self.routes.get((method, request.path))
+        if handler is None:
+            allowed = [m for m, p in self.routes if p == request.path]
+            if allowed:
+                return Response(405, b"Method Not Allowed", headers={"Allow": ", ".join(allowed)})
+            return Response(404, b"Not Found")
+        try:
+            return await handler(request)
+        except HttpError as e:
+            return Response.text(str(e) or HTTPStatus(e.status).phrase, e.status)
+        except Exception:
+            logger.exception(f"[http] Ошибка обработчика {request.method} {request.path}")
+            return Response(500, b"Internal Server Error")
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, response: Response,
+                     keep_alive: bool, head: bool = False) -> None:
+        try:
+            reason = HTTPStatus(response.status).phrase
+        except ValueError:
+            reason = ""
+        headers = {
+            "Content-Type": response.content_type,
+            "Content-Length": str(len(response.body)),
+            "Connection": "keep-alive" if keep_alive else "close",
+            **response.headers,
+        }
+        head_bytes = f"HTTP/1.1 {response.status} {reason}\r\n" + "".join(
+            f"{k}: {v}\r\n" for k, v in headers.items()
+        ) + "\r\n"
+        writer.write(head_bytes.encode("latin-1"))
+        if not head:
+            writer.write(response.body)
+        await writer.drain()
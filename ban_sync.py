@@ -0,0 +1,160 @@
+"""
+ban_sync.py — Фоновая синхронизация банов из Supabase в работающий бот.
+
+Раньше load_banned_users() читал таблицу users один раз при старте, и бан
+из Flask-панели (admin_panel.api_ban_user) не действовал до перезапуска.
+Теперь BanSync:
+
+  1. при старте загружает полный список забаненных и запоминает водяной
+     знак — максимальный users.ban_updated_at;
+  2. каждые BAN_SYNC_INTERVAL секунд запрашивает только строки с
+     ban_updated_at >= водяной знак − BAN_SYNC_OVERLAP и применяет дельту
+     к множеству "banned" в state (state_backend.py).
+
+Перекрытие нужно потому, что транзакции фиксируются не в порядке своих
+временных меток: строка с чуть более ранним ban_updated_at может стать
+видимой уже после очередного опроса. Применение дельты идемпотентно,
+так что повторно прочитанные строки ничего не ломают.
+
+Колонку ban_updated_at и триггер создаёт supabase_ban_sync.sql. Если
+миграция не применена, синхронизация откатывается к периодической
+полной перезагрузке списка.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+from state_backend import StateBackend
+
+logger = logging.getLogger(__name__)
+
+BAN_SYNC_INTERVAL = float(os.getenv("BAN_SYNC_INTERVAL", "5"))
+BAN_SYNC_OVERLAP = float(os.getenv("BAN_SYNC_OVERLAP", "5"))
+# Без миграции — полная перезагрузка не чаще раза в минуту
+FULL_RELOAD_INTERVAL = 60.0
+PAGE_SIZE = 1000
+# Водяной знак, если ни у одной строки ещё нет ban_updated_at
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _parse_ts(value: str) -> datetime:
+    # PostgREST отдаёт 2026-02-23T10:15:30.123456+00:00; "Z" встречается у старых версий
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class BanSync:
+    """Держит state-множество "banned" в соответствии с users.is_banned."""
+
+    def __init__(self, client, state: StateBackend, namespace: str = "banned",
+                 interval: float = BAN_SYNC_INTERVAL, overlap: float = BAN_SYNC_OVERLAP):
+        self.client = client
+        self.state = state
+        self.namespace = namespace
+        self.interval = interval
+        self.overlap = timedelta(seconds=overlap)
+        self.watermark: datetime | None = None
+        self.incremental = True
+        self._task: asyncio.Task | None = None
+
+    # ─── Запросы ──────────────────────────────────────────────────────────────
+
+    def full_load(self) -> int:
+        """Полная загрузка списка забаненных. Возвращает их число."""
+        banned: list[int] = []
+        offset = 0
+        while True:
+            rows = (
+                self.client.table("users").select("chat_id").eq("is_banned", True)
+                .order("chat_id").range(offset, offset + PAGE_SIZE - 1).execute().data
+                or []
+            )
+            banned.extend(row["chat_id"] for row in rows)
+            if len(rows) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        self.state.replace_members(self.namespace, banned)
+
+        if self.incremental:
+            try:
+                latest = (
+                    self.client.table("users").select("ban_updated_at")
+                    .not_.is_("ban_updated_at", "null")
+                    .order("ban_updated_at", desc=True).limit(1).execute().data
+                    or []
+                )
+                # Пустая таблица — тоже успешная загрузка: без водяного знака
+                # poll_changes делал бы полную загрузку на каждом шаге
+                if latest and latest[0].get("ban_updated_at"):
+                    self.watermark = _parse_ts(latest[0]["ban_updated_at"])
+                else:
+                    self.watermark = EPOCH
+            except Exception as e:
+                self.incremental = False
+                logger.warning(f"[ban-sync] Нет ban_updated_at (примените supabase_ban_sync.sql), "
+                               f"только полная перезагрузка: {e}")
+        return len(banned)
+
+    def poll_changes(self) -> tuple[int, int]:
+        """Применяет изменения после водяного знака. Возвращает (забанено, разбанено)."""
+        if self.watermark is None:
+            self.full_load()
+            return 0, 0
+
+        since = (self.watermark - self.overlap).isoformat()
+        banned = unbanned = 0
+        offset = 0
+        while True:
+            rows = (
+                self.client.table("users").select("chat_id,is_banned,ban_updated_at")
+                .gte("ban_updated_at", since).order("ban_updated_at")
+                .range(offset, offset + PAGE_SIZE - 1).execute().data
+                or []
+            )
+            for row in rows:
+                if row.get("is_banned"):
+                    banned += self.state.add_member(self.namespace, row["chat_id"])
+                else:
+                    if self.state.has_member(self.namespace, row["chat_id"]):
+                        self.state.remove_member(self.namespace, row["chat_id"])
+                        unbanned += 1
+                if row.get("ban_updated_at"):
+                    self.watermark = max(self.watermark, _parse_ts(row["ban_updated_at"]))
+            if len(rows) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        return banned, unbanned
+
+    # ─── Фоновая задача ───────────────────────────────────────────────────────
+
+    async def run(self) -> None:
+        elapsed_since_full = 0.0
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if self.incremental:
+                    banned, unbanned = await asyncio.to_thread(self.poll_changes)
+                    if banned or unbanned:
+                        logger.info(f"[ban-sync] +{banned} забанено, -{unbanned} разбанено")
+                else:
+                    elapsed_since_full += self.interval
+                    if elapsed_since_full >= FULL_RELOAD_INTERVAL:
+                        elapsed_since_full = 0.0
+                        await asyncio.to_thread(self.full_load)
+            except Exception as e:
+                # Сеть/Supabase недоступны — пробуем на следующем шаге
+                logger.warning(f"[ban-sync] Ошибка синхронизации: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,76 @@
+"""
+bench_startup.py — Замер холодного старта бота.
+
+Каждый сценарий запускается в отдельном процессе (честный холодный импорт):
+
+    bot (lazy)        — import bot: клиенты Anthropic/Supabase не создаются;
+    rag + clients     — import rag и создание обоих клиентов — столько раньше
+                        занимал сам `import rag` (и `import bot` поверх него);
+    first question    — import bot + создание клиентов + чтение промпта:
+                        задержка первого ответа без прогрева (rag.warmup).
+
+Сеть не используется: переменные окружения подставляются фиктивные,
+если не заданы.
+
+Запуск:
+    python bench_startup.py
+    python bench_startup.py --repeat 7
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    "bot (lazy)": "import bot",
+    "rag + clients": "import rag; rag.get_anthropic(); rag.get_supabase()",
+    "first question": "import bot, rag; rag.get_anthropic(); rag.get_supabase(); rag.get_system_prompt()",
+}
+
+_TIMER = (
+    "import time; _t = time.perf_counter()\n"
+    "{code}\n"
+    "print(time.perf_counter() - _t)"
+)
+
+FAKE_ENV = {
+    "ANTHROPIC_API_KEY": "sk-ant-bench",
+    "SUPABASE_URL": "https://bench.supabase.co",
+    "SUPABASE_KEY": "eyJhbGciOiJIUzI1NiJ9.e30.bench",
+}
+
+
+def run_once(code: str) -> float:
+    env = dict(os.environ)
+    for name, value in FAKE_ENV.items():
+        env.setdefault(name, value)
+    out = subprocess.run(
+        [sys.executable, "-c", _TIMER.format(code=code)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    sys.stdout.reconfigure(encoding="utf-8")
+    parser = argparse.ArgumentParser(description="Бенчмарк холодного старта")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'Сценарий':<18} {'медиана':>9} {'мин':>9}")
+    print("-" * 38)
+    for name, code in SCENARIOS.items():
+        try:
+            times = [run_once(code) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError as e:
+            print(f"[ERR] {name}: {e.stderr.strip().splitlines()[-1]}")
+            return 1
+        print(f"{name:<18} {statistics.median(times):>8.3f}s {min(times):>8.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+bench_telegram_html.py — Микро-бенчмарк рендерера Markdown → Telegram HTML.
+
+Сравнивает прежнюю реализацию bot.md_to_html (импорт re/html и компиляция
+регулярных выражений на каждый вызов + нарезка сырого текста по 4096
+символов) с telegram_html.render_parts (один проход + разбиение готового HTML).
+
+Запуск:
+    python bench_telegram_html.py
+    python bench_telegram_html.py --repeat 5000
+"""
+
+import argparse
+import sys
+import timeit
+
+from telegram_html import TELEGRAM_MAX_LEN, render_parts
+
+SAMPLE = (
+    "**Ответ:** согласно [п. 3 ст. 16 Закона](https://adilet.zan.kz/rus/docs/Z2400000106#z167) "
+    "заказчик *вправе* отклонить заявку, если цена является `демпинговой`.\n\n"
+    "**Основания:**\n"
+    "1. Цена ниже среднерыночной более чем на 20% (_п. 45 Правил_).\n"
+    "2. Потенциальный поставщик не представил обоснование & расчёт.\n\n"
+)
+
+
+def legacy_md_to_html(text: str) -> str:
+    """Копия прежней bot.md_to_html — только для сравнения."""
+    import re, html
+
+    links = []
+
+    def save_link(m):
+        placeholder = f"\x00LINK{len(links)}\x00"
+        links.append(f'<a href="{html.escape(m.group(2))}">{html.escape(m.group(1))}</a>')
+        return placeholder
+
+    text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', save_link, text)
+    text = html.escape(text)
+    for i, link_html in enumerate(links):
+        text = text.replace(f"\x00LINK{i}\x00", link_html)
+    text = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', text)
+    text = re.sub(r'\*(.+?)\*', r'<i>\1</i>', text)
+    text = re.sub(r'(?<!\w)_(.+?)_(?!\w)', r'<i>\1</i>', text)
+    text = re.sub(r'`(.+?)`', r'<code>\1</code>', text)
+    return text
+
+
+def legacy_parts(answer: str) -> list[str]:
+    chunks = [answer[i:i + TELEGRAM_MAX_LEN] for i in range(0, len(answer), TELEGRAM_MAX_LEN)]
+    return [legacy_md_to_html(c) for c in chunks]
+
+
+def main() -> int:
+    sys.stdout.reconfigure(encoding="utf-8")
+    parser = argparse.ArgumentParser(description="Бенчмарк md → Telegram HTML")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    for label, text in (("короткий ответ", SAMPLE), ("длинный ответ", SAMPLE * 40)):
+        print(f"\n{label}: {len(text)} символов")
+        for name, fn in (("legacy", legacy_parts), ("render_parts", render_parts)):
+            seconds = timeit.timeit(lambda: fn(text), number=args.repeat)
+            parts = fn(text)
+            over = sum(1 for p in parts if len(p) > TELEGRAM_MAX_LEN)
+            print(f"  {name:13} {seconds / args.repeat * 1e6:9.1f} мкс/вызов, "
+                  f"частей: {len(parts)}, длиннее лимита: {over}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,12 +9,25 @@ bot.py — Telegram-бот консультант по госзакупкам Р
     ANTHROPIC_API_KEY   — ключ Claude API
     SUPABASE_URL        — URL Supabase проекта
     SUPABASE_KEY        — anon/public ключ Supabase
+    BOT_MODE            — polling (по умолчанию) или webhook (см. webhook.py)
+    MAX_CONCURRENT_UPDATES — сколько обновлений обрабатывать одновременно
+    STATE_BACKEND       — memory (по умолчанию), sqlite или redis (см. state_backend.py)
+    TRUSTED_CHAT_IDS    — chat_id через запятую с мягким rate limit
+    COALESCE_WINDOW     — сек ожидания продолжения вопроса (0 — без склейки)
+    ANSWER_POLICY       — cancel (новый вопрос отменяет текущий ответ) или queue
+    ANSWER_WORKERS      — сколько ответов готовится одновременно (request_scheduler.py)
+    DEGRADED_QUEUE_DEPTH — очередь, с которой отвечаем без LLM (degraded_mode.py)
+    WARMUP_PRIME_CACHE  — 1: прогревать кэш промптов Anthropic при старте
+
+Клиенты Anthropic/Supabase создаются лениво (clients.py) и прогреваются в фоне
+после старта (rag.warmup); замер холодного старта — python bench_startup.py.
 """
 
+import asyncio
+import hmac
 import os
 import logging
-import time
-from collections import defaultdict, deque
+import math
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.error import Conflict
 from telegram.ext import (
@@ -26,7 +39,23 @@ from telegram.ext import (
     ContextTypes,
 )
 from dotenv import load_dotenv
-from rag import answer_question, supabase, detect_platform, search_supabase
+from kb_manifest import MANIFEST_PATH, load_manifest, manifest_statistics
+from ban_sync import BanSync
+from faq_index import FaqIndex, FaqSync
+from llm_usage import UsageRecorder, fetch_report, format_cost, usage_rows
+from async_http import HttpServer, Request, Response
+from metrics import CONTENT_TYPE, REGISTRY, LoopLagMonitor, callback, counter
+from chat_tasks import ChatTaskTracker
+from degraded_mode import DegradedMode
+from message_coalescer import MessageCoalescer
+from rate_limiter import RateLimiter, RateTier
+from request_scheduler import Priority, RequestScheduler
+from state_backend import MemoryStateBackend, create_state_backend
+from stats_rollup import fetch_summary, format_summary
+from telegram_html import html_to_text, render_parts
+import rag
+from clients import require_env
+from rag import AnswerCancelled, answer_question, llm_breaker, supabase, detect_platform, search_supabase
 from conversation_context import (
     ConversationContext,
     infer_topic_from_question,
@@ -41,18 +70,55 @@ from rag_enhanced import (
 
 load_dotenv()
 
-# ─── Импорт автоматически генерируемых сообщений ───────────────────────────────
-try:
-    from bot_messages import START_MESSAGE, HELP_MESSAGE, SOURCES_MESSAGE
-except ImportError:
-    # Fallback если bot_messages.py еще не сгенерирован
-    START_MESSAGE = (
-        "Здравствуйте! Я консультант по госзакупкам РК.\n"
-        "Отвечаю по официальным документам.\n\n"
-        "/help — справка"
-    )
-    HELP_MESSAGE = "Задайте вопрос на русском или казахском языке."
-    SOURCES_MESSAGE = "Ссылки на источники (будут загружены после генерации bot_messages.py)"
+# ─── Сообщения бота: манифест базы знаний с горячей перезагрузкой ─────────────
+# ingest.py / kb_manifest.py обновляют data/kb_manifest.json при добавлении
+# документов. Бот сравнивает mtime манифеста и пересобирает /start, /help, /docs
+# без перегенерации bot_messages.py и перезапуска. Сам bot_messages.py
+# импортируется только если манифеста нет (не замедляет старт).
+
+_bot_messages = {
+    "mtime_ns": None,
+    "start": None,
+    "help": None,
+    "sources": None,
+}
+
+
+def _fallback_messages() -> dict:
+    """Сообщения из автоматически генерируемого bot_messages.py."""
+    try:
+        from bot_messages import START_MESSAGE, HELP_MESSAGE, SOURCES_MESSAGE
+    except ImportError:
+        # Fallback если bot_messages.py еще не сгенерирован
+        START_MESSAGE = (
+            "Здравствуйте! Я консультант по госзакупкам РК.\n"
+            "Отвечаю по официальным документам.\n\n"
+            "/help — справка"
+        )
+        HELP_MESSAGE = "Задайте вопрос на русском или казахском языке."
+        SOURCES_MESSAGE = "Ссылки на источники (будут загружены после генерации bot_messages.py)"
+    return {"start": START_MESSAGE, "help": HELP_MESSAGE, "sources": SOURCES_MESSAGE}
+
+
+def get_bot_messages() -> dict:
+    """Актуальные сообщения бота; перечитывает манифест только если он изменился."""
+    try:
+        mtime_ns = os.stat(MANIFEST_PATH).st_mtime_ns
+    except OSError:
+        mtime_ns = None  # манифеста нет — значения из bot_messages.py
+    if mtime_ns is not None and mtime_ns != _bot_messages["mtime_ns"]:
+        from generate_bot_messages import build_messages
+
+        manifest = load_manifest()
+        if manifest["files"]:
+            start_msg, help_msg, sources_msg = build_messages(*manifest_statistics(manifest))
+            _bot_messages.update(start=start_msg, help=help_msg, sources=sources_msg)
+            logger.info(f"[messages] Сообщения обновлены из манифеста: {manifest['total_chunks']} чанков")
+        _bot_messages["mtime_ns"] = mtime_ns
+    if _bot_messages["start"] is None:
+        _bot_messages.update(_fallback_messages())
+    return _bot_messages
+
 
 # ─── Логирование ──────────────────────────────────────────────────────────────
 logging.basicConfig(
@@ -61,75 +127,102 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# ─── Конвертер Markdown → HTML (для Telegram) ────────────────────────────────
+# ─── Отправка ответа (Markdown → HTML, см. telegram_html.py) ─────────────────
 
-def md_to_html(text: str) -> str:
+async def send_answer(message, answer: str, keyboard=None):
     """
-    Конвертирует базовый Markdown (который генерирует Claude) в Telegram HTML.
-    Порядок важен: сначала ссылки, потом жирный/курсив.
+    Рендерит ответ в HTML и отправляет частями <= 4096 символов, разрезанными
+    по абзацам/предложениям уже после рендеринга. Кнопки — к последней части.
+    Возвращает последнее отправленное сообщение.
     """
-    import re, html
-
-    # 1. Экранируем HTML-спецсимволы КРОМЕ тех, что мы сами добавим тегами
-    #    Делаем это поэтапно через placeholder-технику
-    # Сначала вытаскиваем [текст](url) — ссылки
-    links = []
-    def save_link(m):
-        link_text = m.group(1)
-        url = m.group(2)
-        # Экранируем содержимое
-        safe_text = html.escape(link_text)
-        safe_url  = html.escape(url)
-        placeholder = f"\x00LINK{len(links)}\x00"
-        links.append(f'<a href="{safe_url}">{safe_text}</a>')
-        return placeholder
-
-    text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', save_link, text)
-
-    # 2. Экранируем оставшийся текст
-    text = html.escape(text)
-
-    # 3. Восстанавливаем ссылки
-    for i, link_html in enumerate(links):
-        text = text.replace(f"\x00LINK{i}\x00", link_html)
-
-    # 4. **жирный** → <b>жирный</b>
-    text = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', text)
-
-    # 5. *курсив* или _курсив_ → <i>курсив</i>
-    text = re.sub(r'\*(.+?)\*', r'<i>\1</i>', text)
-    text = re.sub(r'(?<!\w)_(.+?)_(?!\w)', r'<i>\1</i>', text)
-
-    # 6. `моноширинный` → <code>моноширинный</code>
-    text = re.sub(r'`(.+?)`', r'<code>\1</code>', text)
+    parts = render_parts(answer)
+    bot_msg = None
+    for i, part in enumerate(parts):
+        is_last = (i == len(parts) - 1)
+        try:
+            bot_msg = await message.reply_text(
+                part,
+                parse_mode="HTML",
+                reply_markup=keyboard if is_last else None,
+            )
+        except Exception:
+            # Последний fallback — plain text без разметки
+            bot_msg = await message.reply_text(
+                html_to_text(part),
+                reply_markup=keyboard if is_last else None,
+            )
+    return bot_msg
 
-    return text
 
+# ─── Общее состояние (state_backend.py) ───────────────────────────────────────
+# STATE_BACKEND=memory — один процесс; sqlite/redis — несколько процессов/реплик.
+# Пространства имён:
+#   history         — история диалога (list сообщений для Claude)
+#   pending_dislike — ждём комментарий к дизлайку: {question, answer, message_id}
+#   clarification   — ждём уточнение платформы: {question}
+#   last_answer     — последний вопрос/ответ для кнопок 👍/👎
+#   dialog          — ConversationContext.to_dict()
+#   registered      — множество зарегистрированных (чтобы не дёргать Supabase каждый раз)
+#   banned          — множество забаненных (загружается из Supabase при старте)
+state = create_state_backend()
 
-# ─── Хранилище истории диалогов ───────────────────────────────────────────────
-conversation_histories: dict[int, list] = {}
 MAX_HISTORY_PAIRS = 10
-
-# ─── Хранилище ожидающих комментарий дизлайков ────────────────────────────────
-# Ключ: chat_id, значение: {question, answer, message_id}
-pending_dislike: dict[int, dict] = {}
-
-# ─── Кэш зарегистрированных пользователей (чтобы не дёргать Supabase каждый раз)
-_registered_users: set[int] = set()
+STATE_TTL = 7 * 24 * 3600      # диалоговое состояние живёт неделю без активности
+PENDING_TTL = 24 * 3600        # ожидание комментария/уточнения — сутки
 
 # ─── ID администратора (ваш Telegram chat_id) ────────────────────────────────
 ADMIN_CHAT_ID = int(os.getenv("ADMIN_CHAT_ID", "0"))
-
-# ─── Кэш забаненных пользователей (загружается из Supabase при старте) ────────
-_banned_users: set[int] = set()
-
-# ─── Rate limiting ────────────────────────────────────────────────────────────
-# Храним метки времени последних N запросов для каждого chat_id
-_rate_timestamps: dict[int, deque] = defaultdict(lambda: deque())
+# Ссылка на admin/index.html в /stats (GitHub Pages или {адрес admin_panel.py}/panel)
+ADMIN_PANEL_URL = os.getenv("ADMIN_PANEL_URL", "https://aldan76.github.io/goszakup-bot/")
+
+# ─── Синхронизация банов из Supabase (ban_sync.py) ────────────────────────────
+# Баны из админ-панели применяются через BAN_SYNC_INTERVAL секунд без рестарта
+ban_sync = BanSync(supabase, state)
+
+# ─── FAQ до RAG (faq_index.py) ────────────────────────────────────────────────
+# Вопросы, совпавшие с FAQ (FAQ_MATCH_THRESHOLD), получают готовый ответ;
+# изменения FAQ из панели подхватываются через FAQ_REFRESH_INTERVAL секунд
+faq_index = FaqIndex()
+faq_sync = FaqSync(supabase, faq_index)
+
+# ─── Учёт токенов Claude (llm_usage.py) ───────────────────────────────────────
+# Строки llm_usage копятся в памяти и пишутся пачкой раз в LLM_USAGE_FLUSH_INTERVAL
+usage_recorder = UsageRecorder(supabase)
+
+# ─── Метрики (metrics.py) ─────────────────────────────────────────────────────
+# GET /metrics: в polling-режиме — отдельный listener METRICS_HOST:METRICS_PORT
+# (0 — выкл.; по умолчанию только localhost), в webhook-режиме — на публичном
+# сервере webhook (PORT) и только при заданном METRICS_TOKEN (Bearer-токен).
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+MESSAGES_RECEIVED = counter("bot_messages_received_total", "Text messages received from users.")
+RATE_LIMITED = counter("bot_rate_limited_total", "Questions refused by the rate limiter.")
+ANSWERS = counter("bot_answers_total", "Answers sent by source (conversations.source).", ["source"])
+loop_lag = LoopLagMonitor()
+metrics_server: HttpServer | None = None
+
+# ─── Rate limiting (rate_limiter.py, GCRA) ────────────────────────────────────
 RATE_LIMIT_MESSAGES = 5    # не более 5 сообщений...
 RATE_LIMIT_WINDOW   = 60   # ...за 60 секунд
 RATE_LIMIT_COOLDOWN = 300  # пауза 5 минут при превышении
 
+# Доверенные пользователи (через запятую) — мягкий лимит
+TRUSTED_CHAT_IDS = {
+    int(x) for x in os.getenv("TRUSTED_CHAT_IDS", "").split(",") if x.strip()
+}
+RATE_TIERS = {
+    "admin":   RateTier("admin", None),
+    "trusted": RateTier("trusted", RATE_LIMIT_MESSAGES * 4, RATE_LIMIT_WINDOW, 60),
+    "default": RateTier("default", RATE_LIMIT_MESSAGES, RATE_LIMIT_WINDOW, RATE_LIMIT_COOLDOWN),
+}
+# В одном процессе — компактное состояние в памяти лимитера,
+# при sqlite/redis — общее для всех процессов через state.atomic_update
+rate_limiter = RateLimiter(
+    RATE_TIERS,
+    store=None if isinstance(state, MemoryStateBackend) else state,
+)
+
 # ─── Антиспам: ключевые слова не по теме ─────────────────────────────────────
 # Если вопрос ТОЛЬКО из этих слов или явно не про закупки — отклоняем
 _OFFTOPIC_PATTERNS = [
@@ -173,25 +266,26 @@ def upsert_user(user) -> None:
 # ─── Загрузка забаненных пользователей из Supabase ───────────────────────────
 
 def load_banned_users() -> None:
-    """Загружает список забаненных пользователей при старте бота."""
-    global _banned_users
+    """
+    Загружает список забаненных пользователей при старте бота.
+    Дальше изменения подтягивает фоновая задача ban_sync (см. ban_sync.py).
+    """
     try:
-        result = supabase.table("users").select("chat_id").eq("is_banned", True).execute()
-        _banned_users = {row["chat_id"] for row in (result.data or [])}
-        logger.info(f"[ban] Загружено забаненных: {len(_banned_users)}")
+        count = ban_sync.full_load()
+        logger.info(f"[ban] Загружено забаненных: {count}")
     except Exception as e:
         logger.warning(f"[ban] Ошибка загрузки banned: {e}")
 
 
 def is_banned(chat_id: int) -> bool:
-    return chat_id in _banned_users
+    return state.has_member("banned", chat_id)
 
 
 def ban_user(chat_id: int) -> bool:
     """Баним пользователя в Supabase и кэше."""
     try:
         supabase.table("users").update({"is_banned": True}).eq("chat_id", chat_id).execute()
-        _banned_users.add(chat_id)
+        state.add_member("banned", chat_id)
         logger.info(f"[ban] Забанен: {chat_id}")
         return True
     except Exception as e:
@@ -203,7 +297,8 @@ def unban_user(chat_id: int) -> bool:
     """Разбаниваем пользователя."""
     try:
         supabase.table("users").update({"is_banned": False}).eq("chat_id", chat_id).execute()
-        _banned_users.discard(chat_id)
+        state.remove_member("banned", chat_id)
+        rate_limiter.reset(chat_id)
         logger.info(f"[ban] Разбанен: {chat_id}")
         return True
     except Exception as e:
@@ -218,20 +313,44 @@ def check_rate_limit(chat_id: int) -> tuple[bool, int]:
     Проверяет, не превышен ли лимит запросов.
     Возвращает (разрешено, секунд_до_разблокировки).
     """
-    now = time.time()
-    dq = _rate_timestamps[chat_id]
+    decision = rate_limiter.check(chat_id, rate_tier(chat_id))
+    if not decision.allowed:
+        return False, max(math.ceil(decision.retry_after), 1)
+    return True, 0
 
-    # Удаляем старые метки вне окна
-    while dq and now - dq[0] > RATE_LIMIT_WINDOW:
-        dq.popleft()
 
-    if len(dq) >= RATE_LIMIT_MESSAGES:
-        # Превышен лимит — считаем сколько ждать
-        wait = int(RATE_LIMIT_COOLDOWN - (now - dq[0]))
-        return False, max(wait, 1)
+def rate_tier(chat_id: int) -> str:
+    if chat_id == ADMIN_CHAT_ID:
+        return "admin"
+    if chat_id in TRUSTED_CHAT_IDS:
+        return "trusted"
+    return "default"
+
+
+# ─── Состояние диалога ────────────────────────────────────────────────────────
+
+def register_user_once(user) -> None:
+    """upsert_user только при первом появлении пользователя (в любом процессе)."""
+    if state.add_member("registered", user.id):
+        upsert_user(user)
 
-    dq.append(now)
-    return True, 0
+
+def append_history(chat_id: int, question: str, answer: str) -> None:
+    state.append_history(
+        chat_id,
+        [{"role": "user", "content": question}, {"role": "assistant", "content": answer}],
+        MAX_HISTORY_PAIRS * 2,
+        ttl=STATE_TTL,
+    )
+
+
+def load_conversation_context(chat_id: int) -> ConversationContext:
+    data = state.get("dialog", chat_id)
+    return ConversationContext.from_dict(data) if data else ConversationContext(chat_id)
+
+
+def save_conversation_context(conv_context: ConversationContext) -> None:
+    state.set("dialog", conv_context.user_id, conv_context.to_dict(), ttl=STATE_TTL)
 
 
 # ─── Антиспам ─────────────────────────────────────────────────────────────────
@@ -251,8 +370,13 @@ def is_offtopic(text: str) -> bool:
 
 
 def log_conversation(chat_id: int, question: str, answer: str,
-                     chunks_used: int = 0, ktru_found: bool = False) -> None:
-    """Сохраняет пару вопрос-ответ в таблицу conversations."""
+                     chunks_used: int = 0, ktru_found: bool = False,
+                     source: str = "llm") -> None:
+    """
+    Сохраняет пару вопрос-ответ в таблицу conversations.
+    source — путь ответа (llm / digest / rejected / empty / faq), по нему
+    stats_daily считает ответы без LLM и отклонённые.
+    """
     try:
         supabase.table("conversations").insert({
             "chat_id":     chat_id,
@@ -260,6 +384,7 @@ def log_conversation(chat_id: int, question: str, answer: str,
             "answer":      answer[:8000],
             "chunks_used": chunks_used,
             "ktru_found":  ktru_found,
+            "source":      source,
         }).execute()
         # Обновляем счётчик сообщений пользователя
         supabase.rpc("update_user_last_seen", {"p_chat_id": chat_id}).execute()
@@ -298,21 +423,16 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Приветственное сообщение."""
     # Регистрируем пользователя
     if update.effective_user:
-        user = update.effective_user
-        if user.id not in _registered_users:
-            upsert_user(user)
-            _registered_users.add(user.id)
+        register_user_once(update.effective_user)
 
-    # Используем автоматически генерируемое сообщение из bot_messages.py
-    # При добавлении новых документов запусти: python generate_bot_messages.py
-    await update.message.reply_text(START_MESSAGE)
+    # Сообщение собирается из манифеста базы знаний (fallback — bot_messages.py)
+    await update.message.reply_text(get_bot_messages()["start"])
 
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Справка."""
-    # Используем автоматически генерируемое сообщение из bot_messages.py
-    # При добавлении новых документов запусти: python generate_bot_messages.py
-    await update.message.reply_text(HELP_MESSAGE)
+    # Сообщение собирается из манифеста базы знаний (fallback — bot_messages.py)
+    await update.message.reply_text(get_bot_messages()["help"])
 
 
 async def reset_context_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -320,8 +440,7 @@ async def reset_context_command(update: Update, context: ContextTypes.DEFAULT_TY
     chat_id = update.effective_chat.id
 
     # Очищаем контекст диалога
-    if "conversation_context" in context.user_data:
-        context.user_data["conversation_context"].reset()
+    if state.pop("dialog", chat_id) is not None:
         logger.info(f"[context] Контекст диалога сброшен для пользователя {chat_id}")
         await update.message.reply_text(
             "✅ Контекст диалога очищен. Начнём новый диалог с чистого листа!\n"
@@ -333,15 +452,17 @@ async def reset_context_command(update: Update, context: ContextTypes.DEFAULT_TY
 
 async def docs_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Официальные источники и ссылки на документы."""
-    # Используем автоматически генерируемое сообщение со ссылками из bot_messages.py
-    await update.message.reply_text(SOURCES_MESSAGE, disable_web_page_preview=False)
+    # Сообщение со ссылками (fallback — bot_messages.py)
+    await update.message.reply_text(get_bot_messages()["sources"], disable_web_page_preview=False)
 
 
 async def clear(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Очистка истории диалога."""
     chat_id = update.effective_chat.id
-    conversation_histories[chat_id] = []
-    pending_dislike.pop(chat_id, None)
+    state.clear_history(chat_id)
+    state.delete("pending_dislike", chat_id)
+    coalescer.discard(chat_id)
+    chat_tasks.cancel(chat_id)
     await update.message.reply_text("✅ История диалога очищена. Начнём заново!")
 
 
@@ -352,6 +473,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     if not user_text:
         return
+    MESSAGES_RECEIVED.inc()
 
     # ── Сообщение о разработке (АКТИВИРОВАНО 2026-02-23) ──────────────────────────
     await update.message.reply_text(
@@ -364,9 +486,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     return
 
     # ── Регистрируем/обновляем пользователя ───────────────────────────────────
-    if update.effective_user and chat_id not in _registered_users:
-        upsert_user(update.effective_user)
-        _registered_users.add(chat_id)
+    if update.effective_user:
+        register_user_once(update.effective_user)
 
     # ── Проверка бана ─────────────────────────────────────────────────────────
     if is_banned(chat_id):
@@ -376,22 +497,95 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         logger.warning(f"[ban] Попытка входа забаненного: {chat_id}")
         return
 
+    # ── Склейка серии сообщений (message_coalescer.py) ────────────────────────
+    # Вопрос из нескольких быстрых сообщений обрабатывается одним вызовом
+    await coalescer.submit(chat_id, user_text, update.message)
+
+
+async def generate_answer(chat_id: int, question: str, history: list,
+                          ticket, priority: Priority) -> tuple[str, int, bool, str]:
+    """
+    answer_question в слоте планировщика. В режиме «только поиск»
+    (degraded_mode.py) Claude не вызывается, а дешёвый дайджест не стоит
+    в очереди за генерациями.
+    Возвращает (ответ, чанков, КТРУ найден, путь ответа для conversations.source).
+    Токены вызовов Claude пишутся в llm_usage и для отменённых ответов.
+    """
+    mode = degraded.check()
+    meta: dict = {}
+    try:
+        async with scheduler.slot(Priority.CACHED if mode else priority, chat_id):
+            answer, chunks_used, ktru_found = await asyncio.to_thread(
+                answer_question, question, history, ticket.is_cancelled, mode is None, meta
+            )
+    finally:
+        usage_recorder.record(usage_rows(chat_id, meta))
+    source = meta.get("source", "llm")
+    ANSWERS.labels(source=source).inc()
+    if mode:
+        logger.info(f"[degraded] chat_id={chat_id}: режим «только поиск» ({mode}), ответ: {source}")
+    else:
+        # Ошибки Claude в этом вызове могли разомкнуть breaker — сразу сообщаем
+        degraded.check()
+    # Только дайджест: «ничего не найдено» и отказы — не ответы без LLM.
+    # Дайджест бывает и без режима — если Claude упал уже в этом вызове
+    if source == "digest":
+        degraded.digest_answers += 1
+    return answer, chunks_used, ktru_found, source
+
+
+async def answer_from_faq(chat_id: int, user_text: str, message) -> bool:
+    """Отвечает записью FAQ, если вопрос с ней совпал. True — ответ отправлен."""
+    match = faq_index.match(user_text)
+    if match is None:
+        return False
+    answer = match.entry.answer
+    logger.info(
+        f"[faq] chat_id={chat_id}: FAQ #{match.entry.id} ({match.kind}, score={match.score})"
+    )
+    ANSWERS.labels(source="faq").inc()
+    async with chat_tasks.track(chat_id):
+        log_conversation(chat_id, user_text, answer, chunks_used=0, ktru_found=False, source="faq")
+        append_history(chat_id, user_text, answer)
+        keyboard = InlineKeyboardMarkup([[
+            InlineKeyboardButton("👍 Полезно",    callback_data="like"),
+            InlineKeyboardButton("👎 Не полезно", callback_data="dislike"),
+        ]])
+        bot_msg = await send_answer(message, answer, keyboard)
+        if bot_msg:
+            state.set("last_answer", chat_id, {
+                "message_id": bot_msg.message_id,
+                "question":   user_text,
+                "answer":     answer,
+            }, ttl=STATE_TTL)
+    return True
+
+
+async def process_question(chat_id: int, user_text: str, messages: list) -> None:
+    """
+    Обработка вопроса после склейки: user_text — объединённый текст серии,
+    messages — её сообщения Telegram; отвечаем на последнее.
+    Rate limit считается один раз на серию, а не на каждый фрагмент.
+    """
+    message = messages[-1]
+
     # ── Rate limiting ─────────────────────────────────────────────────────────
     allowed, wait_sec = check_rate_limit(chat_id)
     if not allowed:
         minutes = wait_sec // 60
         seconds = wait_sec % 60
         time_str = f"{minutes} мин {seconds} сек" if minutes else f"{seconds} сек"
-        await update.message.reply_text(
+        await message.reply_text(
             f"⏳ Вы отправляете сообщения слишком часто.\n"
             f"Пожалуйста, подождите {time_str}."
         )
         logger.warning(f"[rate] Лимит превышен: {chat_id}")
+        RATE_LIMITED.inc()
         return
 
     # ── Антиспам / нетематический вопрос ─────────────────────────────────────
     if is_offtopic(user_text):
-        await update.message.reply_text(
+        await message.reply_text(
             "❓ Этот бот отвечает только на вопросы по государственным закупкам РК.\n"
             "Пожалуйста, сформулируйте вопрос по теме."
         )
@@ -399,8 +593,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
 
     # ── Проверяем: ждём ли комментарий к дизлайку? ────────────────────────────
-    if chat_id in pending_dislike:
-        data = pending_dislike.pop(chat_id)
+    data = state.pop("pending_dislike", chat_id)
+    if data is not None:
         save_feedback(
             chat_id=chat_id,
             message_id=data["message_id"],
@@ -409,78 +603,63 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             rating="dislike",
             comment=user_text,
         )
-        await update.message.reply_text("Спасибо за отзыв! 🙏 Мы учтём это.")
+        await message.reply_text("Спасибо за отзыв! 🙏 Мы учтём это.")
         return
 
     # ── Проверяем: ждём ли уточнение по платформе (clarification)? ──────────────
-    if context.user_data.get("waiting_for_clarification"):
+    clarification = state.get("clarification", chat_id)
+    if clarification is not None:
         platform = parse_platform_response(user_text)
         if platform:
-            original_question = context.user_data.get("pending_question", user_text)
-            context.user_data["waiting_for_clarification"] = False
-            context.user_data.pop("pending_question", None)
+            original_question = clarification.get("question", user_text)
+            state.delete("clarification", chat_id)
             logger.info(f"[clarification] Уточнение получено: платформа={platform}")
             # Перезапросить с явной платформой в памяти контекста
-            if chat_id not in conversation_histories:
-                conversation_histories[chat_id] = []
-            history = conversation_histories[chat_id]
-            try:
-                answer, chunks_used, ktru_found = answer_question(original_question, history)
-                log_conversation(chat_id, original_question, answer, chunks_used, ktru_found)
-                history.append({"role": "user", "content": original_question})
-                history.append({"role": "assistant", "content": answer})
-                if len(history) > MAX_HISTORY_PAIRS * 2:
-                    conversation_histories[chat_id] = history[-MAX_HISTORY_PAIRS * 2:]
-
-                chunks = [answer[i:i + 4096] for i in range(0, len(answer), 4096)]
-                keyboard = InlineKeyboardMarkup([[
-                    InlineKeyboardButton("👍 Полезно",    callback_data="like"),
-                    InlineKeyboardButton("👎 Не полезно", callback_data="dislike"),
-                ]])
-                bot_msg = None
-                for i, chunk in enumerate(chunks):
-                    is_last = (i == len(chunks) - 1)
-                    html_chunk = md_to_html(chunk)
-                    try:
-                        bot_msg = await update.message.reply_text(
-                            html_chunk,
-                            parse_mode="HTML",
-                            reply_markup=keyboard if is_last else None,
-                        )
-                    except Exception:
-                        bot_msg = await update.message.reply_text(
-                            chunk,
-                            reply_markup=keyboard if is_last else None,
-                        )
-                if bot_msg:
-                    context.user_data["last_msg_id"] = bot_msg.message_id
-                    context.user_data["last_question"] = original_question
-                    context.user_data["last_answer"] = answer
-            except Exception as e:
-                logger.error(f"[clarification] Ошибка обработки уточнения: {e}", exc_info=True)
-                await update.message.reply_text(
-                    "⚠️ Ошибка при обработке уточнения. Попробуйте ещё раз."
-                )
+            async with chat_tasks.track(chat_id) as ticket:
+                history = state.get_history(chat_id)
+                try:
+                    answer, chunks_used, ktru_found, source = await generate_answer(
+                        chat_id, original_question, history, ticket, Priority.CLARIFICATION
+                    )
+                    if ticket.is_cancelled():
+                        raise AnswerCancelled()
+                    log_conversation(chat_id, original_question, answer, chunks_used, ktru_found, source)
+                    append_history(chat_id, original_question, answer)
+
+                    keyboard = InlineKeyboardMarkup([[
+                        InlineKeyboardButton("👍 Полезно",    callback_data="like"),
+                        InlineKeyboardButton("👎 Не полезно", callback_data="dislike"),
+                    ]])
+                    bot_msg = await send_answer(message, answer, keyboard)
+                    if bot_msg:
+                        state.set("last_answer", chat_id, {
+                            "message_id": bot_msg.message_id,
+                            "question":   original_question,
+                            "answer":     answer,
+                        }, ttl=STATE_TTL)
+                except AnswerCancelled:
+                    logger.info(f"[tasks] chat_id={chat_id}: ответ на уточнение отменён новым вопросом")
+                except Exception as e:
+                    logger.error(f"[clarification] Ошибка обработки уточнения: {e}", exc_info=True)
+                    await message.reply_text(
+                        "⚠️ Ошибка при обработке уточнения. Попробуйте ещё раз."
+                    )
             return
         else:
-            await update.message.reply_text(
+            await message.reply_text(
                 "❓ Не смог понять платформу. Пожалуйста, ответьте:\n"
                 "• '1' или 'omarket' — для Omarket.kz\n"
                 "• '2' или 'goszakup' — для портала госзакупок"
             )
             return
 
-    # ── Обычный вопрос ────────────────────────────────────────────────────────
-    if chat_id not in conversation_histories:
-        conversation_histories[chat_id] = []
-
-    history = conversation_histories[chat_id]
+    # ── FAQ: готовый ответ администратора без поиска и Claude (faq_index.py) ──
+    if await answer_from_faq(chat_id, user_text, message):
+        return
 
+    # ── Обычный вопрос ────────────────────────────────────────────────────────
     # ── Инициализируем / получаем контекст диалога ────────────────────────────
-    if "conversation_context" not in context.user_data:
-        context.user_data["conversation_context"] = ConversationContext(chat_id)
-
-    conv_context = context.user_data["conversation_context"]
+    conv_context = load_conversation_context(chat_id)
 
     # ── Определяем платформу и тему ─────────────────────────────────────────
     detected_platform = detect_platform(user_text)
@@ -496,6 +675,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # Обновляем контекст диалога
     confidence = 0.9 if detected_platform else 0.6
     conv_context.update_context(user_text, detected_platform, detected_topic, confidence)
+    save_conversation_context(conv_context)
 
     logger.info(f"[chat_id={chat_id}] Вопрос: {user_text[:80]}")
     if detected_platform:
@@ -514,77 +694,89 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     #         if needs_clarification(user_text, platforms_found):
     #             clarification_msg = get_clarification_message(platforms_found)
     #             if clarification_msg:
-    #                 context.user_data["waiting_for_clarification"] = True
-    #                 context.user_data["pending_question"] = user_text
+    #                 state.set("clarification", chat_id, {"question": user_text}, ttl=PENDING_TTL)
     #                 logger.info(f"[clarification] Нужно уточнение: платформы={platforms_found}")
-    #                 await update.message.reply_text(clarification_msg)
+    #                 await message.reply_text(clarification_msg)
     #                 return
     #     except Exception as e:
     #         logger.warning(f"[clarification] Ошибка проверки: {e}")
     #         pass
 
-    await update.message.chat.send_action("typing")
-
-    try:
-        answer, chunks_used, ktru_found = answer_question(enhanced_question, history)
+    # ── Генерация ответа (chat_tasks.py) ──────────────────────────────────────
+    # Новый вопрос из этого чата отменяет текущий ответ (или ждёт его — queue)
+    async with chat_tasks.track(chat_id) as ticket:
+        await message.chat.send_action("typing")
 
-        # Логируем Q&A в Supabase
-        log_conversation(
-            chat_id=chat_id,
-            question=user_text,
-            answer=answer,
-            chunks_used=chunks_used,
-            ktru_found=ktru_found,
-        )
+        try:
+            # История читается внутри: при ANSWER_POLICY=queue — уже с ответом
+            # на предыдущий вопрос
+            history = state.get_history(chat_id)
+            answer, chunks_used, ktru_found, source = await generate_answer(
+                chat_id, enhanced_question, history, ticket, Priority.QUESTION
+            )
+            # Ответ готов, но пользователь уже спросил другое — не логируем и не шлём
+            if ticket.is_cancelled():
+                raise AnswerCancelled()
+
+            # Логируем Q&A в Supabase
+            log_conversation(
+                chat_id=chat_id,
+                question=user_text,
+                answer=answer,
+                chunks_used=chunks_used,
+                ktru_found=ktru_found,
+                source=source,
+            )
 
-        # Сохраняем в историю
-        history.append({"role": "user",      "content": user_text})
-        history.append({"role": "assistant",  "content": answer})
-        if len(history) > MAX_HISTORY_PAIRS * 2:
-            conversation_histories[chat_id] = history[-MAX_HISTORY_PAIRS * 2:]
+            # Сохраняем в историю
+            append_history(chat_id, user_text, answer)
+
+            logger.info(f"[chat_id={chat_id}] Ответ: {answer[:80]}...")
+
+            # Кнопки 👍/👎 добавляются только к последней части
+            keyboard = InlineKeyboardMarkup([[
+                InlineKeyboardButton("👍 Полезно",    callback_data="like"),
+                InlineKeyboardButton("👎 Не полезно", callback_data="dislike"),
+            ]])
+            bot_msg = await send_answer(message, answer, keyboard)
+
+            # Сохраняем данные для возможного фидбека
+            if bot_msg:
+                state.set("last_answer", chat_id, {
+                    "message_id": bot_msg.message_id,
+                    "question":   user_text,
+                    "answer":     answer,
+                }, ttl=STATE_TTL)
+
+        except AnswerCancelled:
+            logger.info(f"[tasks] chat_id={chat_id}: ответ отменён новым вопросом")
+        except Exception as e:
+            logger.error(f"[chat_id={chat_id}] Ошибка: {e}", exc_info=True)
+            await message.reply_text(
+                "⚠️ Произошла ошибка при обработке запроса. Попробуйте ещё раз.\n"
+                "Если ошибка повторяется — используйте /clear и задайте вопрос заново."
+            )
 
-        logger.info(f"[chat_id={chat_id}] Ответ: {answer[:80]}...")
 
-        # Разбиваем на чанки по 4096 символов
-        chunks = [answer[i:i + 4096] for i in range(0, len(answer), 4096)]
+# COALESCE_WINDOW / COALESCE_MAX_WAIT — см. message_coalescer.py
+coalescer = MessageCoalescer(process_question)
+# ANSWER_POLICY=cancel|queue — см. chat_tasks.py
+chat_tasks = ChatTaskTracker()
+# ANSWER_WORKERS / RESERVED_WORKERS — см. request_scheduler.py
+scheduler = RequestScheduler()
+# Режим «только поиск»: Claude недоступен (llm_breaker) или очередь слишком длинная
+degraded = DegradedMode(llm_breaker, scheduler.queued)
 
-        # Кнопки 👍/👎 добавляем только к последнему чанку
-        keyboard = InlineKeyboardMarkup([[
-            InlineKeyboardButton("👍 Полезно",    callback_data="like"),
-            InlineKeyboardButton("👎 Не полезно", callback_data="dislike"),
-        ]])
-
-        bot_msg = None
-        for i, chunk in enumerate(chunks):
-            is_last = (i == len(chunks) - 1)
-            html_chunk = md_to_html(chunk)
-            try:
-                bot_msg = await update.message.reply_text(
-                    html_chunk,
-                    parse_mode="HTML",
-                    reply_markup=keyboard if is_last else None,
-                )
-            except Exception:
-                # Последний fallback — plain text без разметки
-                bot_msg = await update.message.reply_text(
-                    chunk,
-                    reply_markup=keyboard if is_last else None,
-                )
-
-        # Сохраняем данные для возможного фидбека
-        if bot_msg:
-            context.user_data[f"q_{bot_msg.message_id}"] = user_text
-            context.user_data[f"a_{bot_msg.message_id}"] = answer
-            context.user_data["last_msg_id"] = bot_msg.message_id
-            context.user_data["last_question"] = user_text
-            context.user_data["last_answer"] = answer
-
-    except Exception as e:
-        logger.error(f"[chat_id={chat_id}] Ошибка: {e}", exc_info=True)
-        await update.message.reply_text(
-            "⚠️ Произошла ошибка при обработке запроса. Попробуйте ещё раз.\n"
-            "Если ошибка повторяется — используйте /clear и задайте вопрос заново."
-        )
+callback("bot_scheduler_queue_depth", "Requests waiting for an answer slot.", "gauge",
+         lambda: {name: c["queued"] for name, c in scheduler.snapshot()["classes"].items()},
+         labels=["priority"])
+callback("bot_scheduler_busy_workers", "Answer slots in use.", "gauge",
+         lambda: scheduler.snapshot()["busy"])
+callback("cache_lookups_total", "Cache lookups by cache and result.", "counter",
+         lambda: {("faq", "hit"): faq_index.hits, ("faq", "miss"): faq_index.misses},
+         labels=["cache", "result"])
+callback("claude_breaker_open", "1 while the Claude circuit breaker is open.", "gauge",
+         lambda: int(llm_breaker.state == llm_breaker.OPEN))
 
 
 async def handle_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -596,9 +788,10 @@ async def handle_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     action = query.data  # "like" или "dislike"
     message_id = query.message.message_id
 
-    # Берём вопрос/ответ из user_data
-    question = context.user_data.get("last_question", "")
-    answer   = context.user_data.get("last_answer", "")
+    # Берём последний вопрос/ответ из общего состояния
+    last = state.get("last_answer", chat_id, {})
+    question = last.get("question", "")
+    answer   = last.get("answer", "")
 
     # Убираем кнопки с сообщения
     try:
@@ -612,11 +805,11 @@ async def handle_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     elif action == "dislike":
         # Запоминаем — ждём комментарий следующим сообщением
-        pending_dislike[chat_id] = {
+        state.set("pending_dislike", chat_id, {
             "message_id": message_id,
             "question":   question,
             "answer":     answer,
-        }
+        }, ttl=PENDING_TTL)
         await query.message.reply_text(
             "Жаль, что ответ не помог 😔\n\n"
             "Напишите, что именно было не так — это поможет улучшить бота:"
@@ -635,7 +828,9 @@ async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     except ValueError:
         await update.message.reply_text("❌ Неверный chat_id")
         return
-    if ban_user(target):
+    async with scheduler.slot(Priority.ADMIN, ADMIN_CHAT_ID):
+        ok = await asyncio.to_thread(ban_user, target)
+    if ok:
         await update.message.reply_text(f"✅ Пользователь {target} заблокирован.")
         # Уведомляем самого пользователя
         try:
@@ -661,34 +856,55 @@ async def unban_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     except ValueError:
         await update.message.reply_text("❌ Неверный chat_id")
         return
-    if unban_user(target):
+    async with scheduler.slot(Priority.ADMIN, ADMIN_CHAT_ID):
+        ok = await asyncio.to_thread(unban_user, target)
+    if ok:
         await update.message.reply_text(f"✅ Пользователь {target} разблокирован.")
     else:
         await update.message.reply_text("❌ Ошибка при разблокировке.")
 
 
 async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """/stats — быстрая статистика (только для администратора)."""
+    """
+    /stats — быстрая статистика (только для администратора).
+    Итоги — одна строка stats_summary (stats_rollup.py), а не COUNT(*) по таблицам.
+    """
     if update.effective_chat.id != ADMIN_CHAT_ID:
         return
     try:
-        users_res = supabase.table("users").select("*", count="exact", head=True).execute()
-        msgs_res  = supabase.table("conversations").select("*", count="exact", head=True).execute()
-        ban_res   = supabase.table("users").select("*", count="exact", head=True).eq("is_banned", True).execute()
-        fb_res    = supabase.table("feedback").select("*", count="exact", head=True).execute()
+        async with scheduler.slot(Priority.ADMIN, ADMIN_CHAT_ID):
+            summary = await asyncio.to_thread(fetch_summary, supabase)
         text = (
             "📊 Быстрая статистика\n\n"
-            f"👥 Пользователей: {users_res.count}\n"
-            f"💬 Сообщений: {msgs_res.count}\n"
-            f"⛔ Забанено: {ban_res.count}\n"
-            f"⭐ Отзывов: {fb_res.count}\n\n"
-            f"🔗 Панель: https://aldan76.github.io/goszakup-bot/"
+            f"{format_summary(summary)}\n\n"
+            f"{scheduler.format_stats()}\n"
+            f"{faq_index.format_stats()}\n"
+            f"🛟 Режим: {degraded.check() or 'штатный'}, Claude: {llm_breaker.state}, "
+            f"ответов без LLM: {degraded.digest_answers}\n\n"
+            f"🔗 Панель: {ADMIN_PANEL_URL}"
         )
         await update.message.reply_text(text)
     except Exception as e:
         await update.message.reply_text(f"Ошибка: {e}")
 
 
+async def cost_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/cost [дней] — токены и стоимость Claude по дням, чатам и секциям (только для администратора)."""
+    if update.effective_chat.id != ADMIN_CHAT_ID:
+        return
+    try:
+        days = int(context.args[0]) if context.args else 7
+    except ValueError:
+        await update.message.reply_text("Использование: /cost [дней]")
+        return
+    try:
+        async with scheduler.slot(Priority.ADMIN, ADMIN_CHAT_ID):
+            report = await asyncio.to_thread(fetch_report, supabase, max(1, min(days, 90)))
+        await send_answer(update.message, format_cost(report))
+    except Exception as e:
+        await update.message.reply_text(f"Ошибка: {e}")
+
+
 async def handle_unknown(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обработка неизвестных команд."""
     await update.message.reply_text(
@@ -706,13 +922,87 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
 
 
 # ─── Запуск ───────────────────────────────────────────────────────────────────
+# BOT_MODE=polling — один процесс читает getUpdates (по умолчанию);
+# BOT_MODE=webhook — встроенный HTTP-сервер (webhook.py), можно держать
+#                    несколько реплик за балансировщиком.
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# Сколько обновлений обрабатывается одновременно (1 — строго по очереди)
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "1"))
+# Прогрев кэша промптов Anthropic при старте (платный запрос, см. rag.warmup)
+WARMUP_PRIME_CACHE = os.getenv("WARMUP_PRIME_CACHE", "0") == "1"
+
+
+async def warm_up() -> None:
+    """
+    Прогрев после старта (rag.warmup): первый вопрос не платит за импорт
+    клиентов, TLS-рукопожатия и чтение промпта. Идёт в фоне, пока бот
+    уже принимает обновления.
+    """
+    timings = await asyncio.to_thread(rag.warmup, WARMUP_PRIME_CACHE)
+    get_bot_messages()
+    errors = {k: v for k, v in timings.items() if k.endswith("_error")}
+    steps = ", ".join(f"{k}={v}с" for k, v in timings.items() if k not in errors)
+    logger.info(f"[warmup] Готово: {steps}")
+    for step, error in errors.items():
+        logger.warning(f"[warmup] {step}: {error}")
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """GET /metrics — REGISTRY в текстовом формате Prometheus."""
+    if METRICS_TOKEN:
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+            return Response(401, b"Unauthorized")
+    return Response(200, REGISTRY.render().encode("utf-8"), CONTENT_TYPE)
+
+
+async def post_init(app: Application) -> None:
+    """Фоновые задачи, которым нужен запущенный event loop."""
+    global metrics_server
+    ban_sync.start()
+    faq_sync.start()
+    usage_recorder.start()
+    loop_lag.start()
+    if BOT_MODE != "webhook" and METRICS_PORT:
+        metrics_server = HttpServer({("GET", "/metrics"): metrics_endpoint},
+                                    host=METRICS_HOST, port=METRICS_PORT)
+        await metrics_server.start()
+    if ADMIN_CHAT_ID:
+        degraded.alert = lambda text: app.bot.send_message(ADMIN_CHAT_ID, text)
+    app.create_task(warm_up())
+
+
+async def post_stop(app: Application) -> None:
+    # Бот ещё может отправлять сообщения — отвечаем на недосклеенные серии
+    await coalescer.stop()
+
+
+async def post_shutdown(app: Application) -> None:
+    await ban_sync.stop()
+    await faq_sync.stop()
+    await usage_recorder.stop()
+    await loop_lag.stop()
+    if metrics_server is not None:
+        await metrics_server.stop()
+
 
 def main() -> None:
     token = os.getenv("TELEGRAM_TOKEN")
     if not token:
         raise ValueError("TELEGRAM_TOKEN не задан в .env")
-
-    app = Application.builder().token(token).build()
+    # Клиенты создаются лениво (clients.py) — проверяем конфигурацию заранее
+    for name in ("ANTHROPIC_API_KEY", "SUPABASE_URL", "SUPABASE_KEY"):
+        require_env(name)
+
+    app = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(MAX_CONCURRENT_UPDATES)
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     # Загружаем список забаненных при старте
     load_banned_users()
@@ -726,16 +1016,27 @@ def main() -> None:
     app.add_handler(CommandHandler("ban",    ban_command))
     app.add_handler(CommandHandler("unban",  unban_command))
     app.add_handler(CommandHandler("stats",  admin_stats))
+    app.add_handler(CommandHandler("cost",   cost_command))
     app.add_handler(CallbackQueryHandler(handle_feedback, pattern=r"^(like|dislike)$"))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
     app.add_handler(MessageHandler(filters.COMMAND, handle_unknown))
     app.add_error_handler(error_handler)
 
+    if BOT_MODE == "webhook":
+        from webhook import run_webhook
+        routes = {}
+        if METRICS_TOKEN:
+            routes[("GET", "/metrics")] = metrics_endpoint
+        else:
+            # Порт webhook публичный — без токена метрики не отдаём
+            logger.warning("[metrics] METRICS_TOKEN не задан — /metrics в webhook-режиме отключён")
+        run_webhook(app, allowed_updates=Update.ALL_TYPES, routes=routes)
+        return
+
     logger.info("Бот запущен (polling)...")
     app.run_polling(allowed_updates=Update.ALL_TYPES)
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.set_event_loop(asyncio.new_event_loop())
     main()
@@ -2,16 +2,29 @@
 build_anchor_map.py
 Builds correct punkt->z_anchor and article->z_anchor maps from adilet.zan.kz,
 then updates chunks_all.json and Supabase with correct URLs.
+
+The maps are saved to data/anchor_map.json and loaded into AnchorIndex
+(sorted number->anchor arrays with bisect lookup). Re-fetching adilet
+is only needed when the documents change (--refetch).
+
+Usage:
+    python build_anchor_map.py --dry-run     # show URL diff vs Supabase, write nothing
+    python build_anchor_map.py               # relink JSON + one bulk update in Supabase
+    python build_anchor_map.py --refetch     # rebuild anchor_map.json from adilet first
 """
 
+import argparse
 import json
 import os
 import re
 import ssl
 import urllib.request
 import urllib.error
+from bisect import bisect_left
 from dotenv import load_dotenv
 
+from supabase_bulk import SupabaseBulkError, bulk_update_chunks, diff_column, fetch_chunk_columns, print_diff
+
 load_dotenv()
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -107,8 +120,46 @@ def save_maps(zakon_map, pravila_map):
     return data
 
 
+class AnchorIndex:
+    """Sorted number -> z_anchor arrays, built once from anchor_map.json."""
+
+    def __init__(self, mapping: dict):
+        items = sorted((int(k), v) for k, v in mapping.items())
+        self.keys = [k for k, _ in items]
+        self.anchors = [v for _, v in items]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def exact(self, num):
+        """Anchor for exactly this article/punkt number, or None."""
+        i = bisect_left(self.keys, int(num))
+        if i < len(self.keys) and self.keys[i] == int(num):
+            return self.anchors[i]
+        return None
+
+    def resolve_range(self, lo, hi=None):
+        """First anchored number in [lo, hi] (the start of a punkt range)."""
+        hi = lo if hi is None else hi
+        i = bisect_left(self.keys, int(lo))
+        if i < len(self.keys) and self.keys[i] <= int(hi):
+            return self.anchors[i]
+        return None
+
+
+def load_anchor_index(path=MAP_PATH):
+    """(zakon_index, pravila_index) from the saved anchor map."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return AnchorIndex(data["zakon_article_to_z"]), AnchorIndex(data["pravila_punkt_to_z"])
+
+
+def _as_index(anchor_map):
+    return anchor_map if isinstance(anchor_map, AnchorIndex) else AnchorIndex(anchor_map)
+
+
 def get_zakon_url(article_num, zakon_map):
-    z = zakon_map.get(article_num) or zakon_map.get(str(article_num))
+    z = _as_index(zakon_map).exact(article_num)
     if z:
         return f"{ZAKON_BASE}#{z}"
     return ZAKON_BASE
@@ -118,84 +169,72 @@ def get_pravila_url(punkt_range, chunk_id, pravila_map):
     if "pril" in chunk_id:
         return PRAVILA_BASE
     if punkt_range and isinstance(punkt_range, list):
-        first = punkt_range[0]
-        z = pravila_map.get(first) or pravila_map.get(str(first))
+        z = _as_index(pravila_map).resolve_range(punkt_range[0], punkt_range[-1])
         if z:
             return f"{PRAVILA_BASE}#{z}"
     return PRAVILA_BASE
 
 
-def update_json(zakon_map, pravila_map):
+def update_json(zakon_map, pravila_map, write=True):
     with open(CHUNKS_PATH, encoding="utf-8") as f:
         chunks = json.load(f)
 
+    zakon_index = _as_index(zakon_map)
+    pravila_index = _as_index(pravila_map)
+
     updated = 0
     for chunk in chunks:
         src = chunk.get("source_type")
         if src == "law":
             art = chunk.get("article_num")
             if art:
-                new_url = get_zakon_url(art, zakon_map)
+                new_url = get_zakon_url(art, zakon_index)
                 if new_url != chunk.get("official_url"):
                     chunk["official_url"] = new_url
                     updated += 1
         elif src == "rules":
-            new_url = get_pravila_url(chunk.get("punkt_range"), chunk.get("id", ""), pravila_map)
+            new_url = get_pravila_url(chunk.get("punkt_range"), chunk.get("id", ""), pravila_index)
             if new_url != chunk.get("official_url"):
                 chunk["official_url"] = new_url
                 updated += 1
 
-    with open(CHUNKS_PATH, "w", encoding="utf-8") as f:
-        json.dump(chunks, f, ensure_ascii=False, indent=2)
-
-    print(f"[OK] JSON updated: {updated} chunks got correct anchor URLs")
+    if write:
+        with open(CHUNKS_PATH, "w", encoding="utf-8") as f:
+            json.dump(chunks, f, ensure_ascii=False, indent=2)
+        print(f"[OK] JSON updated: {updated} chunks got correct anchor URLs")
+    else:
+        print(f"[DRY-RUN] JSON: {updated} chunks would get new anchor URLs")
     return chunks
 
 
-def update_supabase(chunks):
-    supabase_url = os.environ.get("SUPABASE_URL")
-    supabase_key = os.environ.get("SUPABASE_KEY")
-    if not supabase_url or not supabase_key:
-        print("[ERR] Missing SUPABASE_URL or SUPABASE_KEY")
+def update_supabase(chunks, dry_run=False):
+    """Relinks all law/rules chunks with one bulk update (only changed URLs)."""
+    to_update = [c for c in chunks if c.get("source_type") in ("law", "rules")]
+    try:
+        current = fetch_chunk_columns(("id", "official_url"))
+    except SupabaseBulkError as e:
+        print(f"[ERR] {e}")
         return
 
-    to_update = [c for c in chunks if c.get("source_type") in ("law", "rules")]
-    print(f"\nUpdating {len(to_update)} chunks in Supabase...")
-
-    ok = errors = 0
-    for chunk in to_update:
-        cid = chunk["id"]
-        url = chunk["official_url"]
-        payload = json.dumps({"official_url": url}).encode("utf-8")
-        req = urllib.request.Request(
-            f"{supabase_url}/rest/v1/chunks?id=eq.{cid}",
-            data=payload,
-            method="PATCH",
-            headers={
-                "Content-Type": "application/json",
-                "apikey": supabase_key,
-                "Authorization": f"Bearer {supabase_key}",
-                "Prefer": "return=minimal",
-            },
-        )
-        try:
-            with urllib.request.urlopen(req) as resp:
-                if resp.status in (200, 204):
-                    ok += 1
-                else:
-                    print(f"  [WARN] [{cid}] status {resp.status}")
-                    errors += 1
-        except urllib.error.HTTPError as e:
-            print(f"  [ERR] [{cid}] HTTP {e.code}: {e.read().decode()[:80]}")
-            errors += 1
-        except Exception as e:
-            print(f"  [ERR] [{cid}] {e}")
-            errors += 1
+    changes = diff_column(to_update, current, "official_url")
+    changes = [ch for ch in changes if ch["id"] in current]
+    print_diff(changes, "official_url")
+
+    if dry_run:
+        print("[DRY-RUN] Supabase not modified")
+        return
+    if not changes:
+        print("[OK] Supabase already up to date")
+        return
+
+    try:
+        updated = bulk_update_chunks([{"id": ch["id"], "official_url": ch["new"]} for ch in changes])
+    except SupabaseBulkError as e:
+        print(f"[ERR] Bulk update failed: {e}")
+        return
 
     print("=" * 50)
-    print(f"[OK] Success: {ok}/{len(to_update)}")
-    if errors:
-        print(f"[ERR] Errors: {errors}")
+    print(f"[OK] Success: {updated}/{len(changes)}")
 
 
 def preview(chunks):
@@ -207,7 +246,7 @@ def preview(chunks):
             shown += 1
 
 
-if __name__ == "__main__":
+def refetch_maps():
     print("Fetching Zakon page...")
     zakon_content = fetch_page(ZAKON_URL)
     print(f"  size: {len(zakon_content)} chars")
@@ -233,6 +272,24 @@ if __name__ == "__main__":
         z = pravila_map.get(p, "NOT FOUND")
         print(f"  Punkt {p} -> #{z} -> {PRAVILA_BASE}#{z}")
 
-    chunks = update_json(zakon_map, pravila_map)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Relink chunk URLs to adilet.zan.kz anchors")
+    parser.add_argument("--refetch", action="store_true",
+                        help="rebuild data/anchor_map.json from adilet pages")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print URL diff only, do not write JSON or Supabase")
+    parser.add_argument("--no-supabase", action="store_true",
+                        help="update chunks_all.json only")
+    args = parser.parse_args()
+
+    if args.refetch or not os.path.exists(MAP_PATH):
+        refetch_maps()
+
+    zakon_index, pravila_index = load_anchor_index()
+    print(f"[OK] Anchor index: {len(zakon_index)} articles, {len(pravila_index)} punkts")
+
+    chunks = update_json(zakon_index, pravila_index, write=not args.dry_run)
     preview(chunks)
-    update_supabase(chunks)
+    if not args.no_supabase:
+        update_supabase(chunks, dry_run=args.dry_run)
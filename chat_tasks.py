@@ -0,0 +1,112 @@
+"""
+chat_tasks.py — Учёт ответов «в работе» по чатам и их кооперативная отмена.
+
+Если пользователь задаёт следующий вопрос, пока бот ещё отвечает на
+предыдущий, раньше оба запроса доходили до конца: оба логировались и оба
+дописывали историю в произвольном порядке. ChatTaskTracker держит для
+каждого чата «билет» текущего ответа и применяет политику ANSWER_POLICY:
+
+  cancel (по умолчанию) — новый вопрос отменяет предыдущий: его билет
+          становится is_cancelled(), answer_question(should_cancel=...)
+          прерывает поиск/генерацию на ближайшей контрольной точке
+          (rag.AnswerCancelled), а бот не логирует и не отправляет ответ;
+  queue  — вопросы одного чата обрабатываются строго по очереди.
+
+answer_question выполняется в потоке (asyncio.to_thread), поэтому отмена
+кооперативная: is_cancelled() — простое чтение словаря, его безопасно
+вызывать из рабочего потока.
+
+Учёт — в памяти процесса. При нескольких репликах вопросы одного чата
+могут попасть на разные реплики; тогда они не отменяют друг друга.
+"""
+
+import asyncio
+import itertools
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+ANSWER_POLICY = os.getenv("ANSWER_POLICY", "cancel").lower()
+POLICIES = ("cancel", "queue")
+
+
+class AnswerTicket:
+    """Билет одного ответа. is_cancelled() — ответ уже никто не прочитает."""
+
+    def __init__(self, tracker: "ChatTaskTracker", chat_id, generation: int):
+        self._tracker = tracker
+        self.chat_id = chat_id
+        self.generation = generation
+
+    def is_cancelled(self) -> bool:
+        # Пока билет внутри track(), запись есть, если её не заменил новый вопрос
+        # и не удалил cancel()
+        return self._tracker._current.get(self.chat_id) != self.generation
+
+
+@dataclass
+class _Queue:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    users: int = 0
+
+
+class ChatTaskTracker:
+    """Не больше одного «живого» ответа на чат."""
+
+    def __init__(self, policy: str = ANSWER_POLICY):
+        if policy not in POLICIES:
+            raise ValueError(f"ANSWER_POLICY должна быть одной из {POLICIES}, получено {policy!r}")
+        self.policy = policy
+        # Глобальный счётчик: номер поколения не повторяется даже после очистки
+        self._generations = itertools.count(1)
+        self._current: dict = {}          # chat_id → поколение актуального ответа
+        self._queues: dict = {}           # chat_id → _Queue (политика queue)
+        self.cancelled = 0                # сколько ответов отменено (для логов/метрик)
+
+    def __len__(self) -> int:
+        """Число чатов, по которым сейчас готовится ответ."""
+        return len(self._current)
+
+    def active(self, chat_id) -> bool:
+        return chat_id in self._current
+
+    def cancel(self, chat_id) -> bool:
+        """Отменяет текущий ответ чата (например, по /clear)."""
+        if self._current.pop(chat_id, None) is None:
+            return False
+        self.cancelled += 1
+        return True
+
+    @asynccontextmanager
+    async def track(self, chat_id):
+        """
+        async with tracker.track(chat_id) as ticket: ...
+        При политике queue ждёт завершения предыдущего ответа этого чата.
+        """
+        queue = None
+        if self.policy == "queue":
+            queue = self._queues.setdefault(chat_id, _Queue())
+            queue.users += 1
+            try:
+                await queue.lock.acquire()
+            except BaseException:
+                self._leave(chat_id, queue)
+                raise
+        elif chat_id in self._current:
+            self.cancelled += 1
+
+        ticket = AnswerTicket(self, chat_id, next(self._generations))
+        self._current[chat_id] = ticket.generation
+        try:
+            yield ticket
+        finally:
+            if self._current.get(chat_id) == ticket.generation:
+                del self._current[chat_id]
+            if queue is not None:
+                queue.lock.release()
+                self._leave(chat_id, queue)
+
+    def _leave(self, chat_id, queue: _Queue) -> None:
+        queue.users -= 1
+        if not queue.users:
+            del self._queues[chat_id]
@@ -0,0 +1,491 @@
+"""
+chunk_store.py — Компактное бинарное хранилище чанков (mmap, zero-copy).
+
+Вместо json.load многомегабайтных data/chunks_*.json локальные индексы
+открывают один файл .gzcs через mmap: заголовок, таблица строк,
+массив записей фиксированной ширины и индекс по id. Текст чанка читается
+прямо из отображённой памяти — без разбора JSON и без копирования.
+
+Формат файла (little-endian):
+    Заголовок   — magic "GZCS", версия, число записей, смещения секций
+    Строки      — UTF-8 байты всех строк подряд (одинаковые строки хранятся один раз)
+    Записи      — N × RECORD_STRUCT: ссылки (offset, length) на строки,
+                  целые поля, битовая маска присутствия ключей
+    Индекс      — N × uint32: номера записей, отсортированные по id (bisect)
+
+Запуск:
+    python chunk_store.py build                      # все data/chunks_*.json → data/chunks.gzcs
+    python chunk_store.py build data/chunks_zakon.json -o data/zakon.gzcs
+    python chunk_store.py export data/chunks.gzcs -o chunks_roundtrip.json
+    python chunk_store.py get data/chunks.gzcs pravila_gl3
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+DEFAULT_STORE_PATH = os.path.join(DATA_DIR, "chunks.gzcs")
+
+# ─── Описание формата ─────────────────────────────────────────────────────────
+
+MAGIC = b"GZCS"
+VERSION = 1
+
+# magic, version, reserved, n_records, str_off, str_len, rec_off, idx_off
+HEADER_STRUCT = struct.Struct("<4sHHIQQQQ")
+
+# Строковые поля чанка (порядок = порядок ключей при обратной конвертации)
+STRING_FIELDS = (
+    "id", "document_short", "document_name", "source_type", "source_platform",
+    "chapter", "article_title", "official_url", "text",
+)
+# Целочисленные поля (None хранится как INT_NONE)
+INT_FIELDS = ("chapter_num", "article_num", "char_count")
+# punkt_range хранится как пара (от, до)
+RANGE_FIELD = "punkt_range"
+
+KNOWN_FIELDS = STRING_FIELDS + INT_FIELDS + (RANGE_FIELD,)
+
+# Ссылки на строки: STRING_FIELDS + extra (JSON остальных ключей)
+_N_STR_REFS = len(STRING_FIELDS) + 1
+# Целые: INT_FIELDS + punkt_range[0] + punkt_range[1]
+_N_INTS = len(INT_FIELDS) + 2
+
+RECORD_STRUCT = struct.Struct("<" + "II" * _N_STR_REFS + "i" * _N_INTS + "I")
+INDEX_ITEM = struct.Struct("<I")
+
+STR_NONE = 0xFFFFFFFF        # длина-маркер для None
+INT_NONE = -(2 ** 31)        # значение-маркер для None
+_EXTRA_REF = len(STRING_FIELDS)
+
+
+class ChunkStoreError(Exception):
+    """Повреждённый или несовместимый файл хранилища."""
+
+
+# ─── Запись ───────────────────────────────────────────────────────────────────
+
+class _StringTable:
+    """Таблица строк с дедупликацией одинаковых значений."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._seen: dict[str, tuple[int, int]] = {}
+
+    def add(self, value: str | None) -> tuple[int, int]:
+        if value is None:
+            return 0, STR_NONE
+        ref = self._seen.get(value)
+        if ref is None:
+            raw = value.encode("utf-8")
+            ref = (len(self._buf), len(raw))
+            self._buf += raw
+            self._seen[value] = ref
+        return ref
+
+    def getvalue(self) -> bytes:
+        return bytes(self._buf)
+
+
+def _pack_chunk(chunk: dict, strings: _StringTable) -> bytes:
+    """Упаковывает один чанк в запись фиксированной ширины."""
+    refs: list[int] = []
+    ints: list[int] = []
+    mask = 0
+    extra = {}
+
+    for bit, field in enumerate(STRING_FIELDS):
+        value = chunk.get(field)
+        if field in chunk and (value is None or isinstance(value, str)):
+            mask |= 1 << bit
+            refs.extend(strings.add(value))
+        else:
+            if field in chunk:
+                extra[field] = value
+            refs.extend((0, STR_NONE))
+
+    for i, field in enumerate(INT_FIELDS):
+        bit = len(STRING_FIELDS) + i
+        value = chunk.get(field)
+        ok = value is None or (
+            isinstance(value, int) and not isinstance(value, bool)
+            and INT_NONE < value < 2 ** 31
+        )
+        if field in chunk and ok:
+            mask |= 1 << bit
+            ints.append(INT_NONE if value is None else value)
+        else:
+            if field in chunk:
+                extra[field] = value
+            ints.append(INT_NONE)
+
+    bit = len(STRING_FIELDS) + len(INT_FIELDS)
+    value = chunk.get(RANGE_FIELD)
+    ok = value is None or (
+        isinstance(value, list) and len(value) == 2
+        and all(isinstance(v, int) and not isinstance(v, bool)
+                and INT_NONE < v < 2 ** 31 for v in value)
+    )
+    if RANGE_FIELD in chunk and ok:
+        mask |= 1 << bit
+        ints.extend((INT_NONE, INT_NONE) if value is None else value)
+    else:
+        if RANGE_FIELD in chunk:
+            extra[RANGE_FIELD] = value
+        ints.extend((INT_NONE, INT_NONE))
+
+    for key, val in chunk.items():
+        if key not in KNOWN_FIELDS:
+            extra[key] = val
+
+    if extra:
+        refs.extend(strings.add(json.dumps(extra, ensure_ascii=False)))
+    else:
+        refs.extend((0, STR_NONE))
+
+    return RECORD_STRUCT.pack(*refs, *ints, mask)
+
+
+def write_store(chunks: list[dict], out_path: str) -> int:
+    """
+    Записывает список чанков в бинарный файл хранилища.
+    Возвращает размер файла в байтах.
+    """
+    strings = _StringTable()
+    records = [_pack_chunk(c, strings) for c in chunks]
+
+    # Индекс: номера записей, отсортированные по байтам id (стабильно — дубли
+    # id из разных файлов остаются в исходном порядке)
+    def id_key(i: int) -> bytes:
+        cid = chunks[i].get("id")
+        return cid.encode("utf-8") if isinstance(cid, str) else b""
+
+    order = sorted(range(len(chunks)), key=id_key)
+
+    str_blob = strings.getvalue()
+    str_off = HEADER_STRUCT.size
+    rec_off = str_off + len(str_blob)
+    idx_off = rec_off + RECORD_STRUCT.size * len(records)
+
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER_STRUCT.pack(
+            MAGIC, VERSION, 0, len(records),
+            str_off, len(str_blob), rec_off, idx_off,
+        ))
+        f.write(str_blob)
+        for rec in records:
+            f.write(rec)
+        for i in order:
+            f.write(INDEX_ITEM.pack(i))
+    os.replace(tmp_path, out_path)
+    return os.path.getsize(out_path)
+
+
+# ─── Чтение ───────────────────────────────────────────────────────────────────
+
+class ChunkRecord:
+    """Лёгкое представление одной записи: поля читаются из mmap по запросу."""
+
+    __slots__ = ("_store", "_fields")
+
+    def __init__(self, store: "ChunkStore", fields: tuple):
+        self._store = store
+        self._fields = fields
+
+    def _str_ref(self, n: int) -> tuple[int, int]:
+        return self._fields[2 * n], self._fields[2 * n + 1]
+
+    def _present(self, bit: int) -> bool:
+        return bool(self._fields[-1] & (1 << bit))
+
+    def view(self, field: str) -> memoryview | None:
+        """Zero-copy доступ к UTF-8 байтам строкового поля."""
+        off, length = self._str_ref(STRING_FIELDS.index(field))
+        if length == STR_NONE:
+            return None
+        return self._store._strings[off:off + length]
+
+    def get(self, field: str, default=None):
+        """Значение поля как в исходном JSON (default — если ключа не было)."""
+        if field in STRING_FIELDS:
+            bit = STRING_FIELDS.index(field)
+            if not self._present(bit):
+                return self._extra().get(field, default)
+            mv = self.view(field)
+            return None if mv is None else str(mv, "utf-8")
+
+        if field in INT_FIELDS:
+            i = INT_FIELDS.index(field)
+            if not self._present(len(STRING_FIELDS) + i):
+                return self._extra().get(field, default)
+            value = self._fields[2 * _N_STR_REFS + i]
+            return None if value == INT_NONE else value
+
+        if field == RANGE_FIELD:
+            if not self._present(len(STRING_FIELDS) + len(INT_FIELDS)):
+                return self._extra().get(field, default)
+            lo = self._fields[2 * _N_STR_REFS + len(INT_FIELDS)]
+            hi = self._fields[2 * _N_STR_REFS + len(INT_FIELDS) + 1]
+            return None if lo == INT_NONE else [lo, hi]
+
+        return self._extra().get(field, default)
+
+    def __getitem__(self, field: str):
+        sentinel = object()
+        value = self.get(field, sentinel)
+        if value is sentinel:
+            raise KeyError(field)
+        return value
+
+    @property
+    def id(self) -> str | None:
+        return self.get("id")
+
+    @property
+    def text(self) -> str | None:
+        return self.get("text")
+
+    def _extra(self) -> dict:
+        off, length = self._str_ref(_EXTRA_REF)
+        if length == STR_NONE:
+            return {}
+        return json.loads(str(self._store._strings[off:off + length], "utf-8"))
+
+    def to_dict(self) -> dict:
+        """Восстанавливает чанк в виде dict (как после json.load)."""
+        result = {}
+        extra = self._extra()
+        for bit, field in enumerate(KNOWN_FIELDS):
+            if self._present(bit):
+                result[field] = self.get(field)
+            elif field in extra:
+                result[field] = extra[field]
+        for key, val in extra.items():
+            if key not in result:
+                result[key] = val
+        return result
+
+    def __repr__(self):
+        return f"ChunkRecord(id={self.id!r})"
+
+
+class ChunkStore:
+    """
+    Хранилище чанков, открытое через mmap (только чтение).
+
+        with ChunkStore.open("data/chunks.gzcs") as store:
+            rec = store.get("pravila_gl3")
+            print(rec.text)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            self._file.close()
+            raise ChunkStoreError(f"Пустой или нечитаемый файл: {path}") from e
+
+        if len(self._mm) < HEADER_STRUCT.size:
+            self.close()
+            raise ChunkStoreError(f"Файл слишком короткий: {path}")
+        (magic, version, _, n, str_off, str_len,
+         rec_off, idx_off) = HEADER_STRUCT.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ChunkStoreError(f"Не файл хранилища чанков: {path}")
+        if version != VERSION:
+            self.close()
+            raise ChunkStoreError(f"Неподдерживаемая версия {version}: {path}")
+        if idx_off + INDEX_ITEM.size * n > len(self._mm):
+            self.close()
+            raise ChunkStoreError(f"Файл обрезан: {path}")
+
+        self._n = n
+        self._view = memoryview(self._mm)
+        self._strings = self._view[str_off:str_off + str_len]
+        self._rec_off = rec_off
+        self._idx_off = idx_off
+
+    @classmethod
+    def open(cls, path: str = DEFAULT_STORE_PATH) -> "ChunkStore":
+        return cls(path)
+
+    def close(self) -> None:
+        for attr in ("_strings", "_view"):
+            mv = getattr(self, attr, None)
+            if mv is not None:
+                mv.release()
+                setattr(self, attr, None)
+        if getattr(self, "_mm", None) is not None and not self._mm.closed:
+            try:
+                self._mm.close()
+            except BufferError:
+                # Снаружи ещё живут memoryview из view() — mmap закроет GC
+                pass
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i: int) -> ChunkRecord:
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        fields = RECORD_STRUCT.unpack_from(self._mm, self._rec_off + i * RECORD_STRUCT.size)
+        return ChunkRecord(self, fields)
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield self[i]
+
+    # ─── Поиск по id ──────────────────────────────────────────────────────────
+
+    def _index_at(self, pos: int) -> int:
+        return INDEX_ITEM.unpack_from(self._mm, self._idx_off + pos * INDEX_ITEM.size)[0]
+
+    def _id_bytes(self, rec_no: int) -> bytes:
+        off, length = struct.unpack_from(
+            "<II", self._mm, self._rec_off + rec_no * RECORD_STRUCT.size
+        )
+        if length == STR_NONE:
+            return b""
+        return bytes(self._strings[off:off + length])
+
+    def _lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._id_bytes(self._index_at(mid)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def get_all(self, chunk_id: str) -> list[ChunkRecord]:
+        """Все записи с данным id (один чанк может быть в нескольких файлах)."""
+        key = chunk_id.encode("utf-8")
+        pos = self._lower_bound(key)
+        found = []
+        while pos < self._n:
+            rec_no = self._index_at(pos)
+            if self._id_bytes(rec_no) != key:
+                break
+            found.append(self[rec_no])
+            pos += 1
+        return found
+
+    def get(self, chunk_id: str) -> ChunkRecord | None:
+        """Первая запись с данным id или None."""
+        found = self.get_all(chunk_id)
+        return found[0] if found else None
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return self.get(chunk_id) is not None
+
+    def to_list(self) -> list[dict]:
+        return [rec.to_dict() for rec in self]
+
+
+# ─── Конвертеры JSON ⇄ хранилище ──────────────────────────────────────────────
+
+def default_json_paths() -> list[str]:
+    return [str(p) for p in sorted(Path(DATA_DIR).glob("chunks_*.json"))]
+
+
+def read_json_chunks(json_paths: list[str]) -> list[dict]:
+    """Чанки из JSON-файлов одним списком, в порядке файлов."""
+    chunks: list[dict] = []
+    for path in json_paths:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ChunkStoreError(f"Ожидался JSON-массив чанков: {path}")
+        chunks.extend(data)
+    return chunks
+
+
+def json_to_store(json_paths: list[str], out_path: str = DEFAULT_STORE_PATH) -> int:
+    """Склеивает чанки из JSON-файлов в один файл хранилища. Возвращает кол-во чанков."""
+    chunks = read_json_chunks(json_paths)
+    write_store(chunks, out_path)
+    return len(chunks)
+
+
+def store_to_json(store_path: str, out_path: str) -> int:
+    """Выгружает хранилище обратно в JSON (тот же формат, что data/chunks_*.json)."""
+    with ChunkStore.open(store_path) as store:
+        chunks = store.to_list()
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(chunks, f, ensure_ascii=False, indent=2)
+    return len(chunks)
+
+
+def load_chunks(path: str) -> list[dict]:
+    """Загружает чанки из .gzcs или .json — по расширению файла."""
+    if path.endswith(".gzcs"):
+        with ChunkStore.open(path) as store:
+            return store.to_list()
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бинарное хранилище чанков (mmap)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_build = sub.add_parser("build", help="JSON → .gzcs")
+    p_build.add_argument("inputs", nargs="*", help="JSON-файлы (по умолчанию data/chunks_*.json)")
+    p_build.add_argument("-o", "--output", default=DEFAULT_STORE_PATH)
+
+    p_export = sub.add_parser("export", help=".gzcs → JSON")
+    p_export.add_argument("store")
+    p_export.add_argument("-o", "--output", required=True)
+
+    p_get = sub.add_parser("get", help="Показать чанк по id")
+    p_get.add_argument("store")
+    p_get.add_argument("chunk_id")
+
+    args = parser.parse_args()
+
+    if args.cmd == "build":
+        inputs = args.inputs or default_json_paths()
+        json_size = sum(os.path.getsize(p) for p in inputs)
+        n = json_to_store(inputs, args.output)
+        size = os.path.getsize(args.output)
+        print(f"[OK] {n} чанков из {len(inputs)} файлов → {args.output}")
+        print(f"     JSON: {json_size / 1024:.0f} KB, хранилище: {size / 1024:.0f} KB")
+    elif args.cmd == "export":
+        n = store_to_json(args.store, args.output)
+        print(f"[OK] {n} чанков → {args.output}")
+    elif args.cmd == "get":
+        with ChunkStore.open(args.store) as store:
+            found = store.get_all(args.chunk_id)
+            if not found:
+                print(f"[ERR] Чанк не найден: {args.chunk_id}")
+                return 1
+            for rec in found:
+                print(json.dumps(rec.to_dict(), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,145 +2,228 @@
 clean_obsolete.py — Очищает чанки от строк с «Исключен», «утратил силу», «Сноска.»
 и перезаписывает JSON + обновляет Supabase.
 
-Правило: при каждом добавлении нового документа запускать эту чистку.
+Правило: при каждом добавлении нового документа запускать эту чистку
+(она же — стадия "clean" в ingest.py).
+
+Все паттерны собраны в одно регулярное выражение, которое за один проход
+вырезает устаревшие строки из всего текста чанка. Файлы обрабатываются
+параллельно, изменения уходят в Supabase одним пакетным RPC
+(bulk_update_chunks из supabase_bulk.sql), а список удалённых строк
+по каждому чанку можно сохранить в JSON-отчёт.
+
+Запуск:
+    python clean_obsolete.py                          # стандартный набор файлов
+    python clean_obsolete.py --dry-run --report obsolete_report.json
+    python clean_obsolete.py data/chunks_pitanie.json --no-supabase
 """
-import sys
+import argparse
 import json
-import re
-import urllib.request
-import urllib.error
 import os
-import time
-
-sys.stdout.reconfigure(encoding='utf-8')
-
-BASE = r"C:\Users\fazyl\Documents\Project1\goszakup-bot"
-
-# Загружаем .env
-env = {}
-with open(os.path.join(BASE, '.env'), encoding='utf-8') as f:
-    for line in f:
-        line = line.strip()
-        if line and not line.startswith('#') and '=' in line:
-            k, v = line.split('=', 1)
-            env[k.strip()] = v.strip()
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 
-SUPABASE_URL = env['SUPABASE_URL']
-SUPABASE_KEY = env['SUPABASE_KEY']
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
 
 # ─── Паттерны строк для удаления ──────────────────────────────────────────────
-# Строки, которые целиком удаляем (не весь чанк, только эту строку)
-LINE_DELETE_PATTERNS = re.compile(
-    r'исключ[её]н\b.*?(?:приказ|постановление|закон)'  # "Исключен приказом..."
-    r'|утратил[аи]?\s+силу'                             # "утратил силу"
-    r'|признан[аы]?\s+утратив'                         # "признан утратившим силу"
-    r'|^сноска\.\s+'                                    # "Сноска. Пункт X – в редакции..."
-    r'|^примечание\.\s+приложение\s+\d+\s*[-–]',       # "Примечание. Приложение N - в редакции"
-    re.IGNORECASE
+# Строки, которые целиком удаляем (не весь чанк, только эту строку).
+# [^\S\n] — пробел без перевода строки: совпадение не должно захватывать
+# соседнюю строку, так как выражение применяется ко всему тексту сразу.
+
+# Маркер может стоять в любом месте строки
+_INLINE_PATTERNS = [
+    r'исключ[её]н\b.*?(?:приказ|постановление|закон)',  # "Исключен приказом..."
+    r'утратил[аи]?[^\S\n]+силу',                        # "утратил силу"
+    r'признан[аы]?[^\S\n]+утратив',                     # "признан утратившим силу"
+]
+# Маркер стоит в начале строки
+_LEADING_PATTERNS = [
+    r'сноска\.[^\S\n]+',                                # "Сноска. Пункт X – в редакции..."
+    r'примечание\.[^\S\n]+приложение[^\S\n]+\d+[^\S\n]*[-–]',  # "Примечание. Приложение N - в редакции"
+]
+
+OBSOLETE_LINE_RE = re.compile(
+    r'^[^\S\n]*(?:'
+    + "|".join(_LEADING_PATTERNS)
+    + r'|[^\n]*?(?:' + "|".join(_INLINE_PATTERNS) + r'))'
+    r'[^\n]*(?:\n|\Z)',
+    re.IGNORECASE | re.MULTILINE,
 )
 
 FILES = [
-    (f"{BASE}\\data\\chunks_zakon.json",    "Закон"),
-    (f"{BASE}\\data\\chunks_pravila.json",  "Правила №678"),
-    (f"{BASE}\\data\\chunks_reestrov.json", "Правила реестров №646"),
-    (f"{BASE}\\data\\chunks_ktp.json",      "Правила КТП №327"),
-    (f"{BASE}\\data\\chunks_dvc.json",      "Методика ДВЦ №260"),
+    (os.path.join(DATA_DIR, "chunks_zakon.json"),    "Закон"),
+    (os.path.join(DATA_DIR, "chunks_pravila.json"),  "Правила №678"),
+    (os.path.join(DATA_DIR, "chunks_reestrov.json"), "Правила реестров №646"),
+    (os.path.join(DATA_DIR, "chunks_ktp.json"),      "Правила КТП №327"),
+    (os.path.join(DATA_DIR, "chunks_dvc.json"),      "Методика ДВЦ №260"),
 ]
 
 
+def clean_chunk_text_lines(text: str) -> tuple[str, list[str]]:
+    """
+    Удаляет из текста строки с устаревшими нормами.
+    Возвращает (очищенный текст, список удалённых строк).
+    """
+    removed: list[str] = []
+
+    def _drop(m: re.Match) -> str:
+        removed.append(m.group(0).strip())
+        return ""
+
+    cleaned = OBSOLETE_LINE_RE.sub(_drop, text)
+    if not removed:
+        return text, removed
+    return cleaned.strip(), removed
+
+
 def clean_chunk_text(text: str) -> tuple[str, int]:
     """
     Удаляет из текста строки с устаревшими нормами.
     Возвращает (очищенный текст, кол-во удалённых строк).
     """
-    lines = text.split('\n')
-    cleaned = []
-    removed = 0
-    for line in lines:
-        if LINE_DELETE_PATTERNS.search(line.strip()):
-            removed += 1
-        else:
-            cleaned.append(line)
-    return '\n'.join(cleaned).strip(), removed
-
-
-def update_supabase(chunk_id: str, new_text: str, new_char_count: int):
-    """Обновляет текст чанка в Supabase через PATCH."""
-    body = json.dumps({
-        "text": new_text,
-        "char_count": new_char_count,
-    }).encode('utf-8')
-
-    url = f"{SUPABASE_URL}/rest/v1/chunks?id=eq.{urllib.request.quote(chunk_id)}"
-    req = urllib.request.Request(
-        url,
-        data=body,
-        method='PATCH',
-        headers={
-            'Content-Type': 'application/json',
-            'apikey': SUPABASE_KEY,
-            'Authorization': f'Bearer {SUPABASE_KEY}',
-            'Prefer': 'return=minimal',
-        }
-    )
-    with urllib.request.urlopen(req) as resp:
-        return resp.status
-
+    cleaned, removed = clean_chunk_text_lines(text)
+    return cleaned, len(removed)
 
-def main():
-    print("=" * 60)
-    print("Чистка устаревших норм из базы знаний")
-    print("=" * 60)
 
-    total_chunks_cleaned = 0
-    total_lines_removed = 0
+def clean_file(fpath: str, write: bool = True) -> dict:
+    """
+    Чистит один JSON-файл чанков (выполняется в отдельном процессе).
+    Возвращает отчёт: {"file", "chunks", "cleaned": [{"id", "removed_lines", "text", "char_count"}]}.
+    """
+    with open(fpath, 'r', encoding='utf-8') as f:
+        chunks = json.load(f)
 
-    for fpath, label in FILES:
-        with open(fpath, 'r', encoding='utf-8') as f:
-            chunks = json.load(f)
+    cleaned = []
+    for c in chunks:
+        new_text, removed = clean_chunk_text_lines(c.get('text') or '')
+        if removed:
+            c['text'] = new_text
+            c['char_count'] = len(new_text)
+            cleaned.append({
+                "id": c['id'],
+                "title": (c.get('article_title') or c.get('chapter') or '')[:80],
+                "removed_lines": removed,
+                "text": new_text,
+                "char_count": len(new_text),
+            })
+
+    if cleaned and write:
+        with open(fpath, 'w', encoding='utf-8') as f:
+            json.dump(chunks, f, ensure_ascii=False, indent=2)
+
+    return {"file": fpath, "chunks": len(chunks), "cleaned": cleaned}
+
+
+def clean_files(paths: list[str], workers: int | None = None, write: bool = True) -> list[dict]:
+    """Чистит файлы параллельно. Порядок результатов совпадает с порядком paths."""
+    if len(paths) <= 1 or workers == 1:
+        return [clean_file(p, write) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(clean_file, paths, [write] * len(paths)))
+
+
+def collect_updates(results: list[dict]) -> list[dict]:
+    """Изменения для bulk_update_chunks (один id — одна запись)."""
+    updates: dict[str, dict] = {}
+    for res in results:
+        for item in res["cleaned"]:
+            updates[item["id"]] = {
+                "id": item["id"],
+                "text": item["text"],
+                "char_count": item["char_count"],
+            }
+    return list(updates.values())
+
+
+def build_report(results: list[dict]) -> dict:
+    """Машиночитаемый отчёт: какие строки удалены из каких чанков."""
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "pattern": OBSOLETE_LINE_RE.pattern,
+        "files": [
+            {
+                "file": os.path.relpath(res["file"], BASE_DIR),
+                "chunks": res["chunks"],
+                "chunks_cleaned": len(res["cleaned"]),
+                "lines_removed": sum(len(i["removed_lines"]) for i in res["cleaned"]),
+                "cleaned": [
+                    {"id": i["id"], "removed_lines": i["removed_lines"]}
+                    for i in res["cleaned"]
+                ],
+            }
+            for res in results
+        ],
+        "total_chunks_cleaned": sum(len(r["cleaned"]) for r in results),
+        "total_lines_removed": sum(
+            len(i["removed_lines"]) for r in results for i in r["cleaned"]
+        ),
+    }
+
+
+def write_back_supabase(updates: list[dict]) -> None:
+    """Отправляет все изменения в Supabase одним пакетным RPC."""
+    from supabase_bulk import SupabaseBulkError, bulk_update_chunks
+
+    try:
+        updated = bulk_update_chunks(updates)
+        print(f"  Supabase: обновлено {updated}/{len(updates)} чанков одним запросом")
+    except SupabaseBulkError as e:
+        print(f"  Supabase ERROR: {e}")
 
-        print(f"\n--- {label} ({len(chunks)} чанков) ---")
-        changed = False
 
-        for c in chunks:
-            original_text = c['text']
-            new_text, removed = clean_chunk_text(original_text)
+def main():
+    sys.stdout.reconfigure(encoding='utf-8')
 
-            if removed > 0:
-                c['text'] = new_text
-                c['char_count'] = len(new_text)
-                total_chunks_cleaned += 1
-                total_lines_removed += removed
-                changed = True
+    parser = argparse.ArgumentParser(description="Чистка устаревших норм из базы знаний")
+    parser.add_argument("inputs", nargs="*", help="JSON-файлы (по умолчанию FILES)")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов")
+    parser.add_argument("--report", help="сохранить JSON-отчёт об удалённых строках")
+    parser.add_argument("--dry-run", action="store_true", help="ничего не записывать")
+    parser.add_argument("--no-supabase", action="store_true", help="только JSON")
+    args = parser.parse_args()
 
-                title = (c.get('article_title') or c.get('chapter', ''))[:55]
-                print(f"  ОЧИЩЕНО [{c['id']}] {title}")
-                print(f"    Удалено строк: {removed}")
+    paths = args.inputs or [p for p, _ in FILES]
+    labels = {p: label for p, label in FILES}
 
-                # Обновляем Supabase
-                try:
-                    status = update_supabase(c['id'], new_text, c['char_count'])
-                    print(f"    Supabase: HTTP {status} OK")
-                except Exception as e:
-                    print(f"    Supabase ERROR: {e}")
+    print("=" * 60)
+    print("Чистка устаревших норм из базы знаний")
+    print("=" * 60)
 
-                time.sleep(0.15)
+    results = clean_files(paths, workers=args.workers, write=not args.dry_run)
 
-        if not changed:
+    for res in results:
+        label = labels.get(res["file"], os.path.basename(res["file"]))
+        print(f"\n--- {label} ({res['chunks']} чанков) ---")
+        if not res["cleaned"]:
             print("  OK — нечего чистить")
-        else:
-            # Перезаписываем JSON
-            with open(fpath, 'w', encoding='utf-8') as f:
-                json.dump(chunks, f, ensure_ascii=False, indent=2)
-            print(f"  JSON обновлён: {fpath.split(chr(92))[-1]}")
+            continue
+        for item in res["cleaned"]:
+            print(f"  ОЧИЩЕНО [{item['id']}] {item['title'][:55]}")
+            print(f"    Удалено строк: {len(item['removed_lines'])}")
+        if not args.dry_run:
+            print(f"  JSON обновлён: {os.path.basename(res['file'])}")
+
+    report = build_report(results)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nОтчёт: {args.report}")
+
+    updates = collect_updates(results)
+    if updates and not args.dry_run and not args.no_supabase:
+        write_back_supabase(updates)
 
     print(f"\n{'='*60}")
     print(f"ИТОГО:")
-    print(f"  Чанков очищено: {total_chunks_cleaned}")
-    print(f"  Строк удалено:  {total_lines_removed}")
+    print(f"  Чанков очищено: {report['total_chunks_cleaned']}")
+    print(f"  Строк удалено:  {report['total_lines_removed']}")
     print('='*60)
-    if total_chunks_cleaned == 0:
+    if report['total_chunks_cleaned'] == 0:
         print("Все чанки чистые — ничего не требовалось удалять.")
+    elif args.dry_run:
+        print("DRY-RUN: JSON и Supabase не изменялись.")
     else:
         print("Чистка завершена. Supabase и JSON обновлены.")
 
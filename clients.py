@@ -0,0 +1,85 @@
+"""
+clients.py — Ленивые потокобезопасные клиенты Anthropic и Supabase.
+
+Раньше `import rag` сразу создавал оба клиента: импорт пакетов anthropic
+и supabase занимает ~2 сек, а без ANTHROPIC_API_KEY/SUPABASE_URL модуль
+падал с KeyError — вместе с bot.py и любым скриптом, который его
+импортирует. Теперь:
+
+    get_anthropic() / get_supabase() — клиент создаётся при первом вызове
+        (double-checked lock: answer_question работает в нескольких потоках
+        asyncio.to_thread, клиент создаётся ровно один раз);
+    LazyClient(factory) — прокси с тем же интерфейсом: `supabase.table(...)`
+        в существующем коде работает без изменений, а `from rag import
+        supabase` ничего не создаёт.
+
+Прогрев соединений — rag.warmup() (вызывается ботом после старта),
+замер холодного старта — bench_startup.py.
+"""
+
+import os
+import threading
+
+_lock = threading.Lock()
+_clients: dict = {}
+
+
+class MissingConfigError(RuntimeError):
+    """Не задана обязательная переменная окружения."""
+
+
+def require_env(name: str) -> str:
+    value = os.getenv(name)
+    if not value:
+        raise MissingConfigError(f"{name} не задан в .env")
+    return value
+
+
+def _get(name: str, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+
+def _create_anthropic():
+    from anthropic import Anthropic
+    return Anthropic(api_key=require_env("ANTHROPIC_API_KEY"))
+
+
+def _create_supabase():
+    from supabase import create_client
+    from metrics import instrument_rpc
+    # Задержка .rpc(...).execute() по имени функции — в /metrics
+    return instrument_rpc(create_client(require_env("SUPABASE_URL"), require_env("SUPABASE_KEY")))
+
+
+def get_anthropic():
+    return _get("anthropic", _create_anthropic)
+
+
+def get_supabase():
+    return _get("supabase", _create_supabase)
+
+
+def initialized(name: str) -> bool:
+    """Создан ли уже клиент ("anthropic" / "supabase")."""
+    return name in _clients
+
+
+class LazyClient:
+    """Прокси: атрибуты берутся у клиента, созданного при первом обращении."""
+
+    __slots__ = ("_factory",)
+
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
+    def __repr__(self) -> str:
+        return f"<LazyClient {self._factory.__name__}>"
@@ -65,6 +65,34 @@ class ConversationContext:
         self.confidence_score = 0.0
         self.conversation_history = []
     
+    def to_dict(self) -> dict:
+        """Serialize for the shared state backend (last 10 history entries)"""
+        return {
+            'user_id': self.user_id,
+            'platform': self.platform,
+            'topic': self.topic,
+            'last_updated': self.last_updated.isoformat(),
+            'confidence_score': self.confidence_score,
+            'conversation_history': [
+                {**item, 'timestamp': item['timestamp'].isoformat()}
+                for item in self.conversation_history[-10:]
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ConversationContext":
+        """Restore context saved by to_dict()"""
+        ctx = cls(data['user_id'])
+        ctx.platform = data.get('platform')
+        ctx.topic = data.get('topic')
+        ctx.last_updated = datetime.fromisoformat(data['last_updated'])
+        ctx.confidence_score = data.get('confidence_score', 0.0)
+        ctx.conversation_history = [
+            {**item, 'timestamp': datetime.fromisoformat(item['timestamp'])}
+            for item in data.get('conversation_history', [])
+        ]
+        return ctx
+
     def __repr__(self):
         return (f"ConversationContext(platform={self.platform}, topic={self.topic}, "
                 f"confidence={self.confidence_score:.1f})")
@@ -0,0 +1,286 @@
+"""
+dedup_index.py — Поиск и схлопывание почти-дубликатов чанков (MinHash).
+
+Один и тот же текст закона лежит в нескольких файлах (chunks_all.json и
+chunks_pravila.json / chunks_zakon.json, три варианта chunks_conflicting_norms*,
+chunks_conflict.json), а при ответе на вопрос нормы закона и конфликтующие нормы
+склеиваются в один контекст. Модуль решает обе задачи:
+
+  1. При загрузке — DedupIndex строит MinHash-скетчи (bottom-k) по словесным
+     шинглам, находит кластеры почти-дубликатов и схлопывает их (стадия
+     dedup в ingest.py перед сборкой data/chunks.gzcs).
+  2. При ответе — drop_near_duplicates() убирает повторяющиеся чанки перед
+     сборкой контекста для Claude, чтобы не платить за лишние входные токены.
+
+Запуск:
+    python dedup_index.py report                       # все data/chunks_*.json
+    python dedup_index.py report --threshold 0.9 data/chunks_conflict*.json
+    python dedup_index.py collapse -o data/chunks_dedup.json
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import re
+import sys
+from collections import defaultdict
+
+# ─── Параметры ────────────────────────────────────────────────────────────────
+
+SHINGLE_SIZE = 4            # шингл = 4 слова подряд
+SKETCH_SIZE = 128           # k в bottom-k MinHash
+DEFAULT_THRESHOLD = 0.8     # оценка Jaccard, начиная с которой чанки — дубли
+QUERY_CONTAINMENT = 0.9     # доля шинглов короткого чанка, содержащихся в длинном
+
+_WORD_RE = re.compile(r"\w+")
+
+
+# ─── Шинглы и скетчи ──────────────────────────────────────────────────────────
+
+def _tokens(text: str) -> list[str]:
+    return _WORD_RE.findall((text or "").lower().replace("ё", "е"))
+
+
+def _hash(value: str) -> int:
+    # Стабильный 64-битный хэш (встроенный hash() солится на каждый процесс)
+    return int.from_bytes(
+        hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+def shingle_hashes(text: str, k: int = SHINGLE_SIZE) -> set[int]:
+    """Множество хэшей словесных k-шинглов текста."""
+    words = _tokens(text)
+    if not words:
+        return set()
+    if len(words) <= k:
+        return {_hash(" ".join(words))}
+    return {_hash(" ".join(words[i:i + k])) for i in range(len(words) - k + 1)}
+
+
+def minhash_sketch(shingles: set[int], size: int = SKETCH_SIZE) -> tuple[int, ...]:
+    """Bottom-k скетч: size наименьших хэшей шинглов (отсортированы)."""
+    return tuple(heapq.nsmallest(size, shingles))
+
+
+def estimate_jaccard(a: tuple[int, ...], b: tuple[int, ...],
+                     size: int = SKETCH_SIZE) -> float:
+    """Оценка сходства Жаккара по двум bottom-k скетчам."""
+    if not a or not b:
+        return 0.0
+    union_k = heapq.nsmallest(size, set(a) | set(b))
+    both = set(a) & set(b)
+    return sum(1 for h in union_k if h in both) / len(union_k)
+
+
+def chunk_text(chunk: dict) -> str:
+    """Текст, по которому сравниваются чанки (заголовок + тело)."""
+    return f"{chunk.get('article_title') or ''}\n{chunk.get('text') or ''}"
+
+
+# ─── Индекс для загрузки ──────────────────────────────────────────────────────
+
+class DedupIndex:
+    """
+    Индекс почти-дубликатов по MinHash-скетчам.
+
+    Кандидаты в дубли ищутся через инвертированный индекс значений скетча
+    (чанки, у которых совпадает достаточно минимальных хэшей), затем
+    сходство уточняется оценкой Жаккара — без полного перебора пар.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD,
+                 sketch_size: int = SKETCH_SIZE):
+        self.threshold = threshold
+        self.sketch_size = sketch_size
+        self.keys: list[str] = []
+        self.sketches: list[tuple[int, ...]] = []
+        self._postings: dict[int, list[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: str, text: str) -> int:
+        """Добавляет текст под ключом key. Возвращает номер в индексе."""
+        doc_no = len(self.keys)
+        sketch = minhash_sketch(shingle_hashes(text), self.sketch_size)
+        self.keys.append(key)
+        self.sketches.append(sketch)
+        for h in sketch:
+            self._postings[h].append(doc_no)
+        return doc_no
+
+    def _candidates(self, doc_no: int) -> dict[int, int]:
+        shared: dict[int, int] = defaultdict(int)
+        for h in self.sketches[doc_no]:
+            for other in self._postings[h]:
+                if other > doc_no:
+                    shared[other] += 1
+        return shared
+
+    def similar_pairs(self) -> list[tuple[int, int, float]]:
+        """Все пары (i, j, сходство) с оценкой Жаккара >= threshold."""
+        # Пара с Жаккаром J делит в среднем не меньше ~J·k/2 значений скетча
+        min_shared = max(1, int(self.sketch_size * self.threshold / 2))
+        pairs = []
+        for i in range(len(self.keys)):
+            for j, shared in self._candidates(i).items():
+                small = min(len(self.sketches[i]), len(self.sketches[j]))
+                if shared < min(min_shared, small):
+                    continue
+                sim = estimate_jaccard(self.sketches[i], self.sketches[j], self.sketch_size)
+                if sim >= self.threshold:
+                    pairs.append((i, j, sim))
+        return pairs
+
+    def clusters(self) -> list[list[int]]:
+        """Кластеры почти-дубликатов (только размером > 1), порядок — по добавлению."""
+        parent = list(range(len(self.keys)))
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for i, j, _ in self.similar_pairs():
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+
+        groups: dict[int, list[int]] = defaultdict(list)
+        for i in range(len(self.keys)):
+            groups[find(i)].append(i)
+        return [g for g in groups.values() if len(g) > 1]
+
+
+def collapse_chunks(chunks: list[dict], threshold: float = DEFAULT_THRESHOLD
+                    ) -> tuple[list[dict], dict[str, str]]:
+    """
+    Схлопывает почти-дубликаты: из каждого кластера остаётся первый чанк.
+    Возвращает (уникальные чанки, {id удалённого: id оставленного}).
+    """
+    index = DedupIndex(threshold)
+    for chunk in chunks:
+        index.add(chunk.get("id", ""), chunk_text(chunk))
+
+    dropped: set[int] = set()
+    replaced_by: dict[str, str] = {}
+    for cluster in index.clusters():
+        keep = cluster[0]
+        for doc_no in cluster[1:]:
+            dropped.add(doc_no)
+            replaced_by[index.keys[doc_no]] = index.keys[keep]
+
+    unique = [c for i, c in enumerate(chunks) if i not in dropped]
+    return unique, replaced_by
+
+
+# ─── Дедупликация при ответе на вопрос ───────────────────────────────────────
+
+def _is_redundant(shingles: set[int], kept: list[set[int]],
+                  threshold: float, containment: float) -> bool:
+    for other in kept:
+        if not shingles or not other:
+            continue
+        inter = len(shingles & other)
+        if inter / len(shingles | other) >= threshold:
+            return True
+        # Короткий чанк, почти целиком входящий в уже выбранный
+        if inter / len(shingles) >= containment:
+            return True
+    return False
+
+
+def drop_near_duplicates(groups: list[list[dict]],
+                         threshold: float = DEFAULT_THRESHOLD,
+                         containment: float = QUERY_CONTAINMENT) -> list[list[dict]]:
+    """
+    Убирает повторы из найденных чанков перед сборкой контекста.
+
+    groups — секции контекста в порядке приоритета (площадка, закон, ГК,
+    налоги, конфликты). Чанк остаётся в первой секции, где он встретился;
+    в последующих его точные (по id) и почти-точные копии отбрасываются.
+    Чанков при ответе мало (≈10), поэтому сравнение идёт по точным
+    множествам шинглов, а не по скетчам.
+    """
+    seen_ids: set[str] = set()
+    kept: list[set[int]] = []
+    result = []
+    for group in groups:
+        out = []
+        for chunk in group:
+            cid = chunk.get("id")
+            if cid is not None and cid in seen_ids:
+                continue
+            shingles = shingle_hashes(chunk_text(chunk))
+            if _is_redundant(shingles, kept, threshold, containment):
+                continue
+            if cid is not None:
+                seen_ids.add(cid)
+            kept.append(shingles)
+            out.append(chunk)
+        result.append(out)
+    return result
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+def _load(paths: list[str]) -> list[tuple[str, dict]]:
+    items = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for chunk in json.load(f):
+                items.append((path, chunk))
+    return items
+
+
+def main() -> int:
+    from chunk_store import default_json_paths
+
+    parser = argparse.ArgumentParser(description="Почти-дубликаты чанков (MinHash)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("report", "collapse"):
+        p = sub.add_parser(name)
+        p.add_argument("inputs", nargs="*", help="JSON-файлы (по умолчанию data/chunks_*.json)")
+        p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+        if name == "collapse":
+            p.add_argument("-o", "--output", required=True)
+            p.add_argument("--mapping", help="JSON {удалённый id: оставленный id}")
+    args = parser.parse_args()
+
+    paths = args.inputs or default_json_paths()
+    items = _load(paths)
+
+    if args.cmd == "report":
+        index = DedupIndex(args.threshold)
+        for path, chunk in items:
+            index.add(chunk.get("id", ""), chunk_text(chunk))
+        clusters = index.clusters()
+        print(f"Чанков: {len(items)} из {len(paths)} файлов, порог Жаккара {args.threshold}")
+        print(f"Кластеров почти-дубликатов: {len(clusters)}")
+        redundant = 0
+        for cluster in clusters:
+            redundant += len(cluster) - 1
+            print("-" * 60)
+            for doc_no in cluster:
+                path, chunk = items[doc_no]
+                print(f"  {path.split('/')[-1]:42} [{chunk.get('id')}]")
+        print("=" * 60)
+        print(f"Лишних копий: {redundant}")
+        return 0
+
+    chunks = [chunk for _, chunk in items]
+    unique, mapping = collapse_chunks(chunks, args.threshold)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(unique, f, ensure_ascii=False, indent=2)
+    if args.mapping:
+        with open(args.mapping, "w", encoding="utf-8") as f:
+            json.dump(mapping, f, ensure_ascii=False, indent=2)
+    print(f"[OK] {len(chunks)} → {len(unique)} чанков ({len(chunks) - len(unique)} дублей) → {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
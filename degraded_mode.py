@@ -0,0 +1,242 @@
+"""
+degraded_mode.py — Режим «только поиск» при перегрузке или недоступности Claude.
+
+Когда Anthropic отвечает rate limit / 5xx, answer_question раньше делал
+три попытки (с паузами по 20 сек) и падал, а пользователь получал
+«Произошла ошибка». Теперь:
+
+  CircuitBreaker — следит за исходами вызовов Claude в скользящем окне.
+      closed     — всё штатно;
+      open       — доля ошибок >= LLM_ERROR_RATE (или LLM_MAX_FAILURES
+                   подряд): Claude не вызываем LLM_RESET_TIMEOUT секунд;
+      half_open  — пропускаем один пробный вызов: успех закрывает,
+                   ошибка снова открывает.
+
+  build_digest() — ответ без LLM: найденные позиции перечней ТРУ и
+      чанки (заголовок, ключевой фрагмент, ссылка official_url).
+
+  DegradedMode — решает, включать ли режим: разомкнут breaker или
+      очередь планировщика (request_scheduler.py) глубже
+      DEGRADED_QUEUE_DEPTH. При входе в режим и выходе из него
+      отправляет уведомление администратору (не чаще ALERT_COOLDOWN).
+"""
+
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+LLM_ERROR_RATE = float(os.getenv("LLM_ERROR_RATE", "0.5"))
+LLM_MAX_FAILURES = int(os.getenv("LLM_MAX_FAILURES", "3"))
+LLM_RESET_TIMEOUT = float(os.getenv("LLM_RESET_TIMEOUT", "60"))
+DEGRADED_QUEUE_DEPTH = int(os.getenv("DEGRADED_QUEUE_DEPTH", "20"))
+# Окно исходов для доли ошибок и минимум наблюдений в нём
+OUTCOME_WINDOW = 20
+MIN_OUTCOMES = 6
+ALERT_COOLDOWN = 600.0
+
+EXCERPT_LEN = 350
+DIGEST_NOTICE = (
+    "⚠️ Сервис генерации ответов сейчас перегружен или недоступен, поэтому "
+    "ниже — подборка норм, найденных по вашему вопросу, без разбора. "
+    "Попробуйте задать вопрос ещё раз через несколько минут."
+)
+
+
+# ─── Circuit breaker ──────────────────────────────────────────────────────────
+
+class CircuitBreaker:
+    """Потокобезопасный breaker: answer_question работает в asyncio.to_thread."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, error_rate: float = LLM_ERROR_RATE, max_failures: int = LLM_MAX_FAILURES,
+                 reset_timeout: float = LLM_RESET_TIMEOUT, clock: Callable[[], float] = time.monotonic):
+        self.error_rate = error_rate
+        self.max_failures = max_failures
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._outcomes: deque[bool] = deque(maxlen=OUTCOME_WINDOW)
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._state = self.CLOSED
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def allow(self) -> bool:
+        """Можно ли сейчас вызывать Claude. В half_open — только один пробный вызов."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._outcomes.append(True)
+            self._consecutive = 0
+            self._probe_in_flight = False
+            if self._state != self.CLOSED:
+                logger.info("[breaker] Claude снова отвечает — режим восстановлен")
+            self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._outcomes.append(False)
+            self._consecutive += 1
+            probe_failed = self._probe_in_flight
+            self._probe_in_flight = False
+            failures = self._outcomes.count(False)
+            too_many = (
+                self._consecutive >= self.max_failures
+                or (len(self._outcomes) >= MIN_OUTCOMES
+                    and failures / len(self._outcomes) >= self.error_rate)
+            )
+            if probe_failed or (self._state == self.CLOSED and too_many):
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+                logger.warning(f"[breaker] Разомкнут: {failures}/{len(self._outcomes)} ошибок")
+
+    def record_cancelled(self) -> None:
+        """Вызов прерван не по вине Claude (ответ устарел) — исход не учитываем."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def error_rate_now(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+
+
+# ─── Ответ без LLM ────────────────────────────────────────────────────────────
+
+def _excerpt(text: str, limit: int = EXCERPT_LEN) -> str:
+    """Начало текста по границе предложения/слова, без markdown-символов."""
+    text = re.sub(r"\s+", " ", text or "").replace("*", "").replace("`", "").strip()
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    end = max(cut.rfind(". "), cut.rfind("; "))
+    if end > limit // 2:
+        return cut[:end + 1]
+    return cut[:cut.rfind(" ")].rstrip(",;:") + "…"
+
+
+def build_digest(ktru_items: list[dict], sections: list[tuple[str, list[dict]]],
+                 perechen_meta: dict | None = None, max_chunks: int = 5,
+                 notice: str = DIGEST_NOTICE) -> str:
+    """
+    Markdown-дайджест найденного (рендерится telegram_html.py):
+    позиции перечней ТРУ, затем до max_chunks чанков по секциям.
+    """
+    perechen_meta = perechen_meta or {}
+    parts = [notice]
+
+    if ktru_items:
+        lines = ["**Перечни ТРУ с особым порядком закупки:**"]
+        for item in ktru_items[:5]:
+            meta = perechen_meta.get(item.get("perechen_type", ""), {})
+            source = f" — [{meta['npa']}]({meta['url']})" if meta.get("url") else ""
+            lines.append(
+                f"• {item.get('nazvanie', '')}: способ закупки — {item.get('sposob', '')}{source}"
+            )
+        parts.append("\n".join(lines))
+
+    shown = 0
+    seen: set = set()
+    for label, chunks in sections:
+        lines = []
+        for chunk in chunks:
+            if shown >= max_chunks or chunk.get("id") in seen:
+                continue
+            seen.add(chunk.get("id"))
+            shown += 1
+            title = chunk.get("article_title") or chunk.get("chapter") or ""
+            document = chunk.get("document_short") or ""
+            heading = f"{document}, {title}" if document and title else (document or title)
+            url = chunk.get("official_url")
+            heading = f"[{heading}]({url})" if url else heading
+            lines.append(f"**{shown}.** {heading}\n{_excerpt(chunk.get('text', ''))}")
+        if lines:
+            parts.append(f"**{label}:**\n\n" + "\n\n".join(lines))
+
+    return "\n\n".join(parts)
+
+
+# ─── Переключатель режима ─────────────────────────────────────────────────────
+
+class DegradedMode:
+    """
+    reason() → None (штатный режим) или причина: "llm_unavailable" / "overload".
+    alert(text) — корутина уведомления администратора (задаётся ботом).
+    """
+
+    def __init__(self, breaker: CircuitBreaker, queue_depth: Callable[[], int],
+                 max_queue: int = DEGRADED_QUEUE_DEPTH,
+                 alert: Callable[[str], Awaitable] | None = None):
+        self.breaker = breaker
+        self.queue_depth = queue_depth
+        self.max_queue = max_queue
+        self.alert = alert
+        self.digest_answers = 0      # сколько ответов выдано без LLM
+        self._reason: str | None = None
+        self._last_alert = float("-inf")
+
+    def reason(self) -> str | None:
+        if self.breaker.state == CircuitBreaker.OPEN:
+            return "llm_unavailable"
+        if self.max_queue and self.queue_depth() >= self.max_queue:
+            return "overload"
+        return None
+
+    def check(self) -> str | None:
+        """Текущая причина; при смене режима пишет лог и уведомляет администратора."""
+        reason = self.reason()
+        if reason != self._reason:
+            previous, self._reason = self._reason, reason
+            if reason:
+                text = (f"⚠️ Бот перешёл в режим «только поиск» ({reason}): "
+                        f"ошибок Claude {self.breaker.error_rate_now():.0%}, "
+                        f"очередь {self.queue_depth()}")
+            else:
+                text = f"✅ Бот вернулся в штатный режим (был: {previous})"
+            logger.warning(f"[degraded] {text}")
+            self._notify(text, always=reason is None)
+        return reason
+
+    def _notify(self, text: str, always: bool) -> None:
+        if self.alert is None:
+            return
+        now = time.monotonic()
+        # Возврат в норму сообщаем всегда, вход в режим — не чаще ALERT_COOLDOWN
+        if not always and now - self._last_alert < ALERT_COOLDOWN:
+            return
+        self._last_alert = now
+        try:
+            task = asyncio.get_running_loop().create_task(self.alert(text))
+        except RuntimeError:
+            return
+        task.add_done_callback(
+            lambda t: t.cancelled() or not t.exception()
+            or logger.warning(f"[degraded] Уведомление не отправлено: {t.exception()}")
+        )
@@ -0,0 +1,133 @@
+"""
+export_stream.py — Потоковая выгрузка переписки и отзывов (NDJSON / CSV, опционально gzip).
+
+Раньше переписку для анализа (как analyze_chat.py / analyze_ktru.py делают
+с экспортом Telegram) можно было достать только листая /api/messages по
+100 строк. Теперь выгрузка — цепочка генераторов:
+
+    iter_rows     — keyset-страницы Supabase по id (id > последний),
+                    фильтры по дате created_at и chat_id;
+    ndjson_lines / csv_lines — строка за строкой;
+    gzip_chunks   — потоковое сжатие (zlib.compressobj).
+
+В памяти одновременно не больше одной страницы (EXPORT_BATCH_SIZE строк),
+размер выгрузки не важен. Используется admin_panel.py (/api/export/<table>)
+и из командной строки:
+
+    python export_stream.py conversations --since 2026-01-01 > conv.ndjson
+    python export_stream.py feedback --format csv --gzip -o feedback.csv.gz
+    python export_stream.py conversations --chat-id 123456 --until 2026-03-01
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import zlib
+from typing import Iterable, Iterator
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_COLUMNS = {
+    "conversations": ("id", "chat_id", "created_at", "question", "answer",
+                      "chunks_used", "ktru_found", "source"),
+    "feedback": ("id", "chat_id", "message_id", "created_at", "rating",
+                 "question", "answer", "comment"),
+}
+FORMATS = ("ndjson", "csv")
+
+
+def iter_rows(client, table: str, since: str | None = None, until: str | None = None,
+              chat_id: int | None = None, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """
+    Все строки таблицы по возрастанию id. since/until — даты или ISO-время
+    (since включительно, until — не включая).
+    """
+    if table not in EXPORT_COLUMNS:
+        raise ValueError(f"Неизвестная таблица для выгрузки: {table}")
+    columns = ",".join(EXPORT_COLUMNS[table])
+    last_id = 0
+    while True:
+        query = client.table(table).select(columns).gt("id", last_id)
+        if since:
+            query = query.gte("created_at", since)
+        if until:
+            query = query.lt("created_at", until)
+        if chat_id is not None:
+            query = query.eq("chat_id", chat_id)
+        rows = query.order("id").limit(batch_size).execute().data or []
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def ndjson_lines(rows: Iterable[dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, default=str) + "\n"
+
+
+def csv_lines(rows: Iterable[dict], columns: tuple[str, ...]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Потоковый gzip: отдаёт сжатые блоки по мере накопления."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)   # 31 — заголовок gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(client, table: str, fmt: str = "ndjson", gzip: bool = False, **filters) -> Iterator[bytes]:
+    """Выгрузка таблицы байтовыми блоками — для HTTP-ответа или файла."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Формат выгрузки: {', '.join(FORMATS)}")
+    rows = iter_rows(client, table, **filters)
+    lines = ndjson_lines(rows) if fmt == "ndjson" else csv_lines(rows, EXPORT_COLUMNS[table])
+    chunks = (line.encode("utf-8") for line in lines)
+    return gzip_chunks(chunks) if gzip else chunks
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Потоковая выгрузка conversations / feedback")
+    parser.add_argument("table", choices=sorted(EXPORT_COLUMNS))
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--since", help="с даты (YYYY-MM-DD или ISO-время), включительно")
+    parser.add_argument("--until", help="по дату, не включая")
+    parser.add_argument("--chat-id", type=int)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("-o", "--output", help="файл (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from clients import get_supabase
+
+    load_dotenv()
+    chunks = export(get_supabase(), args.table, args.format, args.gzip,
+                    since=args.since, until=args.until, chat_id=args.chat_id)
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+faq_index.py — Быстрые ответы из FAQ до запуска RAG.
+
+Таблицу faq ведут администраторы через панель (/api/faq), но бот её не
+использовал: любой вопрос проходил полный поиск и генерацию Claude.
+Теперь process_question сначала спрашивает FaqIndex:
+
+    точное совпадение   — хэш нормализованного текста (регистр, ё/е,
+                          пунктуация, лишние пробелы не важны), score 1.0;
+    почти точное        — кандидаты по общим словам (инвертированный
+                          индекс), оценка — среднее пересечения слов и
+                          триграмм символов (Жаккар); ответ отдаётся при
+                          score >= FAQ_MATCH_THRESHOLD.
+
+Поиск — микросекунды и без сети. FaqSync раз в FAQ_REFRESH_INTERVAL
+секунд сверяет «подпись» таблицы (число строк и max(updated_at)) и
+перечитывает FAQ только при изменении; там же счётчики попаданий
+сбрасываются в faq.hit_count (supabase_faq.sql).
+"""
+
+import asyncio
+import logging
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.8"))
+FAQ_REFRESH_INTERVAL = float(os.getenv("FAQ_REFRESH_INTERVAL", "30"))
+# Меньше слов — слишком общий вопрос для нечёткого совпадения
+MIN_FUZZY_TOKENS = 2
+
+_PUNCT = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+# «не» / «ни» — не стоп-слова: «можно ли (не) указывать…» — противоположные вопросы
+_STOPWORDS = frozenset(
+    "а в во и или к как ли на о об от по при с со у что это же бы да "
+    "для до из за то так там тут мне меня мы вы я он она они ну".split()
+)
+_NEGATIONS = frozenset(("не", "ни", "нет", "нельзя"))
+
+
+def normalize(text: str) -> str:
+    text = text.lower().replace("ё", "е")
+    text = _PUNCT.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def tokens(normalized: str) -> frozenset[str]:
+    return frozenset(w for w in normalized.split() if len(w) > 1 and w not in _STOPWORDS)
+
+
+def trigrams(normalized: str) -> frozenset[str]:
+    padded = f"  {normalized} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass(frozen=True)
+class FaqEntry:
+    id: int
+    question: str
+    answer: str
+    normalized: str
+    tokens: frozenset
+    trigrams: frozenset
+
+
+@dataclass(frozen=True)
+class FaqMatch:
+    entry: FaqEntry
+    score: float
+    kind: str          # exact / fuzzy
+
+
+class FaqIndex:
+    """Неизменяемый снимок FAQ заменяется целиком — чтение без блокировок."""
+
+    def __init__(self, threshold: float = FAQ_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self._exact: dict[str, FaqEntry] = {}
+        self._by_token: dict[str, tuple[FaqEntry, ...]] = {}
+        self.hit_counts: Counter = Counter()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def load(self, rows: list[dict]) -> int:
+        """Перестраивает индекс из строк faq (id, question, answer)."""
+        exact: dict[str, FaqEntry] = {}
+        by_token: dict[str, list[FaqEntry]] = defaultdict(list)
+        for row in rows:
+            if not row.get("question") or not row.get("answer"):
+                continue
+            norm = normalize(row["question"])
+            entry = FaqEntry(row["id"], row["question"], row["answer"],
+                             norm, tokens(norm), trigrams(norm))
+            exact[norm] = entry
+            for token in entry.tokens:
+                by_token[token].append(entry)
+        # Присваивание ссылок атомарно: match() видит либо старый, либо новый снимок
+        self._by_token = {t: tuple(entries) for t, entries in by_token.items()}
+        self._exact = exact
+        return len(exact)
+
+    def match(self, text: str) -> FaqMatch | None:
+        norm = normalize(text)
+        result = None
+        entry = self._exact.get(norm)
+        if entry is not None:
+            result = FaqMatch(entry, 1.0, "exact")
+        else:
+            query_tokens = tokens(norm)
+            if len(query_tokens) >= MIN_FUZZY_TOKENS:
+                by_token = self._by_token
+                candidates = {e.id: e for t in query_tokens for e in by_token.get(t, ())}
+                query_trigrams = trigrams(norm)
+                best_score, best = 0.0, None
+                query_negations = query_tokens & _NEGATIONS
+                for candidate in candidates.values():
+                    # Отрицание меняет смысл вопроса, каким бы близким ни был текст
+                    if candidate.tokens & _NEGATIONS != query_negations:
+                        continue
+                    score = (_jaccard(query_tokens, candidate.tokens)
+                             + _jaccard(query_trigrams, candidate.trigrams)) / 2
+                    if score > best_score:
+                        best_score, best = score, candidate
+                if best is not None and best_score >= self.threshold:
+                    result = FaqMatch(best, round(best_score, 3), "fuzzy")
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.hit_counts[result.entry.id] += 1
+        return result
+
+    def take_hit_counts(self) -> dict[int, int]:
+        """Накопленные попадания по id FAQ (счётчик обнуляется)."""
+        with self._lock:
+            counts, self.hit_counts = dict(self.hit_counts), Counter()
+        return counts
+
+    def restore_hit_counts(self, counts: dict[int, int]) -> None:
+        with self._lock:
+            self.hit_counts.update(counts)
+
+    def format_stats(self) -> str:
+        total = self.hits + self.misses
+        rate = f"{self.hits / total:.0%}" if total else "—"
+        return f"📚 FAQ: {len(self)} записей, ответов из FAQ {self.hits} ({rate} вопросов)"
+
+
+class FaqSync:
+    """Подгружает FAQ в индекс при изменении таблицы и сбрасывает счётчики попаданий."""
+
+    def __init__(self, client, index: FaqIndex, interval: float = FAQ_REFRESH_INTERVAL,
+                 table: str = "faq"):
+        self.client = client
+        self.index = index
+        self.interval = interval
+        self.table = table
+        self.signature: tuple | None = None
+        self._task: asyncio.Task | None = None
+
+    def _signature(self) -> tuple:
+        result = (
+            self.client.table(self.table).select("updated_at", count="exact")
+            .order("updated_at", desc=True).limit(1).execute()
+        )
+        latest = result.data[0]["updated_at"] if result.data else None
+        return result.count, latest
+
+    def refresh(self) -> bool:
+        """Перечитывает FAQ, если таблица изменилась. True — индекс перестроен."""
+        signature = self._signature()
+        if signature == self.signature:
+            return False
+        rows = (
+            self.client.table(self.table).select("id,question,answer")
+            .eq("is_active", True).execute().data
+            or []
+        )
+        count = self.index.load(rows)
+        self.signature = signature
+        logger.info(f"[faq] Загружено записей FAQ: {count}")
+        return True
+
+    def flush_hits(self) -> int:
+        counts = self.index.take_hit_counts()
+        if not counts:
+            return 0
+        try:
+            self.client.rpc("faq_add_hits", {"p_hits": {str(k): v for k, v in counts.items()}}).execute()
+        except Exception:
+            self.index.restore_hit_counts(counts)
+            raise
+        return sum(counts.values())
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+                await asyncio.to_thread(self.flush_hits)
+            except Exception as e:
+                # Нет таблицы faq или сеть недоступна — бот работает без FAQ
+                logger.warning(f"[faq] Ошибка синхронизации FAQ: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await asyncio.to_thread(self.flush_hits)
+        except Exception as e:
+            logger.warning(f"[faq] Счётчики попаданий не сохранены: {e}")
@@ -1,8 +1,10 @@
 """
 generate_bot_messages.py — Автоматически генерирует /start и /help сообщения из chunks
 
-Парсит все chunks_*.json файлы, собирает статистику документов
-и генерирует актуальные приветствие и справку для Telegram бота.
+Берёт статистику документов из манифеста data/kb_manifest.json (kb_manifest.py,
+обновляется инкрементально) и генерирует актуальные приветствие и справку для
+Telegram бота. Бот сам перечитывает сообщения при изменении манифеста, так что
+пересоздавать bot_messages.py нужно только для fallback-значений.
 
 Запуск:
     python generate_bot_messages.py --output bot_messages.py
@@ -11,43 +13,20 @@ generate_bot_messages.py — Автоматически генерирует /st
 которые можно импортировать в bot.py
 """
 
-import json
-import os
 import argparse
-from pathlib import Path
 from collections import defaultdict
 
+from kb_manifest import manifest_statistics, update_manifest
 
-def load_chunks_statistics():
-    """Загружает статистику из всех chunks_*.json файлов."""
-    data_dir = Path(__file__).parent / "data"
-
-    stats = defaultdict(int)
-    doc_info = defaultdict(dict)
-
-    chunks_files = sorted(data_dir.glob("chunks_*.json"))
-
-    for chunks_file in chunks_files:
-        platform = chunks_file.stem.replace("chunks_", "")
-
-        try:
-            with open(chunks_file, "r", encoding="utf-8") as f:
-                chunks = json.load(f)
-
-            stats[platform] = len(chunks)
 
-            # Получаем информацию о документе из первого чанка
-            if chunks:
-                first_chunk = chunks[0]
-                doc_info[platform] = {
-                    "document_short": first_chunk.get("document_short", platform),
-                    "document_name": first_chunk.get("document_name", platform),
-                    "source_platform": first_chunk.get("source_platform", platform),
-                }
-        except Exception as e:
-            print(f"[WARN] Error reading {chunks_file}: {e}")
-
-    return stats, doc_info
+def load_chunks_statistics():
+    """
+    Загружает статистику chunks_*.json из манифеста data/kb_manifest.json.
+    Манифест обновляется инкрементально — перечитываются только изменившиеся файлы.
+    """
+    manifest, _ = update_manifest()
+    stats, doc_info = manifest_statistics(manifest)
+    return defaultdict(int, stats), defaultdict(dict, doc_info)
 
 
 def generate_start_message(stats, doc_info):
@@ -214,6 +193,15 @@ def generate_sources_message():
     return msg
 
 
+def build_messages(stats, doc_info) -> tuple[str, str, str]:
+    """Все три сообщения сразу: (START, HELP, SOURCES). Используется и ботом при горячей перезагрузке."""
+    return (
+        generate_start_message(defaultdict(int, stats), defaultdict(dict, doc_info)),
+        generate_help_message(stats),
+        generate_sources_message(),
+    )
+
+
 def generate_python_file(start_msg, help_msg, sources_msg, output_file):
     """Генерирует Python файл с сообщениями."""
 
@@ -274,9 +262,7 @@ def main():
         print(f"  {platform:20} - {count:3} sections ({doc_name})")
     print(f"  {'TOTAL':20} - {total:3} sections\n")
 
-    start_msg = generate_start_message(stats, doc_info)
-    help_msg = generate_help_message(stats)
-    sources_msg = generate_sources_message()
+    start_msg, help_msg, sources_msg = build_messages(stats, doc_info)
 
     if args.print_only:
         print("=" * 70)
@@ -0,0 +1,104 @@
+"""
+http_cache.py — Кэшируемые JSON-ответы: ETag, 304 и сжатие gzip / br.
+
+Используется агрегированным API админ-панели (admin_panel.py, /api/admin/*):
+тело ответа сериализуется один раз, сжатые варианты считаются лениво и
+хранятся вместе с ним в TTLCache, так что повторный запрос той же вкладки
+не трогает ни Supabase, ни компрессор, а запрос с совпавшим If-None-Match
+получает пустой 304.
+
+Brotli — необязательная зависимость (pip install brotli); без неё
+отдаётся gzip.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Меньше этого сжимать невыгодно: заголовки gzip съедают выигрыш
+MIN_COMPRESS_SIZE = 1024
+
+
+@dataclass
+class CachedBody:
+    """Сериализованный JSON с ETag и сжатыми вариантами."""
+    body: bytes
+    etag: str
+    _encoded: dict[str, bytes] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @classmethod
+    def from_payload(cls, payload) -> "CachedBody":
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+        # Слабый ETag: сжатые и несжатые варианты семантически равны
+        return cls(body, f'W/"{hashlib.sha1(body).hexdigest()}"')
+
+    def encoded(self, encoding: str | None) -> bytes:
+        if encoding is None:
+            return self.body
+        with self._lock:
+            data = self._encoded.get(encoding)
+            if data is None:
+                data = self._encoded[encoding] = _compress(self.body, encoding)
+        return data
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def choose_encoding(accept_encoding: str | None, size: int) -> str | None:
+    """br / gzip / None по заголовку Accept-Encoding (q=0 — запрет)."""
+    if size < MIN_COMPRESS_SIZE or not accept_encoding:
+        return None
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match содержит etag (сравнение слабое, как требует RFC 9110 для 304)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def build_response(cached: CachedBody, if_none_match: str | None,
+                   accept_encoding: str | None, max_age: int = 0) -> tuple[int, dict, bytes]:
+    """
+    (status, headers, body) для ответа фреймворку. private, no-cache —
+    браузер хранит ответ, но перед использованием спрашивает сервер
+    с If-None-Match и получает 304 без тела.
+    """
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": f"private, max-age={max_age}" if max_age else "private, no-cache",
+        "Vary": "Accept-Encoding, Authorization",
+    }
+    if etag_matches(if_none_match, cached.etag):
+        return 304, headers, b""
+    encoding = choose_encoding(accept_encoding, len(cached.body))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    headers["Content-Type"] = "application/json; charset=utf-8"
+    return 200, headers, cached.encoded(encoding)
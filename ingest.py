@@ -0,0 +1,146 @@
+"""
+ingest.py — Конвейер подготовки базы знаний после добавления документа.
+
+Стадии выполняются по порядку, каждая — функция stage_<имя>(ctx):
+    clean  — чистка устаревших норм (clean_obsolete.py), bulk write-back в Supabase
+    dedup  — схлопывание почти-дубликатов между файлами data/ (dedup_index.py):
+             в хранилище идёт уникальный набор, {удалённый id: оставленный id} —
+             в data/dedup_map.json
+    store  — пересборка бинарного хранилища data/chunks.gzcs (chunk_store.py);
+             без стадии dedup — все чанки как есть
+    manifest — инкрементальное обновление data/kb_manifest.json (kb_manifest.py);
+             бот подхватывает новые /start, /help, /docs без перезапуска
+
+Запуск:
+    python ingest.py                               # все стадии
+    python ingest.py --stages clean --dry-run --report data/obsolete_report.json
+    python ingest.py --no-supabase
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from chunk_store import DEFAULT_STORE_PATH, default_json_paths, json_to_store, read_json_chunks, write_store
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Не chunks_*.json: иначе default_json_paths() подхватит карту как файл чанков
+DEDUP_MAP_PATH = os.path.join(BASE_DIR, "data", "dedup_map.json")
+
+
+# ─── Стадии ───────────────────────────────────────────────────────────────────
+
+def stage_clean(ctx: dict) -> None:
+    import clean_obsolete
+
+    paths = ctx["clean_files"] or [p for p, _ in clean_obsolete.FILES]
+    results = clean_obsolete.clean_files(paths, workers=ctx["workers"],
+                                         write=not ctx["dry_run"])
+    report = clean_obsolete.build_report(results)
+    print(f"  Очищено чанков: {report['total_chunks_cleaned']}, "
+          f"строк удалено: {report['total_lines_removed']}")
+
+    if ctx["report"]:
+        with open(ctx["report"], "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"  Отчёт: {ctx['report']}")
+
+    updates = clean_obsolete.collect_updates(results)
+    if updates and not ctx["dry_run"] and not ctx["no_supabase"]:
+        clean_obsolete.write_back_supabase(updates)
+    ctx["changed_files"].update(r["file"] for r in results if r["cleaned"])
+
+
+def stage_dedup(ctx: dict) -> None:
+    from dedup_index import collapse_chunks
+
+    chunks = read_json_chunks(default_json_paths())
+    unique, mapping = collapse_chunks(chunks)
+    ctx["chunks"], ctx["dedup_mapping"] = unique, mapping
+    print(f"  {len(chunks)} → {len(unique)} чанков, схлопнуто почти-дубликатов: {len(mapping)}")
+    print("  Подробно: python dedup_index.py report")
+
+
+def stage_store(ctx: dict) -> None:
+    if ctx["dry_run"]:
+        print("  DRY-RUN: хранилище не пересобирается")
+        return
+    if ctx["chunks"] is None:
+        n = json_to_store(default_json_paths(), DEFAULT_STORE_PATH)
+    else:
+        write_store(ctx["chunks"], DEFAULT_STORE_PATH)
+        n = len(ctx["chunks"])
+        with open(DEDUP_MAP_PATH, "w", encoding="utf-8") as f:
+            json.dump(ctx["dedup_mapping"], f, ensure_ascii=False, indent=2)
+    print(f"  {n} чанков → {os.path.relpath(DEFAULT_STORE_PATH, BASE_DIR)}")
+
+
+def stage_manifest(ctx: dict) -> None:
+    from kb_manifest import MANIFEST_PATH, update_manifest
+
+    if ctx["dry_run"]:
+        print("  DRY-RUN: манифест не обновляется")
+        return
+    manifest, changed = update_manifest()
+    print(f"  {manifest['total_chunks']} чанков в {len(manifest['files'])} файлах, "
+          f"изменено: {', '.join(changed) or 'нет'} → {os.path.relpath(MANIFEST_PATH, BASE_DIR)}")
+
+
+STAGES = {
+    "clean": stage_clean,
+    "dedup": stage_dedup,
+    "store": stage_store,
+    "manifest": stage_manifest,
+}
+
+
+# ─── Запуск ───────────────────────────────────────────────────────────────────
+
+def run(stages: list[str], **options) -> dict:
+    ctx = {
+        "clean_files": options.get("clean_files") or [],
+        "workers": options.get("workers"),
+        "report": options.get("report"),
+        "dry_run": options.get("dry_run", False),
+        "no_supabase": options.get("no_supabase", False),
+        "changed_files": set(),
+        "chunks": None,             # уникальные чанки после стадии dedup
+        "dedup_mapping": {},
+    }
+    for name in stages:
+        print(f"\n[{name}]")
+        started = time.perf_counter()
+        STAGES[name](ctx)
+        print(f"  ({time.perf_counter() - started:.2f} сек)")
+    return ctx
+
+
+def main() -> int:
+    sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Конвейер подготовки базы знаний")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"стадии через запятую (по умолчанию: {','.join(STAGES)})")
+    parser.add_argument("--clean-files", nargs="*", default=[],
+                        help="файлы для стадии clean (по умолчанию clean_obsolete.FILES)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--report", help="JSON-отчёт стадии clean")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--no-supabase", action="store_true")
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        print(f"[ERR] Неизвестные стадии: {', '.join(unknown)}")
+        return 1
+
+    run(stages, clean_files=args.clean_files, workers=args.workers,
+        report=args.report, dry_run=args.dry_run, no_supabase=args.no_supabase)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
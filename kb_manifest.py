@@ -0,0 +1,198 @@
+"""
+kb_manifest.py — Манифест статистики базы знаний (data/kb_manifest.json).
+
+Для каждого data/chunks_*.json хранит число чанков, метаданные документа
+из первого чанка, sha256 и время последнего изменения. Манифест лежит в
+git рядом с чанками, поэтому в нём только то, что зависит от содержимого.
+Размер и mtime файлов — локальный кэш data/kb_manifest.stat.json (не в
+git): sha256 пересчитывается, только если они изменились, а манифест
+перезаписывается, только если изменилось содержимое. Обычный запуск —
+миллисекунды; свежий clone лишь пересчитывает хэши.
+
+Использование:
+    generate_bot_messages.py — load_chunks_statistics() читает манифест;
+    bot.py                   — перечитывает /start, /help, /docs при изменении манифеста;
+    ingest.py                — стадия "manifest".
+
+Запуск:
+    python kb_manifest.py            # обновить манифест
+    python kb_manifest.py --force    # пересчитать все файлы
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+MANIFEST_PATH = os.path.join(DATA_DIR, "kb_manifest.json")
+# 2 — size/mtime_ns вынесены из манифеста в локальный кэш
+MANIFEST_VERSION = 2
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _scan_file(path: str, platform: str, sha256: str) -> dict:
+    """Полный разбор файла — только для новых или изменившихся файлов."""
+    with open(path, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    first = chunks[0] if chunks else {}
+    return {
+        "count": len(chunks),
+        "document_short": first.get("document_short", platform),
+        "document_name": first.get("document_name", platform),
+        "source_platform": first.get("source_platform", platform),
+        "sha256": sha256,
+    }
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    """Читает манифест; при отсутствии или повреждении — пустой манифест."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "updated_at": None, "total_chunks": 0, "files": {}}
+
+
+def _stat_cache_path(path: str) -> str:
+    return f"{os.path.splitext(path)[0]}.stat.json"
+
+
+def _load_stat_cache(path: str) -> dict:
+    """{имя файла: {size, mtime_ns, sha256}} — машинно-зависимая часть."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def update_manifest(data_dir: str = DATA_DIR, path: str = MANIFEST_PATH,
+                    force: bool = False) -> tuple[dict, list[str]]:
+    """
+    Синхронизирует манифест с data_dir/chunks_*.json.
+    Возвращает (манифест, список платформ, у которых изменилась статистика).
+    Файл манифеста перезаписывается только при изменении содержимого.
+    """
+    manifest = load_manifest(path)
+    old_files = manifest["files"]
+    cache_path = _stat_cache_path(path)
+    old_cache = _load_stat_cache(cache_path)
+    cache: dict[str, dict] = {}
+    files: dict[str, dict] = {}
+    changed: list[str] = []
+
+    for name in sorted(os.listdir(data_dir)):
+        if not (name.startswith("chunks_") and name.endswith(".json")):
+            continue
+        fpath = os.path.join(data_dir, name)
+        platform = name[len("chunks_"):-len(".json")]
+        st = os.stat(fpath)
+        entry = old_files.get(platform)
+        cached = old_cache.get(name)
+
+        if (cached and cached.get("size") == st.st_size
+                and cached.get("mtime_ns") == st.st_mtime_ns):
+            sha256 = cached["sha256"]
+        else:
+            sha256 = _sha256(fpath)
+        cache[name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256}
+
+        if not force and entry and entry["sha256"] == sha256:
+            # Содержимое то же (в т.ч. после clone/checkout с другим mtime)
+            files[platform] = entry
+            continue
+
+        try:
+            scanned = _scan_file(fpath, platform, sha256)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Error reading {fpath}: {e}")
+            if entry:
+                files[platform] = entry
+            continue
+
+        stats_changed = entry is None or any(
+            entry.get(k) != scanned[k]
+            for k in ("count", "document_short", "document_name", "source_platform")
+        )
+        files[platform] = {
+            "file": name,
+            **scanned,
+            "updated_at": _now(),
+        }
+        if stats_changed:
+            changed.append(platform)
+
+    removed = sorted(set(old_files) - set(files))
+    changed.extend(removed)
+
+    if files != old_files or force or not os.path.exists(path):
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "updated_at": _now() if changed or manifest["updated_at"] is None else manifest["updated_at"],
+            "total_chunks": sum(e["count"] for e in files.values()),
+            "files": files,
+        }
+        _write_json(path, manifest)
+    if cache != old_cache:
+        _write_json(cache_path, cache)
+
+    return manifest, changed
+
+
+def manifest_statistics(manifest: dict) -> tuple[dict[str, int], dict[str, dict]]:
+    """(stats, doc_info) в формате generate_bot_messages.load_chunks_statistics()."""
+    stats: dict[str, int] = {}
+    doc_info: dict[str, dict] = {}
+    for platform, entry in sorted(manifest["files"].items()):
+        stats[platform] = entry["count"]
+        doc_info[platform] = {
+            "document_short": entry["document_short"],
+            "document_name": entry["document_name"],
+            "source_platform": entry["source_platform"],
+        }
+    return stats, doc_info
+
+
+def main():
+    sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Манифест статистики базы знаний")
+    parser.add_argument("--force", action="store_true", help="пересчитать все файлы")
+    args = parser.parse_args()
+
+    manifest, changed = update_manifest(force=args.force)
+    for platform, entry in manifest["files"].items():
+        mark = "*" if platform in changed else " "
+        print(f" {mark} {platform:35} {entry['count']:5}  {entry['updated_at']}")
+    print(f"\n[OK] {os.path.relpath(MANIFEST_PATH, BASE_DIR)}: "
+          f"{manifest['total_chunks']} чанков, изменено: {len(changed)}")
+
+
+if __name__ == "__main__":
+    main()
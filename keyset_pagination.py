@@ -0,0 +1,95 @@
+"""
+keyset_pagination.py — Курсорная (keyset) пагинация PostgREST-запросов.
+
+OFFSET-пагинация (`.range(start, end)`) заставляет PostgreSQL прочитать и
+выбросить все `start` строк — страница N стоит O(N). Keyset-пагинация
+продолжает с последней показанной строки по ключу сортировки
+(created_at, id) — каждая страница стоит одинаково при индексе
+(chat_id, created_at DESC, id DESC) / (created_at DESC, id DESC), см.
+supabase_conversations_keyset.sql.
+
+Курсор — непрозрачная строка (base64 от [ключ сортировки, id]); id
+разрешает равные ключи. Кроме created_at ключом бывает ранг
+полнотекстового поиска (admin_views.search_messages). Направления:
+    next — более старые строки (после курсора в порядке DESC);
+    prev — более новые строки (перед курсором), возвращаются тоже в DESC.
+"""
+
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    """Курсор повреждён или создан не этим модулем."""
+
+
+def encode_cursor(key: str | float, row_id: int) -> str:
+    raw = json.dumps([key, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str | float, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key, row_id = json.loads(raw)
+        if not isinstance(key, (str, int, float)) or isinstance(key, bool) or not isinstance(row_id, int):
+            raise TypeError
+    except Exception as e:
+        raise InvalidCursor(f"Неверный курсор: {cursor!r}") from e
+    return key, row_id
+
+
+def _quote(value) -> str:
+    # Значения в or=(...) PostgREST берём в кавычки: во времени есть ':' и '+'
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def keyset_page(query, limit: int, cursor: str | None = None, direction: str = "next",
+                sort_column: str = "created_at", id_column: str = "id") -> dict:
+    """
+    Выполняет query (postgrest select-builder с уже наложенными фильтрами)
+    как одну страницу в порядке (sort_column DESC, id DESC).
+
+    Возвращает {"rows", "next_cursor", "prev_cursor", "has_more"}:
+    next_cursor — для следующей (более старой) страницы или None,
+    prev_cursor — для предыдущей (более новой) страницы или None.
+    """
+    if direction not in ("next", "prev"):
+        raise ValueError("direction должен быть 'next' или 'prev'")
+    newer = direction == "prev" and cursor is not None
+
+    if cursor is not None:
+        created_at, row_id = decode_cursor(cursor)
+        op = "gt" if newer else "lt"
+        ts = _quote(created_at)
+        query = query.or_(
+            f"{sort_column}.{op}.{ts},"
+            f"and({sort_column}.eq.{ts},{id_column}.{op}.{row_id})"
+        )
+
+    # limit + 1: лишняя строка говорит, есть ли ещё страница в этом направлении
+    rows = (
+        query.order(sort_column, desc=not newer)
+        .order(id_column, desc=not newer)
+        .limit(limit + 1)
+        .execute()
+        .data
+        or []
+    )
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if newer:
+        rows.reverse()
+
+    first = encode_cursor(rows[0][sort_column], rows[0][id_column]) if rows else None
+    last = encode_cursor(rows[-1][sort_column], rows[-1][id_column]) if rows else None
+    if newer:
+        has_older, has_newer = True, more
+    else:
+        has_older, has_newer = more, cursor is not None
+    return {
+        "rows": rows,
+        "next_cursor": last if has_older and rows else None,
+        "prev_cursor": first if has_newer and rows else None,
+        "has_more": has_older and bool(rows),
+    }
@@ -0,0 +1,209 @@
+"""
+live_feed.py — Живая лента админ-панели (Server-Sent Events) без опроса из браузера.
+
+Раньше страница сообщений (templates/messages.html) каждые 10 секунд
+перезапрашивала /api/messages — N открытых вкладок давали N циклов опроса
+Supabase. Теперь в процессе admin_panel.py:
+
+    FeedPoller   — единственная «подписка» на Supabase: фоновый поток
+                   забирает новые строки conversations и feedback после
+                   водяного знака (id), пока есть хотя бы один слушатель;
+    Broadcaster  — раздаёт события всем SSE-клиентам
+                   (/api/stream/conversations) и хранит последние
+                   LIVE_FEED_REPLAY событий для переподключения
+                   с заголовком Last-Event-ID.
+
+Типы событий: conversation, rejection (ответ, отклонённый проверкой —
+conversations.source = 'rejected'), feedback; служебное — resync.
+
+Обратное давление: у каждого клиента своя очередь на
+LIVE_FEED_CLIENT_QUEUE событий. Медленный клиент не тормозит остальных —
+при переполнении очереди он получает resync и отключается, а браузерный
+EventSource переподключается и догоняет из буфера (или перечитывает
+страницу, если отстал дальше буфера).
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+from admin_views import CONVERSATION_FIELDS
+
+logger = logging.getLogger(__name__)
+
+LIVE_FEED_INTERVAL = float(os.getenv("LIVE_FEED_INTERVAL", "2"))
+LIVE_FEED_REPLAY = int(os.getenv("LIVE_FEED_REPLAY", "200"))
+LIVE_FEED_CLIENT_QUEUE = int(os.getenv("LIVE_FEED_CLIENT_QUEUE", "100"))
+# Интервал комментария-пинга: прокси не рвут «молчащее» соединение
+HEARTBEAT_INTERVAL = 15.0
+BATCH_SIZE = 100
+ANSWER_PREVIEW = 500
+
+
+@dataclass
+class Event:
+    id: int
+    type: str
+    data: dict
+
+    def encode(self) -> str:
+        payload = json.dumps(self.data, ensure_ascii=False, default=str)
+        return f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n"
+
+
+class Subscription:
+    """Очередь событий одного SSE-клиента."""
+
+    def __init__(self, maxsize: int):
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def get(self, timeout: float) -> Event | None:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Broadcaster:
+    """Потокобезопасная раздача событий с ограниченным буфером повтора."""
+
+    def __init__(self, replay: int = LIVE_FEED_REPLAY, client_queue: int = LIVE_FEED_CLIENT_QUEUE):
+        self.client_queue = client_queue
+        self._buffer: deque[Event] = deque(maxlen=replay)
+        self._subscribers: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self.dropped = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, data: dict) -> Event:
+        with self._lock:
+            event = Event(self._next_id, event_type, data)
+            self._next_id += 1
+            self._buffer.append(event)
+            for sub in list(self._subscribers):
+                try:
+                    sub.queue.put_nowait(event)
+                except queue.Full:
+                    # Клиент не успевает читать — отключаем, он догонит из буфера
+                    sub.overflowed = True
+                    self._subscribers.discard(sub)
+                    self.dropped += 1
+        return event
+
+    def subscribe(self, last_event_id: int | None = None) -> tuple[Subscription, list[Event], bool]:
+        """
+        Новая подписка и пропущенные события после last_event_id.
+        Третье значение — True, если клиент отстал дальше буфера (нужно
+        перечитать страницу целиком).
+        """
+        sub = Subscription(self.client_queue)
+        with self._lock:
+            self._subscribers.add(sub)
+            if last_event_id is None:
+                return sub, [], False
+            missed = [e for e in self._buffer if e.id > last_event_id]
+            oldest = self._buffer[0].id if self._buffer else self._next_id
+            # Отстал дальше буфера или id из прошлого запуска панели
+            gap = last_event_id + 1 < oldest or last_event_id >= self._next_id
+        return sub, missed, gap
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def stream(self, last_event_id: int | None = None, heartbeat: float = HEARTBEAT_INTERVAL):
+        """Генератор SSE-текста для ответа фреймворка (одна подписка на соединение)."""
+        sub, missed, gap = self.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            if gap:
+                yield "event: resync\ndata: {}\n\n"
+            for event in missed:
+                yield event.encode()
+            while True:
+                event = sub.get(timeout=heartbeat)
+                if sub.overflowed:
+                    yield "event: resync\ndata: {}\n\n"
+                    return
+                yield event.encode() if event is not None else ": ping\n\n"
+        finally:
+            self.unsubscribe(sub)
+
+
+class FeedPoller:
+    """Один фоновый поток опрашивает Supabase для всех слушателей Broadcaster."""
+
+    def __init__(self, client, broadcaster: Broadcaster, interval: float = LIVE_FEED_INTERVAL):
+        self.client = client
+        self.broadcaster = broadcaster
+        self.interval = interval
+        self.watermarks: dict[str, int | None] = {"conversations": None, "feedback": None}
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def _latest_id(self, table: str) -> int:
+        rows = self.client.table(table).select("id").order("id", desc=True).limit(1).execute().data or []
+        return rows[0]["id"] if rows else 0
+
+    def _fetch(self, table: str, columns: str) -> list[dict]:
+        rows = (
+            self.client.table(table).select(columns).gt("id", self.watermarks[table])
+            .order("id").limit(BATCH_SIZE).execute().data
+            or []
+        )
+        if rows:
+            self.watermarks[table] = rows[-1]["id"]
+        return rows
+
+    def poll_once(self) -> int:
+        """Публикует новые строки. Возвращает число событий."""
+        for table, mark in self.watermarks.items():
+            if mark is None:
+                # Первая подписка — события только с этого момента
+                self.watermarks[table] = self._latest_id(table)
+
+        published = 0
+        for row in self._fetch("conversations", CONVERSATION_FIELDS):
+            if row.get("answer"):
+                row["answer"] = row["answer"][:ANSWER_PREVIEW]
+            self.broadcaster.publish(
+                "rejection" if row.get("source") == "rejected" else "conversation", row
+            )
+            published += 1
+        for row in self._fetch("feedback", "id,chat_id,rating,comment,question,created_at"):
+            self.broadcaster.publish("feedback", row)
+            published += 1
+        return published
+
+    def run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if not self.broadcaster.subscribers:
+                # Никто не смотрит — не ходим в Supabase; следующий слушатель
+                # начнёт с текущего момента
+                self.watermarks = dict.fromkeys(self.watermarks)
+                continue
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.warning(f"[live-feed] Ошибка опроса: {e}")
+
+    def ensure_started(self) -> None:
+        """Запуск потока при первом SSE-подключении."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self.run, name="live-feed", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
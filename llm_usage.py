@@ -0,0 +1,205 @@
+"""
+llm_usage.py — Учёт токенов и стоимости вызовов Claude.
+
+Раньше answer_question отбрасывал response.usage: не было видно, сколько
+входных, выходных и кэшированных токенов стоил вопрос, какие секции
+поиска раздувают промпт и кто из пользователей тратит бюджет. Теперь:
+
+    usage_from_response(usage)  — токены вызова (rag._generate кладёт их
+                                  в meta["usage"], размеры секций — в
+                                  meta["sections"]);
+    cost_usd(model, row)        — стоимость по PRICES;
+    UsageRecorder               — пачечная запись в llm_usage (бот не ждёт
+                                  Supabase на каждый вызов);
+    fetch_report / format_cost  — сводка по дням, чатам и секциям для
+                                  /cost и admin_panel (/api/admin/cost).
+
+Таблица и агрегаты — supabase_llm_usage.sql.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+LLM_USAGE_FLUSH_INTERVAL = float(os.getenv("LLM_USAGE_FLUSH_INTERVAL", "10"))
+LLM_USAGE_BATCH_SIZE = int(os.getenv("LLM_USAGE_BATCH_SIZE", "100"))
+# Supabase недоступен — дольше копить нельзя, старые строки отбрасываются
+MAX_BUFFER = 5000
+
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")
+
+# USD за миллион токенов в порядке TOKEN_FIELDS: вход, выход, чтение из кэша,
+# запись в кэш (5 мин); ключ — префикс имени модели
+PRICES: dict[str, tuple[float, float, float, float]] = {
+    "claude-haiku-4-5": (1.00, 5.00, 0.10, 1.25),
+    "claude-sonnet-4-5": (3.00, 15.00, 0.30, 3.75),
+}
+
+
+def usage_from_response(usage) -> dict:
+    """Токены из response.usage Anthropic (отсутствующие поля — 0)."""
+    return {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cache_read_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+        "cache_write_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+    }
+
+
+def cost_usd(model: str, row: dict) -> float:
+    """Стоимость вызова; модель без цены в PRICES — 0 (и предупреждение в лог)."""
+    prices = next((p for prefix, p in PRICES.items() if model.startswith(prefix)), None)
+    if prices is None:
+        logger.warning(f"[usage] Нет цены для модели {model}")
+        return 0.0
+    tokens = [row.get(field, 0) for field in TOKEN_FIELDS]
+    return round(sum(t * p for t, p in zip(tokens, prices)) / 1_000_000, 6)
+
+
+def usage_rows(chat_id: int | None, meta: dict) -> list[dict]:
+    """Строки llm_usage для вызовов Claude одного ответа (meta из answer_question)."""
+    sections = meta.get("sections") or {}
+    context_chars = sum(sections.values())
+    rows = []
+    for call in meta.get("usage") or []:
+        row = {field: call.get(field, 0) for field in TOKEN_FIELDS}
+        row.update(
+            chat_id=chat_id,
+            model=call["model"],
+            source=meta.get("source"),
+            context_chars=context_chars,
+            sections=sections,
+            cost_usd=cost_usd(call["model"], call),
+            cancelled=call.get("cancelled", False),
+        )
+        rows.append(row)
+    return rows
+
+
+class UsageRecorder:
+    """Буфер строк llm_usage: вставка пачкой раз в interval секунд или по batch_size."""
+
+    def __init__(self, client, table: str = "llm_usage",
+                 interval: float = LLM_USAGE_FLUSH_INTERVAL,
+                 batch_size: int = LLM_USAGE_BATCH_SIZE):
+        self.client = client
+        self.table = table
+        self.interval = interval
+        self.batch_size = batch_size
+        self._buffer: list[dict] = []
+        self._lock = threading.Lock()
+        self._wakeup: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self.written = 0
+        self.dropped = 0
+
+    def record(self, rows: list[dict]) -> None:
+        if not rows:
+            return
+        with self._lock:
+            self._buffer.extend(rows)
+            overflow = len(self._buffer) - MAX_BUFFER
+            if overflow > 0:
+                del self._buffer[:overflow]
+                self.dropped += overflow
+            full = len(self._buffer) >= self.batch_size
+        if full and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def flush(self) -> int:
+        """Записывает накопленное; при ошибке строки возвращаются в буфер."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        written = 0
+        try:
+            while written < len(rows):
+                batch = rows[written:written + self.batch_size]
+                self.client.table(self.table).insert(batch).execute()
+                written += len(batch)
+        except Exception:
+            with self._lock:
+                self._buffer[:0] = rows[written:]
+            raise
+        finally:
+            self.written += written
+        return written
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.warning(f"[usage] Ошибка записи llm_usage: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = self._loop.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await asyncio.to_thread(self.flush)
+        except Exception as e:
+            logger.warning(f"[usage] Строки llm_usage не сохранены: {e}")
+
+
+# ─── Отчёты (/cost, admin_panel) ──────────────────────────────────────────────
+
+def fetch_report(client, days: int = 7, top: int = 10) -> dict:
+    since = (date.today() - timedelta(days=days - 1)).isoformat()
+    daily = (
+        client.table("llm_usage_daily").select("*").gte("day", since)
+        .order("day", desc=True).execute().data
+        or []
+    )
+    chats = client.rpc("llm_usage_top_chats", {"p_days": days, "p_limit": top}).execute().data or []
+    sections = client.rpc("llm_usage_sections", {"p_days": days}).execute().data or []
+    totals = {field: sum(int(d.get(field) or 0) for d in daily)
+              for field in ("calls", "cancelled") + TOKEN_FIELDS}
+    totals["cost_usd"] = round(sum(float(d.get("cost_usd") or 0) for d in daily), 4)
+    return {"days": days, "totals": totals, "daily": daily, "top_chats": chats, "sections": sections}
+
+
+def format_cost(report: dict, top: int = 5) -> str:
+    """Текст /cost."""
+    totals = report["totals"]
+    lines = [
+        f"💰 Claude за {report['days']} дн.: ${totals['cost_usd']:.2f}, вызовов {totals['calls']} "
+        f"(отменено {totals['cancelled']})",
+        f"🔤 Токены: вход {totals['input_tokens']}, выход {totals['output_tokens']}, "
+        f"кэш чтение {totals['cache_read_tokens']} / запись {totals['cache_write_tokens']}",
+    ]
+    if report["daily"]:
+        lines.append("\n📅 По дням:")
+        lines += [f"  {d['day']}: ${float(d['cost_usd'] or 0):.2f}, вызовов {d['calls']}, "
+                  f"контекст ~{d['avg_context_chars']} симв." for d in report["daily"]]
+    if report["top_chats"]:
+        lines.append("\n👤 Самые дорогие чаты:")
+        for chat in report["top_chats"][:top]:
+            name = f"@{chat['username']}" if chat.get("username") else chat.get("first_name") or ""
+            lines.append(f"  {chat['chat_id']} {name}: ${float(chat['cost_usd'] or 0):.2f}, "
+                         f"вызовов {chat['calls']}, макс. контекст {chat['max_context_chars']}")
+    if report["sections"]:
+        lines.append("\n📚 Секции контекста (средн. / макс. симв.):")
+        lines += [f"  {s['section']}: {s['avg_chars']} / {s['max_chars']}" for s in report["sections"]]
+    return "\n".join(lines)
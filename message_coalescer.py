@@ -0,0 +1,158 @@
+"""
+message_coalescer.py — Склейка серии коротких сообщений в один вопрос.
+
+Пользователи часто пишут вопрос в 2–4 сообщения подряд:
+    «Здравствуйте»
+    «подскажите по omarket»
+    «какой срок оплаты поставщику?»
+Раньше каждый фрагмент запускал отдельный поиск + вызов Claude и тратил
+лимит сообщений (rate_limiter.py). Теперь сообщения чата копятся в буфере,
+пока пользователь печатает, и уходят в обработку одним текстом:
+
+  - окно COALESCE_WINDOW сек: каждое новое сообщение продлевает ожидание;
+  - COALESCE_MAX_WAIT сек от первого фрагмента — дольше не ждём никогда;
+  - MAX_PARTS фрагментов или MAX_CHARS символов — отправляем сразу.
+
+submit() не блокирует: хендлер сразу возвращается, поэтому склейка
+работает и при MAX_CONCURRENT_UPDATES=1. Отправку делает одна фоновая
+задача на чат, которая спит до дедлайна (без отмены/пересоздания таймера
+на каждое сообщение). COALESCE_WINDOW=0 — склейка выключена.
+
+Буфер живёт в памяти процесса: при нескольких репликах (BOT_MODE=webhook)
+фрагменты, попавшие на разные реплики, не склеиваются — это лишь
+возврат к прежнему поведению, а не ошибка.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+COALESCE_WINDOW = float(os.getenv("COALESCE_WINDOW", "1.5"))
+COALESCE_MAX_WAIT = float(os.getenv("COALESCE_MAX_WAIT", "6"))
+MAX_PARTS = 10
+MAX_CHARS = 3000
+
+# on_flush(chat_id, объединённый текст, payload-ы фрагментов по порядку)
+FlushCallback = Callable[[Any, str, list], Awaitable[None]]
+
+
+@dataclass
+class _Burst:
+    first_at: float
+    deadline: float
+    texts: list[str] = field(default_factory=list)
+    payloads: list = field(default_factory=list)
+    chars: int = 0
+
+
+def merge_texts(texts: list[str]) -> str:
+    """Объединяет фрагменты: по строке на сообщение, без пустых и дублей подряд."""
+    merged: list[str] = []
+    for text in texts:
+        text = text.strip()
+        if text and (not merged or merged[-1] != text):
+            merged.append(text)
+    return "\n".join(merged)
+
+
+class MessageCoalescer:
+    """Буферизует сообщения по chat_id и вызывает on_flush один раз на серию."""
+
+    def __init__(self, on_flush: FlushCallback, window: float = COALESCE_WINDOW,
+                 max_wait: float = COALESCE_MAX_WAIT, max_parts: int = MAX_PARTS,
+                 max_chars: int = MAX_CHARS):
+        self.on_flush = on_flush
+        self.window = window
+        self.max_wait = max(max_wait, window)
+        self.max_parts = max_parts
+        self.max_chars = max_chars
+        self._bursts: dict[Any, _Burst] = {}
+        self._timers: dict[Any, asyncio.Task] = {}
+        self._inflight: set[asyncio.Task] = set()
+        self.merged_messages = 0   # сколько фрагментов сэкономили (для логов/метрик)
+
+    def __len__(self) -> int:
+        return len(self._bursts)
+
+    async def submit(self, chat_id, text: str, payload=None) -> None:
+        """Добавляет сообщение в буфер чата. При window=0 — обработка сразу."""
+        if self.window <= 0:
+            await self._run(chat_id, [text], [payload])
+            return
+
+        now = time.monotonic()
+        burst = self._bursts.get(chat_id)
+        if burst is None:
+            burst = self._bursts[chat_id] = _Burst(first_at=now, deadline=now)
+        burst.texts.append(text)
+        burst.payloads.append(payload)
+        burst.chars += len(text)
+        burst.deadline = min(now + self.window, burst.first_at + self.max_wait)
+
+        if len(burst.texts) >= self.max_parts or burst.chars >= self.max_chars:
+            self._flush_now(chat_id)
+        elif chat_id not in self._timers:
+            self._timers[chat_id] = asyncio.get_running_loop().create_task(self._wait(chat_id))
+
+    def discard(self, chat_id) -> bool:
+        """Выбрасывает несобранную серию (например, по /clear)."""
+        timer = self._timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
+        return self._bursts.pop(chat_id, None) is not None
+
+    async def stop(self) -> None:
+        """Отправляет все накопленные серии (при остановке бота)."""
+        for chat_id in list(self._bursts):
+            self._flush_now(chat_id)
+        pending = list(self._timers.values()) + list(self._inflight)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    # ─── Внутреннее ──────────────────────────────────────────────────────────
+
+    async def _wait(self, chat_id) -> None:
+        try:
+            while True:
+                burst = self._bursts.get(chat_id)
+                if burst is None:
+                    return
+                delay = burst.deadline - time.monotonic()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # discard() или _flush_now(): серию уже забрали
+            return
+        # Дальше это уже обработка: новые сообщения начнут следующую серию
+        task = self._timers.pop(chat_id)
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+        burst = self._bursts.pop(chat_id, None)
+        if burst is not None:
+            await self._run(chat_id, burst.texts, burst.payloads)
+
+    def _flush_now(self, chat_id) -> None:
+        timer = self._timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
+        burst = self._bursts.pop(chat_id)
+        task = asyncio.get_running_loop().create_task(
+            self._run(chat_id, burst.texts, burst.payloads)
+        )
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, chat_id, texts: list[str], payloads: list) -> None:
+        try:
+            if len(texts) > 1:
+                self.merged_messages += len(texts) - 1
+                logger.info(f"[coalesce] chat_id={chat_id}: склеено {len(texts)} сообщений")
+            await self.on_flush(chat_id, merge_texts(texts), payloads)
+        except Exception as e:
+            logger.error(f"[coalesce] Ошибка обработки chat_id={chat_id}: {e}", exc_info=True)
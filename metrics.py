@@ -0,0 +1,354 @@
+"""
+metrics.py — Метрики процесса в текстовом формате Prometheus (/metrics).
+
+Раньше о работе бота и панели можно было узнать только из logger.info.
+Теперь счётчики, gauge и гистограммы живут в реестре REGISTRY и отдаются
+эндпоинтом /metrics (bot.py — встроенный HTTP-сервер async_http.py,
+admin_panel.py — маршрут Flask):
+
+    counter / gauge / histogram(name, help, labels) — метрика в REGISTRY;
+        значения с метками — metric.labels(rpc="search_chunks").inc();
+    callback(name, help, kind, fn)  — значение считается при выдаче
+        (длина очереди, RSS, счётчики TTLCache);
+    instrument_rpc(client)          — задержка и ошибки Supabase RPC по имени;
+    LoopLagMonitor                  — задержка event loop (asyncio);
+    REGISTRY.render()               — текст для ответа с CONTENT_TYPE.
+
+Без prometheus_client: формат 0.0.4 простой, а зависимость ради пары
+метрик не нужна.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы гистограмм задержек, сек: от быстрых RPC до генерации Claude
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._children: dict[tuple, object] = {}
+
+    def labels(self, **values):
+        key = tuple(str(values[name]) for name in self.label_names)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def _default(self):
+        # Метрика без меток — сама себе единственный «ребёнок»
+        if self.label_names:
+            raise ValueError(f"{self.name}: нужны метки {self.label_names}")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            lines += child.render(self.name, self.label_names, key)
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def render(self, name, label_names, key) -> list[str]:
+        return [f"{name}{_format_labels(label_names, key)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def inc(self, amount: float = 1) -> None:
+        self._default().inc(amount)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)     # последний — +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def render(self, name, label_names, key) -> list[str]:
+        with self._lock:
+            counts, total_sum = list(self.counts), self.sum
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{name}_bucket{_format_labels(label_names, key, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(label_names, key)} {_format_value(total_sum)}")
+        lines.append(f"{name}_count{_format_labels(label_names, key)} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+class _Callback(_Metric):
+    """Значения считаются при выдаче: fn() → {значения меток: число}."""
+
+    def __init__(self, name: str, help: str, kind: str, labels: Iterable[str],
+                 fn: Callable[[], dict]):
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self.fn = fn
+
+    def render(self) -> list[str]:
+        try:
+            values = self.fn()
+        except Exception as e:
+            logger.warning(f"[metrics] {self.name}: {e}")
+            return []
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in values.items():
+            key = key if isinstance(key, tuple) else (key,) if self.label_names else ()
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        # Повторная регистрация (перезагрузка модуля, тесты) — та же метрика
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None and not isinstance(metric, _Callback):
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str, labels: Iterable[str] = (), registry: Registry = REGISTRY) -> Counter:
+    return registry.register(Counter(name, help, labels))
+
+
+def gauge(name: str, help: str, labels: Iterable[str] = (), registry: Registry = REGISTRY) -> Gauge:
+    return registry.register(Gauge(name, help, labels))
+
+
+def histogram(name: str, help: str, labels: Iterable[str] = (), buckets: tuple = DEFAULT_BUCKETS,
+              registry: Registry = REGISTRY) -> Histogram:
+    return registry.register(Histogram(name, help, labels, buckets))
+
+
+def callback(name: str, help: str, kind: str, fn: Callable[[], dict | float],
+             labels: Iterable[str] = (), registry: Registry = REGISTRY) -> None:
+    """Метрика, значение которой берётся из fn при каждом /metrics."""
+    labels = tuple(labels)
+    values = fn if labels else (lambda: {(): fn()})
+    registry.register(_Callback(name, help, kind, labels, values))
+
+
+# ─── Процесс ──────────────────────────────────────────────────────────────────
+
+def process_rss_bytes() -> int:
+    """Текущий RSS (Linux /proc); иначе — пиковый из getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+_started_at = time.time()
+callback("process_resident_memory_bytes", "Resident memory size in bytes.", "gauge", process_rss_bytes)
+callback("process_start_time_seconds", "Start time of the process since unix epoch in seconds.",
+         "gauge", lambda: _started_at)
+
+
+# ─── Supabase RPC ─────────────────────────────────────────────────────────────
+
+SUPABASE_RPC_SECONDS = histogram("supabase_rpc_duration_seconds",
+                                 "Supabase RPC latency by function name.", ["rpc"])
+SUPABASE_RPC_ERRORS = counter("supabase_rpc_errors_total", "Failed Supabase RPC calls.", ["rpc"])
+
+
+class _TimedRpc:
+    def __init__(self, builder, name: str):
+        self._builder = builder
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._builder, attr)
+
+    def execute(self):
+        try:
+            with SUPABASE_RPC_SECONDS.labels(rpc=self._name).time():
+                return self._builder.execute()
+        except Exception:
+            SUPABASE_RPC_ERRORS.labels(rpc=self._name).inc()
+            raise
+
+
+class _InstrumentedClient:
+    """Клиент Supabase, у которого .rpc(name, ...).execute() попадает в метрики."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, attr):
+        return getattr(self._client, attr)
+
+    def rpc(self, name: str, *args, **kwargs):
+        return _TimedRpc(self._client.rpc(name, *args, **kwargs), name)
+
+
+def instrument_rpc(client):
+    return _InstrumentedClient(client)
+
+
+# ─── Задержка event loop ──────────────────────────────────────────────────────
+
+# Гистограмма, а не gauge последнего замера: короткую блокировку loop между
+# двумя опросами Prometheus иначе не видно
+EVENT_LOOP_LAG = histogram("event_loop_lag_seconds",
+                           "How late the asyncio loop woke up a periodic timer.",
+                           buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+
+
+class LoopLagMonitor:
+    """Раз в interval секунд засыпает и меряет, насколько позже проснулся."""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(0.0, loop.time() - started - self.interval))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -12,28 +12,68 @@ rag.py — Логика поиска через Supabase + генерация о
 
 import os
 import re
-from anthropic import Anthropic
-from supabase import create_client
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+from functools import lru_cache
 from dotenv import load_dotenv
 from answer_rejection_system import AnswerRejectionSystem
+from dedup_index import drop_near_duplicates
+from clients import LazyClient, get_anthropic, get_supabase
+from degraded_mode import CircuitBreaker, build_digest
+from llm_usage import usage_from_response
+from metrics import counter, histogram
 
 load_dotenv(override=True)
 
 # ─── Клиенты ──────────────────────────────────────────────────────────────────
+# Создаются при первом обращении (clients.py): импорт rag не требует .env
+# и не тянет пакеты anthropic/supabase, пока они не нужны.
 
-anthropic_client = Anthropic(api_key=os.environ["ANTHROPIC_API_KEY"])
+anthropic_client = LazyClient(get_anthropic)
+
+supabase = LazyClient(get_supabase)
+
+# ─── Отмена устаревших ответов ────────────────────────────────────────────────
+
+class AnswerCancelled(Exception):
+    """Ответ больше не нужен: пользователь уже задал новый вопрос (см. chat_tasks.py)."""
+
+
+# Состояние Claude API: при серии ошибок отвечаем дайджестом без LLM
+llm_breaker = CircuitBreaker()
+CLAUDE_MODEL = "claude-haiku-4-5-20251001"
+
+# ─── Метрики (metrics.py, /metrics) ──────────────────────────────────────────
+CLAUDE_SECONDS = histogram("claude_request_duration_seconds",
+                           "Claude call latency by outcome (ok / cancelled / error).", ["outcome"])
+CLAUDE_TOKENS = counter("claude_tokens_total", "Claude tokens by type.", ["type"])
+REJECTIONS = counter("answer_rejections_total",
+                     "Answers rejected by AnswerRejectionSystem.", ["reason_code"])
+
+
+def _checkpoint(should_cancel: Callable[[], bool] | None) -> None:
+    if should_cancel is not None and should_cancel():
+        raise AnswerCancelled()
 
-supabase = create_client(
-    os.environ["SUPABASE_URL"],
-    os.environ["SUPABASE_KEY"],
-)
 
 # ─── Системный промпт ─────────────────────────────────────────────────────────
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 _PROMPT_PATH = os.path.join(BASE_DIR, "prompts", "system_prompt.txt")
-with open(_PROMPT_PATH, encoding="utf-8") as f:
-    SYSTEM_PROMPT = f.read()
+
+
+@lru_cache(maxsize=1)
+def get_system_prompt() -> str:
+    with open(_PROMPT_PATH, encoding="utf-8") as f:
+        return f.read()
+
+
+def __getattr__(name: str):
+    # Обратная совместимость: rag.SYSTEM_PROMPT читает файл при первом обращении
+    if name == "SYSTEM_PROMPT":
+        return get_system_prompt()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ─── Ключевые слова для детекции вопросов о способе закупки ──────────────────
 
@@ -165,6 +205,26 @@ def check_ktru_perechen(question: str) -> list[dict]:
     return []
 
 
+# Метаданные по каждому типу перечня (контекст Claude и дайджест degraded_mode.py)
+PERECHEN_META = {
+    "upolnomoch_organ": {
+        "title": "ПЕРЕЧЕНЬ ТРУ — СПОСОБ ЗАКУПКИ ОПРЕДЕЛЯЕТ УПОЛНОМОЧЕННЫЙ ОРГАН",
+        "npa":   "Приказ МФ РК от 15.08.2024 №546 (рег. №34933)",
+        "url":   "https://adilet.zan.kz/rus/docs/V2400034933",
+    },
+    "ooi": {
+        "title": "ПЕРЕЧЕНЬ ТРУ — ЗАКУПАЮТСЯ У ОРГАНИЗАЦИЙ ЛИЦ С ИНВАЛИДНОСТЬЮ (ООИ)",
+        "npa":   "Приказ Минтруда и соцзащиты РК от 03.09.2024 №345 (рег. №35032)",
+        "url":   "https://adilet.zan.kz/rus/docs/V2400035032",
+    },
+    "msb": {
+        "title": "ПЕРЕЧЕНЬ ТРУ — ЗАКУПАЮТСЯ У СУБЪЕКТОВ МСБ/МСП",
+        "npa":   "Приказ МФ РК от 08.10.2024 №677 (рег. №35226)",
+        "url":   "https://adilet.zan.kz/rus/docs/V2400035226",
+    },
+}
+
+
 def build_ktru_context(ktru_items: list[dict]) -> str:
     """
     Форматирует найденные позиции перечней в контекст для Claude.
@@ -173,25 +233,6 @@ def build_ktru_context(ktru_items: list[dict]) -> str:
     if not ktru_items:
         return ""
 
-    # Метаданные по каждому типу перечня
-    PERECHEN_META = {
-        "upolnomoch_organ": {
-            "title": "ПЕРЕЧЕНЬ ТРУ — СПОСОБ ЗАКУПКИ ОПРЕДЕЛЯЕТ УПОЛНОМОЧЕННЫЙ ОРГАН",
-            "npa":   "Приказ МФ РК от 15.08.2024 №546 (рег. №34933)",
-            "url":   "https://adilet.zan.kz/rus/docs/V2400034933",
-        },
-        "ooi": {
-            "title": "ПЕРЕЧЕНЬ ТРУ — ЗАКУПАЮТСЯ У ОРГАНИЗАЦИЙ ЛИЦ С ИНВАЛИДНОСТЬЮ (ООИ)",
-            "npa":   "Приказ Минтруда и соцзащиты РК от 03.09.2024 №345 (рег. №35032)",
-            "url":   "https://adilet.zan.kz/rus/docs/V2400035032",
-        },
-        "msb": {
-            "title": "ПЕРЕЧЕНЬ ТРУ — ЗАКУПАЮТСЯ У СУБЪЕКТОВ МСБ/МСП",
-            "npa":   "Приказ МФ РК от 08.10.2024 №677 (рег. №35226)",
-            "url":   "https://adilet.zan.kz/rus/docs/V2400035226",
-        },
-    }
-
     # Группируем по типу
     from collections import defaultdict
     groups: dict[str, list[dict]] = defaultdict(list)
@@ -537,7 +578,116 @@ def build_context(chunks: list[dict]) -> str:
 
 # ─── Основная функция ─────────────────────────────────────────────────────────
 
-def answer_question(question: str, conversation_history: list) -> tuple[str, int, bool]:
+def _record_usage(usage: list | None, response_usage, cancelled: bool = False) -> None:
+    if response_usage is None:
+        return
+    tokens = usage_from_response(response_usage)
+    for token_type, count in tokens.items():
+        CLAUDE_TOKENS.labels(type=token_type.removesuffix("_tokens")).inc(count)
+    if usage is not None:
+        usage.append({"model": CLAUDE_MODEL, **tokens, "cancelled": cancelled})
+
+
+def _generate(system: list, messages: list,
+              should_cancel: Callable[[], bool] | None = None,
+              usage: list | None = None) -> str:
+    """
+    Вызов Claude. С should_cancel ответ читается потоком и обрывается, как
+    только он стал не нужен — оставшиеся токены не генерируются.
+    В usage (если передан) добавляются токены вызова (llm_usage.py).
+    """
+    params = dict(
+        model=CLAUDE_MODEL,
+        max_tokens=1500,
+        system=system,
+        messages=messages,
+    )
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        if should_cancel is None:
+            response = anthropic_client.messages.create(**params)
+            _record_usage(usage, response.usage)
+            outcome = "ok"
+            return response.content[0].text
+
+        parts = []
+        with anthropic_client.messages.stream(**params) as stream:
+            try:
+                for text in stream.text_stream:
+                    # Выход из with закрывает соединение — генерация прекращается
+                    _checkpoint(should_cancel)
+                    parts.append(text)
+                outcome = "ok"
+            except AnswerCancelled:
+                outcome = "cancelled"
+                raise
+            finally:
+                # При отмене выходные токены известны только до обрыва потока
+                try:
+                    snapshot_usage = stream.current_message_snapshot.usage
+                except Exception:
+                    snapshot_usage = None
+                _record_usage(usage, snapshot_usage, cancelled=outcome == "cancelled")
+        return "".join(parts)
+    finally:
+        CLAUDE_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - started)
+
+
+def system_blocks(context: str) -> list[dict]:
+    """
+    Системный промпт отдельным блоком: неизменный префикс кэшируется у
+    Anthropic независимо от найденного контекста (его прогревает warmup()),
+    второй breakpoint — на промпт + контекст, как раньше.
+    """
+    return [
+        {
+            "type": "text",
+            "text": get_system_prompt(),
+            "cache_control": {"type": "ephemeral"}
+        },
+        {
+            "type": "text",
+            "text": context,
+            "cache_control": {"type": "ephemeral"}
+        },
+    ]
+
+
+@dataclass
+class Retrieval:
+    """Результат поиска (шаги 1–7 answer_question) — контекст для Claude или дайджест."""
+    ktru_items: list[dict] = field(default_factory=list)
+    platform: str | None = None
+    platform_chunks: list[dict] = field(default_factory=list)
+    law_chunks: list[dict] = field(default_factory=list)
+    civil_chunks: list[dict] = field(default_factory=list)
+    tax_chunks: list[dict] = field(default_factory=list)
+    conflict_info: dict | None = None
+    conflict_chunks: list[dict] = field(default_factory=list)
+
+    @property
+    def all_chunks(self) -> list[dict]:
+        return (self.platform_chunks + self.law_chunks + self.civil_chunks
+                + self.tax_chunks + self.conflict_chunks)
+
+    def digest(self) -> str:
+        """Ответ без LLM (degraded_mode.py): перечни ТРУ и ключевые фрагменты норм."""
+        platform_label = "Инструкции goszakup.gov.kz" if self.platform == "goszakup" else "Инструкции omarket.kz"
+        return build_digest(
+            self.ktru_items,
+            [
+                (platform_label, self.platform_chunks),
+                ("Нормативные документы", self.law_chunks),
+                ("Конфликтующие нормы", self.conflict_chunks),
+                ("Гражданский кодекс РК", self.civil_chunks),
+                ("Налоговый кодекс РК", self.tax_chunks),
+            ],
+            PERECHEN_META,
+        )
+
+
+def retrieve(question: str, should_cancel: Callable[[], bool] | None = None) -> Retrieval:
     """
     Пятишаговый поиск:
       Шаг 1 — Перечни ТРУ (КТРУ, ООИ, МСБ)
@@ -545,32 +695,23 @@ def answer_question(question: str, conversation_history: list) -> tuple[str, int
       Шаг 3 — Нормы Закона и Правил госзакупок
       Шаг 4 — Статьи ГК РК (договоры, ответственность, неустойка) — если нужно
       Шаг 5 — Нормы Налогового кодекса (НДС, льготы, учет) — если нужно
-
-    Args:
-        question: Вопрос пользователя.
-        conversation_history: История диалога.
-
-    Returns:
-        Tuple: (ответ Claude, количество найденных чанков, был ли найден КТРУ)
+    плюс обнаружение конфликтующих норм и удаление дублей между секциями.
     """
+    # Вопрос мог устареть, пока ждал своей очереди (request_scheduler.py)
+    _checkpoint(should_cancel)
+
     # ── Шаг 1: Перечень ТРУ ───────────────────────────────────────────────────
     ktru_items = check_ktru_perechen(question)
-    ktru_context = build_ktru_context(ktru_items)
+
+    _checkpoint(should_cancel)
 
     # ── Шаг 2: Определяем платформу и ищем инструкции ────────────────────────
     platform = detect_platform(question)
     platform_chunks = []
-    platform_context = ""
 
     if platform:
         # Ищем сначала по конкретной платформе (приоритетно)
         platform_chunks = search_supabase(question, top_n=2, platform=platform)
-        if platform_chunks:
-            platform_label = "GOSZAKUP.GOV.KZ" if platform == "goszakup" else "OMARKET.KZ"
-            platform_context = (
-                f"# ИНСТРУКЦИИ ПО РАБОТЕ С ПОРТАЛОМ {platform_label}\n\n"
-                + build_context(platform_chunks)
-            )
 
     # ── Шаг 3: Поиск по нормативным чанкам (закон, правила) ──────────────────
     # Если вопрос строго про площадку — законодательные нормы менее важны,
@@ -583,6 +724,8 @@ def answer_question(question: str, conversation_history: list) -> tuple[str, int
     if not law_chunks and not platform_chunks:
         law_chunks = search_supabase(question, top_n=3)
 
+    _checkpoint(should_cancel)
+
     # ── Шаг 4: Нормы ГК РК (если вопрос про договоры, ответственность, etc.) ──
     civil_chunks = []
     if needs_civil_code(question):
@@ -593,27 +736,89 @@ def answer_question(question: str, conversation_history: list) -> tuple[str, int
     if needs_tax_code(question):
         tax_chunks = search_supabase(question, top_n=2, platform="tax")
 
+    _checkpoint(should_cancel)
+
     # ── Шаг 6: Обнаружение конфликтующих норм ────────────────────────────────────
     all_chunks = platform_chunks + law_chunks + civil_chunks + tax_chunks
     conflict_info = detect_conflicting_norms(question, all_chunks)
     conflict_chunks = []
     if conflict_info:
         conflict_chunks = conflict_info.get("conflicting_chunks", [])
-        all_chunks += conflict_chunks
+
+    # ── Шаг 7: Убираем дубли между секциями ──────────────────────────────────────
+    # Один и тот же текст может прийти и как норма закона, и как конфликтующая
+    # норма — в контекст Claude он попадает один раз (меньше входных токенов)
+    platform_chunks, law_chunks, civil_chunks, tax_chunks, conflict_chunks = drop_near_duplicates(
+        [platform_chunks, law_chunks, civil_chunks, tax_chunks, conflict_chunks]
+    )
+    return Retrieval(ktru_items, platform, platform_chunks, law_chunks, civil_chunks,
+                     tax_chunks, conflict_info, conflict_chunks)
+
+
+def answer_question(question: str, conversation_history: list,
+                    should_cancel: Callable[[], bool] | None = None,
+                    use_llm: bool = True,
+                    meta: dict | None = None) -> tuple[str, int, bool]:
+    """
+    Поиск (retrieve) + ответ Claude. Если Claude недоступен (разомкнут
+    llm_breaker или все попытки неудачны) или use_llm=False (перегрузка,
+    см. degraded_mode.py) — возвращает дайджест найденного без LLM.
+
+    Args:
+        question: Вопрос пользователя.
+        conversation_history: История диалога.
+        should_cancel: Вызывается между шагами поиска и во время генерации;
+            True — бросаем AnswerCancelled, не тратя запросы и токены.
+        use_llm: False — сразу дайджест (режим «только поиск»).
+        meta: Если передан, в meta["source"] записывается путь ответа:
+            llm / digest / rejected / empty (conversations.source, см.
+            supabase_stats_rollup.sql), в meta["usage"] — токены вызовов
+            Claude, в meta["sections"] — размер секций контекста в символах
+            (llm_usage.py).
+
+    Returns:
+        Tuple: (ответ Claude, количество найденных чанков, был ли найден КТРУ)
+    """
+    found = retrieve(question, should_cancel)
+    ktru_items, platform = found.ktru_items, found.platform
+    platform_chunks, law_chunks = found.platform_chunks, found.law_chunks
+    civil_chunks, tax_chunks = found.civil_chunks, found.tax_chunks
+    conflict_info, conflict_chunks = found.conflict_info, found.conflict_chunks
+    all_chunks = found.all_chunks
+    if meta is None:
+        meta = {}
 
     if not all_chunks and not ktru_items:
+        meta["source"] = "empty"
         return (
             "По вашему вопросу не найдено релевантных материалов в базе знаний.\n"
             "Попробуйте переформулировать вопрос или уточните название площадки.",
             0, False
         )
 
+    if not use_llm or not llm_breaker.allow():
+        meta["source"] = "digest"
+        return found.digest(), len(all_chunks), bool(ktru_items)
+
     # ── Сборка контекста ───────────────────────────────────────────────────────
+    # sections — размер каждой секции для учёта токенов (llm_usage.py)
     context_parts = []
+    sections: dict[str, int] = {}
+
+    def add_section(name: str, text: str) -> None:
+        context_parts.append(text)
+        sections[name] = sections.get(name, 0) + len(text)
+
+    ktru_context = build_ktru_context(ktru_items)
     if ktru_context:
-        context_parts.append(ktru_context)
-    if platform_context:
-        context_parts.append(platform_context)
+        add_section("ktru", ktru_context)
+    if platform_chunks:
+        platform_label = "GOSZAKUP.GOV.KZ" if platform == "goszakup" else "OMARKET.KZ"
+        add_section(
+            "platform",
+            f"# ИНСТРУКЦИИ ПО РАБОТЕ С ПОРТАЛОМ {platform_label}\n\n"
+            + build_context(platform_chunks)
+        )
 
     # Добавляем информацию о конфликтующих нормах если они обнаружены
     if conflict_info:
@@ -625,79 +830,127 @@ def answer_question(question: str, conversation_history: list) -> tuple[str, int
             f"Объяснение: {conflict_info['explanation']}\n"
             f"Конфликтующие нормы приведены ниже.\n"
         )
-        context_parts.append(conflict_explanation)
+        add_section("conflict", conflict_explanation)
 
     if law_chunks:
-        context_parts.append("# НОРМАТИВНЫЕ ДОКУМЕНТЫ\n\n" + build_context(law_chunks))
+        add_section("law", "# НОРМАТИВНЫЕ ДОКУМЕНТЫ\n\n" + build_context(law_chunks))
     if conflict_chunks:
-        context_parts.append("# КОНФЛИКТУЮЩИЕ НОРМЫ\n\n" + build_context(conflict_chunks))
+        add_section("conflict", "# КОНФЛИКТУЮЩИЕ НОРМЫ\n\n" + build_context(conflict_chunks))
     if civil_chunks:
-        context_parts.append("# ГРАЖДАНСКИЙ КОДЕКС РК (РЕЛЕВАНТНЫЕ СТАТЬИ)\n\n" + build_context(civil_chunks))
+        add_section("civil", "# ГРАЖДАНСКИЙ КОДЕКС РК (РЕЛЕВАНТНЫЕ СТАТЬИ)\n\n" + build_context(civil_chunks))
     if tax_chunks:
-        context_parts.append("# НАЛОГОВЫЙ КОДЕКС РК (НАЛОГИ И УЧЕТ)\n\n" + build_context(tax_chunks))
+        add_section("tax", "# НАЛОГОВЫЙ КОДЕКС РК (НАЛОГИ И УЧЕТ)\n\n" + build_context(tax_chunks))
 
     context = "\n\n".join(context_parts)
-    system = SYSTEM_PROMPT + "\n\n" + context
 
     messages = conversation_history + [{"role": "user", "content": question}]
+    sections["history"] = sum(len(str(m.get("content", ""))) for m in conversation_history)
+    meta["sections"] = sections
+    usage = meta.setdefault("usage", [])
 
-    # Retry при rate limit (до 3 попыток с паузой)
+    # Retry при rate limit (до 3 попыток с паузой), пока breaker не разомкнётся
     for attempt in range(3):
         try:
-            response = anthropic_client.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=1500,
-                system=[
-                    {
-                        "type": "text",
-                        "text": system,
-                        "cache_control": {"type": "ephemeral"}
-                    }
-                ],
-                messages=messages,
-            )
-            answer = response.content[0].text
-
-            # ── Валидация на галлюцинации ─────────────────────────────────────
-            from hallucination_prevention import validate_answer_for_hallucinations
-            validation = validate_answer_for_hallucinations(answer, all_chunks)
-
-            # ── НОВОЕ: Система отклонения ненадежных ответов ────────────────────
-            should_reject, rejection_reason = AnswerRejectionSystem.should_reject_answer(
-                answer=answer,
-                confidence=validation["confidence"],
-                has_critical_issues=len(validation["critical_issues"]) > 0,
-                is_multiple_interpretations=AnswerRejectionSystem.detect_multiple_interpretations(answer),
-                source_coverage=validation["source_coverage"]
-            )
-
-            if should_reject:
-                # Ответ не прошел валидацию - отклонить и предложить альтернативу
-                rejection_message = AnswerRejectionSystem.get_rejection_message(rejection_reason)
-                return rejection_message, len(all_chunks), False  # is_reliable=False
-
-            # Если ответ прошел отклонение, но есть предупреждения - добавить их
-            if validation["critical_issues"]:
-                warning = "\n\n[WARNING] ПРОВЕРКА ИСТОЧНИКОВ:\n"
-                for issue in validation["critical_issues"]:
-                    warning += f"- {issue['message']}\n"
-                answer = answer + warning
-
-            # Если сомнительная уверенность - добавить примечание
-            if validation["confidence"] < 0.85:
-                answer += (
-                    f"\n\nПримечание: Уверенность в ответе {validation['confidence']:.0%}. "
-                    f"Проверьте источники если вопрос критически важен."
-                )
-
-            return answer, len(all_chunks), bool(ktru_items)
+            _checkpoint(should_cancel)
+            answer = _generate(system_blocks(context), messages, should_cancel, usage)
+            llm_breaker.record_success()
+            break
+        except AnswerCancelled:
+            llm_breaker.record_cancelled()
+            raise
         except Exception as e:
+            llm_breaker.record_failure()
             err = str(e)
-            if "rate_limit" in err and attempt < 2:
-                import time
+            if "rate_limit" in err and attempt < 2 and llm_breaker.allow():
                 time.sleep(20)
                 continue
-            raise
+            # Claude недоступен — отдаём найденное без генерации
+            meta["source"] = "digest"
+            return found.digest(), len(all_chunks), bool(ktru_items)
+
+    # ── Валидация на галлюцинации ─────────────────────────────────────────────
+    from hallucination_prevention import validate_answer_for_hallucinations
+    validation = validate_answer_for_hallucinations(answer, all_chunks)
+
+    # ── НОВОЕ: Система отклонения ненадежных ответов ────────────────────────────
+    should_reject, rejection_reason = AnswerRejectionSystem.should_reject_answer(
+        answer=answer,
+        confidence=validation["confidence"],
+        has_critical_issues=len(validation["critical_issues"]) > 0,
+        is_multiple_interpretations=AnswerRejectionSystem.detect_multiple_interpretations(answer),
+        source_coverage=validation["source_coverage"]
+    )
+
+    if should_reject:
+        # Ответ не прошел валидацию - отклонить и предложить альтернативу
+        rejection_message = AnswerRejectionSystem.get_rejection_message(rejection_reason)
+        REJECTIONS.labels(reason_code=rejection_reason.reason_code).inc()
+        meta["source"] = "rejected"
+        return rejection_message, len(all_chunks), False  # is_reliable=False
+
+    # Если ответ прошел отклонение, но есть предупреждения - добавить их
+    if validation["critical_issues"]:
+        warning = "\n\n[WARNING] ПРОВЕРКА ИСТОЧНИКОВ:\n"
+        for issue in validation["critical_issues"]:
+            warning += f"- {issue['message']}\n"
+        answer = answer + warning
+
+    # Если сомнительная уверенность - добавить примечание
+    if validation["confidence"] < 0.85:
+        answer += (
+            f"\n\nПримечание: Уверенность в ответе {validation['confidence']:.0%}. "
+            f"Проверьте источники если вопрос критически важен."
+        )
+
+    meta["source"] = "llm"
+    return answer, len(all_chunks), bool(ktru_items)
+
+
+# ─── Прогрев после старта бота ─────────────────────────────────────────────────
+
+def warmup(prime_cache: bool = False) -> dict:
+    """
+    Готовит всё, что иначе делал бы первый вопрос пользователя: импорт и
+    создание клиентов, TLS-соединения в пулах, чтение промпта, импорт
+    модуля валидации. prime_cache — ещё и запрос к Claude (max_tokens=1),
+    записывающий системный промпт в кэш промптов Anthropic (платно;
+    имеет смысл, только если промпт длиннее минимального кэшируемого).
+    Возвращает длительность шагов в секундах; ошибки шага не прерывают прогрев.
+    """
+
+    def supabase_pool():
+        # Дешёвый запрос открывает соединение, которое переиспользует search_chunks
+        supabase.table("chunks").select("id").limit(1).execute()
+
+    def anthropic_client_init():
+        get_anthropic()
+
+    def prompt_and_modules():
+        get_system_prompt()
+        import hallucination_prevention  # noqa: F401 — импортируется в answer_question
+
+    def prompt_cache():
+        anthropic_client.messages.create(
+            model=CLAUDE_MODEL,
+            max_tokens=1,
+            system=system_blocks("")[:1],
+            messages=[{"role": "user", "content": "ping"}],
+        )
+
+    steps = [("supabase", supabase_pool), ("anthropic", anthropic_client_init),
+             ("prompt", prompt_and_modules)]
+    if prime_cache:
+        steps.append(("prompt_cache", prompt_cache))
+
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            timings[f"{name}_error"] = str(e)[:200]
+        timings[name] = round(time.perf_counter() - started, 3)
+    return timings
 
 
 # ─── Локальное тестирование ───────────────────────────────────────────────────
@@ -0,0 +1,154 @@
+"""
+rate_limiter.py — Ограничение частоты сообщений по алгоритму GCRA.
+
+GCRA (Generic Cell Rate Algorithm) эквивалентен «ведру токенов»: на каждый
+chat_id хранится одно число — TAT (theoretical arrival time), плюс момент
+окончания паузы. Проверка — O(1), без списка меток времени.
+
+Запись, у которой TAT и пауза уже в прошлом, ничем не отличается от
+отсутствующей — её можно удалить без потери информации. Поэтому в памяти
+живут только чаты, писавшие в пределах окна; протухшие записи удаляются
+«колесом» по секундам (амортизированно O(1) на проверку), и память
+ограничена числом активных чатов, а не всех, кто когда-либо писал.
+
+Тарифы (RateTier): лимит сообщений за окно, пауза при превышении.
+По умолчанию admin — без ограничений, trusted — мягче, default — как раньше
+(5 сообщений за 60 сек, пауза 5 минут).
+
+Хранилище:
+    RateLimiter()               — компактный словарь в памяти процесса;
+    RateLimiter(store=backend)  — общий StateBackend (sqlite/redis) через
+                                  atomic_update, для нескольких процессов.
+"""
+
+import math
+import time
+from dataclasses import dataclass
+
+from state_backend import StateBackend
+
+
+@dataclass(frozen=True)
+class RateTier:
+    name: str
+    limit: int | None         # сообщений за окно; None — без ограничений
+    window: float = 60.0      # секунд
+    cooldown: float = 0.0     # пауза при превышении (0 — только GCRA)
+
+    @property
+    def emission(self) -> float:
+        """Интервал «восполнения» одного сообщения."""
+        return self.window / self.limit
+
+    @property
+    def state_ttl(self) -> float:
+        """Дольше этого запись не влияет на решения."""
+        return self.window + self.cooldown
+
+
+DEFAULT_TIERS = {
+    "admin":   RateTier("admin", None),
+    "trusted": RateTier("trusted", 20, 60, 60),
+    "default": RateTier("default", 5, 60, 300),
+}
+
+
+@dataclass(frozen=True)
+class RateDecision:
+    allowed: bool
+    retry_after: float = 0.0   # секунд до следующей попытки
+    tier: str = "default"
+    cooldown: bool = False     # True — отказ из-за паузы после превышения
+
+
+def gcra_step(tat: float, cooldown_until: float, tier: RateTier,
+              now: float) -> tuple[float, float, RateDecision]:
+    """
+    Один шаг GCRA. Возвращает (новый TAT, новый конец паузы, решение).
+    Допускает всплеск до tier.limit сообщений, затем одно сообщение
+    каждые tier.emission секунд.
+    """
+    if cooldown_until > now:
+        return tat, cooldown_until, RateDecision(False, cooldown_until - now, tier.name, True)
+
+    tat = max(tat, now)
+    burst = tier.window - tier.emission
+    if tat - now > burst:
+        # Превышение: включаем паузу (или ждём освобождения слота)
+        if tier.cooldown:
+            return tat, now + tier.cooldown, RateDecision(False, tier.cooldown, tier.name, True)
+        return tat, cooldown_until, RateDecision(False, tat - burst - now, tier.name)
+    return tat + tier.emission, cooldown_until, RateDecision(True, 0.0, tier.name)
+
+
+class RateLimiter:
+    """
+    check(key, tier) → RateDecision. Без store — состояние в памяти процесса
+    (две float на активный чат), со store — в общем StateBackend.
+    """
+
+    def __init__(self, tiers: dict[str, RateTier] | None = None,
+                 store: StateBackend | None = None, namespace: str = "rate"):
+        self.tiers = dict(tiers or DEFAULT_TIERS)
+        self.store = store
+        self.namespace = namespace
+        # key → (tat, cooldown_until)
+        self._state: dict = {}
+        # секунда истечения → ключи, которые нужно проверить в эту секунду
+        self._expiry: dict[int, list] = {}
+        self._swept_until: int | None = None
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    def check(self, key, tier: str = "default", now: float | None = None) -> RateDecision:
+        config = self.tiers[tier]
+        if config.limit is None:
+            return RateDecision(True, 0.0, tier)
+        now = time.time() if now is None else now
+        if self.store is not None:
+            return self._check_shared(key, config, now)
+
+        self.sweep(now)
+        tat, cooldown_until = self._state.get(key, (0.0, 0.0))
+        tat, cooldown_until, decision = gcra_step(tat, cooldown_until, config, now)
+        self._state[key] = (tat, cooldown_until)
+        self._expiry.setdefault(math.floor(max(tat, cooldown_until)) + 1, []).append(key)
+        return decision
+
+    def _check_shared(self, key, config: RateTier, now: float) -> RateDecision:
+        def update(value):
+            tat, cooldown_until = value or (0.0, 0.0)
+            tat, cooldown_until, decision = gcra_step(tat, cooldown_until, config, now)
+            return [tat, cooldown_until], decision
+
+        return self.store.atomic_update(self.namespace, key, update, ttl=config.state_ttl)
+
+    def reset(self, key) -> None:
+        """Снимает ограничения с чата (например, после разбана)."""
+        if self.store is not None:
+            self.store.delete(self.namespace, key)
+        else:
+            self._state.pop(key, None)
+
+    def sweep(self, now: float | None = None) -> int:
+        """Удаляет записи, чьи TAT и пауза в прошлом. Возвращает число удалённых."""
+        now = time.time() if now is None else now
+        current = math.floor(now)
+        if self._swept_until is None:
+            self._swept_until = current
+        if current <= self._swept_until:
+            return 0
+        removed = 0
+        if current - self._swept_until > len(self._expiry):
+            seconds = sorted(s for s in self._expiry if s <= current)
+        else:
+            seconds = range(self._swept_until + 1, current + 1)
+        for second in seconds:
+            for key in self._expiry.pop(second, ()):
+                state = self._state.get(key)
+                if state is not None and max(state) <= now:
+                    del self._state[key]
+                    removed += 1
+        self._swept_until = current
+        return removed
@@ -0,0 +1,210 @@
+"""
+request_scheduler.py — Планировщик тяжёлой работы бота с приоритетами.
+
+Раньше вся работа шла в порядке поступления: /stats, /ban и ответы из
+кэша/FAQ ждали за медленными генерациями Claude. RequestScheduler
+ограничивает число одновременных «слотов» (ANSWER_WORKERS) и выдаёт
+освободившийся слот по приоритету:
+
+    ADMIN > CACHED (кэш/FAQ) > QUESTION (новый вопрос) > CLARIFICATION
+
+Внутри класса — честная очередь по чатам (round-robin): чат с пятью
+вопросами в очереди не задерживает остальных дольше, чем на один ответ.
+Кроме того, RESERVED_WORKERS слотов закрыты для QUESTION/CLARIFICATION —
+даже когда все остальные слоты заняты генерациями, короткие запросы
+(ADMIN/CACHED) обслуживаются сразу.
+
+Использование:
+    async with scheduler.slot(Priority.QUESTION, chat_id):
+        answer = await asyncio.to_thread(answer_question, ...)
+
+snapshot() — глубина очередей, занятые слоты, время ожидания по классам
+(среднее, p95, максимум) для /stats и метрик.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+
+ANSWER_WORKERS = int(os.getenv("ANSWER_WORKERS", "4"))
+RESERVED_WORKERS = int(os.getenv("RESERVED_WORKERS", "1"))
+# Сколько последних ожиданий хранить на класс для p95
+WAIT_SAMPLES = 256
+
+
+class Priority(IntEnum):
+    ADMIN = 0
+    CACHED = 1
+    QUESTION = 2
+    CLARIFICATION = 3
+
+
+# Классы, которым недоступны зарезервированные слоты
+BULK = (Priority.QUESTION, Priority.CLARIFICATION)
+
+
+@dataclass
+class _Waiter:
+    future: asyncio.Future
+    enqueued_at: float
+
+
+@dataclass
+class _ClassStats:
+    served: int = 0
+    abandoned: int = 0           # ушли из очереди, не дождавшись слота
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    recent: deque = field(default_factory=lambda: deque(maxlen=WAIT_SAMPLES))
+
+    def record(self, wait: float) -> None:
+        self.served += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.recent.append(wait)
+
+    def p95(self) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class RequestScheduler:
+    """Приоритетная очередь слотов с round-robin по чатам внутри класса."""
+
+    def __init__(self, workers: int = ANSWER_WORKERS, reserved: int = RESERVED_WORKERS):
+        if workers < 1:
+            raise ValueError("ANSWER_WORKERS должно быть >= 1")
+        self.workers = workers
+        self.reserved = max(0, min(reserved, workers - 1))
+        self._busy = 0
+        self._busy_bulk = 0
+        # priority → chat_id → очередь ожидающих; порядок чатов = round-robin
+        self._queues: dict[Priority, OrderedDict] = {p: OrderedDict() for p in Priority}
+        self._depth: dict[Priority, int] = {p: 0 for p in Priority}
+        self._stats: dict[Priority, _ClassStats] = {p: _ClassStats() for p in Priority}
+
+    # ─── Публичный API ───────────────────────────────────────────────────────
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority, chat_id=None):
+        """Ждёт свободный слот с учётом приоритета; освобождает его при выходе."""
+        await self.acquire(priority, chat_id)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    async def acquire(self, priority: Priority, chat_id=None) -> None:
+        now = time.monotonic()
+        if not any(self._depth.values()) and self._admissible(priority):
+            # Быстрый путь: очереди пусты и слот свободен
+            self._take(priority)
+            self._stats[priority].record(0.0)
+            return
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), now)
+        self._queues[priority].setdefault(chat_id, deque()).append(waiter)
+        self._depth[priority] += 1
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Слот уже выдан, но забрать его некому — возвращаем
+                self.release(priority)
+            else:
+                self._remove(priority, chat_id, waiter)
+                self._stats[priority].abandoned += 1
+            raise
+
+    def release(self, priority: Priority) -> None:
+        self._busy -= 1
+        if priority in BULK:
+            self._busy_bulk -= 1
+        self._dispatch()
+
+    def queued(self) -> int:
+        """Сколько запросов ждут слота (все классы)."""
+        return sum(self._depth.values())
+
+    def snapshot(self) -> dict:
+        """Состояние и метрики: слоты, глубина очередей, ожидание по классам."""
+        classes = {}
+        for p in Priority:
+            st = self._stats[p]
+            classes[p.name.lower()] = {
+                "queued": self._depth[p],
+                "served": st.served,
+                "abandoned": st.abandoned,
+                "wait_avg": st.total_wait / st.served if st.served else 0.0,
+                "wait_p95": st.p95(),
+                "wait_max": st.max_wait,
+            }
+        return {
+            "workers": self.workers,
+            "reserved": self.reserved,
+            "busy": self._busy,
+            "queued": self.queued(),
+            "classes": classes,
+        }
+
+    def format_stats(self) -> str:
+        """Короткая сводка для /stats."""
+        snap = self.snapshot()
+        lines = [f"⚙️ Очередь: занято {snap['busy']}/{snap['workers']}, ждут {snap['queued']}"]
+        for name, c in snap["classes"].items():
+            if c["served"] or c["queued"]:
+                lines.append(
+                    f"  {name}: в очереди {c['queued']}, обслужено {c['served']}, "
+                    f"ожидание ср. {c['wait_avg']:.1f}с / p95 {c['wait_p95']:.1f}с"
+                )
+        return "\n".join(lines)
+
+    # ─── Внутреннее ──────────────────────────────────────────────────────────
+
+    def _admissible(self, priority: Priority) -> bool:
+        if self._busy >= self.workers:
+            return False
+        if priority in BULK:
+            return self._busy_bulk < self.workers - self.reserved
+        return True
+
+    def _take(self, priority: Priority) -> None:
+        self._busy += 1
+        if priority in BULK:
+            self._busy_bulk += 1
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        for priority in Priority:
+            chats = self._queues[priority]
+            while chats and self._admissible(priority):
+                # Следующий чат по кругу: берём его самый старый запрос
+                chat_id, waiters = next(iter(chats.items()))
+                waiter = waiters.popleft()
+                self._depth[priority] -= 1
+                if waiters:
+                    chats.move_to_end(chat_id)
+                else:
+                    del chats[chat_id]
+                if waiter.future.done():
+                    continue
+                self._take(priority)
+                self._stats[priority].record(now - waiter.enqueued_at)
+                waiter.future.set_result(None)
+            if self._busy >= self.workers:
+                return
+
+    def _remove(self, priority: Priority, chat_id, waiter: _Waiter) -> None:
+        waiters = self._queues[priority].get(chat_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            self._depth[priority] -= 1
+            if not waiters:
+                del self._queues[priority][chat_id]
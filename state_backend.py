@@ -0,0 +1,500 @@
+"""
+state_backend.py — Общее состояние бота для нескольких процессов/реплик.
+
+Раньше rate limit, баны, зарегистрированные пользователи, ожидающие дизлайки,
+уточнения и история диалогов жили в словарях модуля bot.py — при запуске
+второго процесса лимиты и память диалога переставали работать. Теперь bot.py
+работает с одним интерфейсом StateBackend:
+
+    MemoryStateBackend — в памяти процесса (по умолчанию, один процесс);
+    SQLiteStateBackend — файл SQLite в режиме WAL, несколько процессов на
+                         одной машине; атомарность через BEGIN IMMEDIATE;
+    RedisStateBackend  — Redis или любой сервер с Redis-протоколом
+                         (KeyDB, Dragonfly, локальный redis-server);
+                         атомарность через WATCH/MULTI. Нужен пакет redis.
+
+Выбор — переменная окружения STATE_BACKEND (memory | sqlite | redis):
+    STATE_SQLITE_PATH — путь к файлу SQLite (по умолчанию data/bot_state.sqlite3)
+    REDIS_URL         — адрес Redis (по умолчанию redis://localhost:6379/0)
+
+Все значения сериализуются в JSON, поэтому бэкенды взаимозаменяемы.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SQLITE_PATH = os.path.join(BASE_DIR, "data", "bot_state.sqlite3")
+
+# Как часто (сек) удалять протухшие записи
+SWEEP_INTERVAL = 60.0
+
+
+class StateBackend(ABC):
+    """
+    Интерфейс хранилища состояния. Ключи и элементы множеств приводятся к str.
+
+    Пространства имён (ns) разделяют данные разных подсистем:
+    "pending_dislike", "clarification", "banned", "registered" и т.д.
+    """
+
+    # ─── Ключ-значение с TTL ──────────────────────────────────────────────────
+
+    @abstractmethod
+    def get(self, ns: str, key, default=None):
+        ...
+
+    @abstractmethod
+    def set(self, ns: str, key, value, ttl: float | None = None) -> None:
+        ...
+
+    @abstractmethod
+    def pop(self, ns: str, key, default=None):
+        """Атомарно читает и удаляет значение (ровно один процесс получит его)."""
+
+    def delete(self, ns: str, key) -> None:
+        self.pop(ns, key)
+
+    # ─── Множества ────────────────────────────────────────────────────────────
+
+    @abstractmethod
+    def add_member(self, ns: str, member) -> bool:
+        """Добавляет элемент; True — если его ещё не было."""
+
+    @abstractmethod
+    def remove_member(self, ns: str, member) -> None:
+        ...
+
+    @abstractmethod
+    def has_member(self, ns: str, member) -> bool:
+        ...
+
+    @abstractmethod
+    def replace_members(self, ns: str, members) -> None:
+        """Атомарно заменяет всё множество."""
+
+    @abstractmethod
+    def count_members(self, ns: str) -> int:
+        ...
+
+    # ─── Атомарное «прочитать-изменить-записать» ──────────────────────────────
+
+    @abstractmethod
+    def atomic_update(self, ns: str, key, fn, ttl: float | None = None):
+        """
+        Атомарно для всех процессов: fn(текущее значение или None) возвращает
+        (новое значение, результат). Новое значение None — удалить ключ.
+        Возвращает результат fn. Используется rate_limiter.py.
+        """
+
+    # ─── История диалога ──────────────────────────────────────────────────────
+
+    @abstractmethod
+    def get_history(self, key) -> list:
+        ...
+
+    @abstractmethod
+    def append_history(self, key, items: list, max_items: int, ttl: float | None = None) -> None:
+        """Атомарно добавляет сообщения и обрезает историю до max_items последних."""
+
+    @abstractmethod
+    def clear_history(self, key) -> None:
+        ...
+
+    # ─── Обслуживание ─────────────────────────────────────────────────────────
+
+    def sweep(self) -> int:
+        """Удаляет протухшие записи. Возвращает число удалённых."""
+        return 0
+
+    def close(self) -> None:
+        pass
+
+
+# ─── В памяти процесса ────────────────────────────────────────────────────────
+
+class MemoryStateBackend(StateBackend):
+    """Словари под одной блокировкой; TTL проверяется при чтении и периодической чистке."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kv: dict[tuple[str, str], tuple[str, float | None]] = {}
+        self._sets: dict[str, set[str]] = {}
+        self._next_sweep = time.monotonic() + SWEEP_INTERVAL
+
+    def _maybe_sweep(self) -> None:
+        if time.monotonic() >= self._next_sweep:
+            self._sweep_locked()
+
+    def _get_locked(self, ns: str, key: str):
+        item = self._kv.get((ns, key))
+        if item is None:
+            return None
+        raw, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self._kv[(ns, key)]
+            return None
+        return raw
+
+    def get(self, ns, key, default=None):
+        with self._lock:
+            raw = self._get_locked(ns, str(key))
+        return default if raw is None else json.loads(raw)
+
+    def set(self, ns, key, value, ttl=None):
+        raw = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._maybe_sweep()
+            self._kv[(ns, str(key))] = (raw, time.time() + ttl if ttl else None)
+
+    def pop(self, ns, key, default=None):
+        with self._lock:
+            raw = self._get_locked(ns, str(key))
+            self._kv.pop((ns, str(key)), None)
+        return default if raw is None else json.loads(raw)
+
+    def add_member(self, ns, member):
+        with self._lock:
+            members = self._sets.setdefault(ns, set())
+            if str(member) in members:
+                return False
+            members.add(str(member))
+            return True
+
+    def remove_member(self, ns, member):
+        with self._lock:
+            self._sets.get(ns, set()).discard(str(member))
+
+    def has_member(self, ns, member):
+        with self._lock:
+            return str(member) in self._sets.get(ns, ())
+
+    def replace_members(self, ns, members):
+        new = {str(m) for m in members}
+        with self._lock:
+            self._sets[ns] = new
+
+    def count_members(self, ns):
+        with self._lock:
+            return len(self._sets.get(ns, ()))
+
+    def atomic_update(self, ns, key, fn, ttl=None):
+        with self._lock:
+            self._maybe_sweep()
+            raw = self._get_locked(ns, str(key))
+            value, result = fn(None if raw is None else json.loads(raw))
+            if value is None:
+                self._kv.pop((ns, str(key)), None)
+            else:
+                self._kv[(ns, str(key))] = (json.dumps(value, ensure_ascii=False),
+                                            time.time() + ttl if ttl else None)
+            return result
+
+    def get_history(self, key):
+        return self.get("history", key, [])
+
+    def append_history(self, key, items, max_items, ttl=None):
+        with self._lock:
+            raw = self._get_locked("history", str(key))
+            history = (json.loads(raw) if raw else []) + list(items)
+            self._kv[("history", str(key))] = (
+                json.dumps(history[-max_items:], ensure_ascii=False),
+                time.time() + ttl if ttl else None,
+            )
+
+    def clear_history(self, key):
+        self.delete("history", key)
+
+    def _sweep_locked(self) -> int:
+        now = time.time()
+        expired = [k for k, (_, exp) in self._kv.items() if exp is not None and exp <= now]
+        for k in expired:
+            del self._kv[k]
+        self._next_sweep = time.monotonic() + SWEEP_INTERVAL
+        return len(expired)
+
+    def sweep(self):
+        with self._lock:
+            return self._sweep_locked()
+
+
+# ─── SQLite (WAL) ─────────────────────────────────────────────────────────────
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    ns         TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      TEXT NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (ns, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS members (
+    ns     TEXT NOT NULL,
+    member TEXT NOT NULL,
+    PRIMARY KEY (ns, member)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS kv_expires ON kv (expires_at) WHERE expires_at IS NOT NULL;
+"""
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    Один файл на все процессы машины. Каждая изменяющая операция — транзакция
+    BEGIN IMMEDIATE: SQLite берёт блокировку записи сразу, поэтому
+    «прочитать-проверить-записать» (rate limit, pop) выполняется атомарно.
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, busy_timeout: float = 30.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._next_sweep = time.monotonic() + SWEEP_INTERVAL
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(_SQLITE_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _maybe_sweep(self) -> None:
+        if time.monotonic() >= self._next_sweep:
+            self._next_sweep = time.monotonic() + SWEEP_INTERVAL
+            self.sweep()
+
+    def get(self, ns, key, default=None):
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE ns = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (ns, str(key), time.time()),
+        ).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def set(self, ns, key, value, ttl=None):
+        self._maybe_sweep()
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (ns, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (ns, str(key), json.dumps(value, ensure_ascii=False),
+                 time.time() + ttl if ttl else None),
+            )
+
+    def pop(self, ns, key, default=None):
+        with self._tx() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM kv WHERE ns = ? AND key = ?", (ns, str(key))
+            ).fetchone()
+            if row is None:
+                return default
+            conn.execute("DELETE FROM kv WHERE ns = ? AND key = ?", (ns, str(key)))
+        if row[1] is not None and row[1] <= time.time():
+            return default
+        return json.loads(row[0])
+
+    def add_member(self, ns, member):
+        with self._tx() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO members (ns, member) VALUES (?, ?)", (ns, str(member))
+            )
+            return cur.rowcount == 1
+
+    def remove_member(self, ns, member):
+        with self._tx() as conn:
+            conn.execute("DELETE FROM members WHERE ns = ? AND member = ?", (ns, str(member)))
+
+    def has_member(self, ns, member):
+        row = self._conn().execute(
+            "SELECT 1 FROM members WHERE ns = ? AND member = ?", (ns, str(member))
+        ).fetchone()
+        return row is not None
+
+    def replace_members(self, ns, members):
+        with self._tx() as conn:
+            conn.execute("DELETE FROM members WHERE ns = ?", (ns,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO members (ns, member) VALUES (?, ?)",
+                [(ns, str(m)) for m in members],
+            )
+
+    def count_members(self, ns):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM members WHERE ns = ?", (ns,)
+        ).fetchone()[0]
+
+    def atomic_update(self, ns, key, fn, ttl=None):
+        self._maybe_sweep()
+        with self._tx() as conn:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE ns = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (ns, str(key), time.time()),
+            ).fetchone()
+            value, result = fn(None if row is None else json.loads(row[0]))
+            if value is None:
+                conn.execute("DELETE FROM kv WHERE ns = ? AND key = ?", (ns, str(key)))
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO kv (ns, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (ns, str(key), json.dumps(value, ensure_ascii=False),
+                     time.time() + ttl if ttl else None),
+                )
+        return result
+
+    def get_history(self, key):
+        return self.get("history", key, [])
+
+    def append_history(self, key, items, max_items, ttl=None):
+        with self._tx() as conn:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE ns = 'history' AND key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (str(key), time.time()),
+            ).fetchone()
+            history = (json.loads(row[0]) if row else []) + list(items)
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (ns, key, value, expires_at) VALUES ('history', ?, ?, ?)",
+                (str(key), json.dumps(history[-max_items:], ensure_ascii=False),
+                 time.time() + ttl if ttl else None),
+            )
+
+    def clear_history(self, key):
+        self.delete("history", key)
+
+    def sweep(self):
+        now = time.time()
+        with self._tx() as conn:
+            return conn.execute(
+                "DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+            ).rowcount
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# ─── Redis ────────────────────────────────────────────────────────────────────
+
+class RedisStateBackend(StateBackend):
+    """Redis-протокол: TTL и атомарность обеспечивает сервер."""
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "goszakup"):
+        if redis is None:
+            raise RuntimeError("STATE_BACKEND=redis требует пакет redis (pip install redis)")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def _key(self, ns: str, key="") -> str:
+        return f"{self.prefix}:{ns}:{key}"
+
+    def get(self, ns, key, default=None):
+        raw = self.client.get(self._key(ns, key))
+        return default if raw is None else json.loads(raw)
+
+    def set(self, ns, key, value, ttl=None):
+        self.client.set(self._key(ns, key), json.dumps(value, ensure_ascii=False),
+                        px=int(ttl * 1000) if ttl else None)
+
+    def pop(self, ns, key, default=None):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(self._key(ns, key))
+        pipe.delete(self._key(ns, key))
+        raw, _ = pipe.execute()
+        return default if raw is None else json.loads(raw)
+
+    def add_member(self, ns, member):
+        return self.client.sadd(self._key(ns), str(member)) == 1
+
+    def remove_member(self, ns, member):
+        self.client.srem(self._key(ns), str(member))
+
+    def has_member(self, ns, member):
+        return bool(self.client.sismember(self._key(ns), str(member)))
+
+    def replace_members(self, ns, members):
+        members = [str(m) for m in members]
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(self._key(ns))
+        if members:
+            pipe.sadd(self._key(ns), *members)
+        pipe.execute()
+
+    def count_members(self, ns):
+        return self.client.scard(self._key(ns))
+
+    def atomic_update(self, ns, key, fn, ttl=None):
+        rkey = self._key(ns, key)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    # Оптимистическая блокировка: если ключ изменился — повтор
+                    pipe.watch(rkey)
+                    raw = pipe.get(rkey)
+                    value, result = fn(None if raw is None else json.loads(raw))
+                    pipe.multi()
+                    if value is None:
+                        pipe.delete(rkey)
+                    else:
+                        pipe.set(rkey, json.dumps(value, ensure_ascii=False),
+                                 px=int(ttl * 1000) if ttl else None)
+                    pipe.execute()
+                    return result
+                except redis.WatchError:
+                    continue
+
+    def get_history(self, key):
+        return [json.loads(item) for item in self.client.lrange(self._key("history", key), 0, -1)]
+
+    def append_history(self, key, items, max_items, ttl=None):
+        rkey = self._key("history", key)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(rkey, *[json.dumps(item, ensure_ascii=False) for item in items])
+        pipe.ltrim(rkey, -max_items, -1)
+        if ttl:
+            pipe.pexpire(rkey, int(ttl * 1000))
+        pipe.execute()
+
+    def clear_history(self, key):
+        self.client.delete(self._key("history", key))
+
+    def close(self):
+        self.client.close()
+
+
+# ─── Фабрика ──────────────────────────────────────────────────────────────────
+
+def create_state_backend(kind: str | None = None) -> StateBackend:
+    """Создаёт бэкенд по имени или по STATE_BACKEND из окружения."""
+    kind = (kind or os.getenv("STATE_BACKEND", "memory")).lower()
+    if kind == "memory":
+        return MemoryStateBackend()
+    if kind == "sqlite":
+        return SQLiteStateBackend(os.getenv("STATE_SQLITE_PATH", DEFAULT_SQLITE_PATH))
+    if kind == "redis":
+        return RedisStateBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Неизвестный STATE_BACKEND: {kind} (memory | sqlite | redis)")
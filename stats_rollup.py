@@ -0,0 +1,88 @@
+"""
+stats_rollup.py — Сводная статистика из stats_daily вместо COUNT(*) по таблицам.
+
+Раньше /stats делал четыре точных COUNT(*) по users/conversations/feedback,
+а обзор admin/index.html — ещё пять прямо из браузера на каждый показ.
+Теперь счётчики по дням и источникам лежат в stats_daily (см.
+supabase_stats_rollup.sql, пересчёт — pg_cron раз в 5 минут), и сводка
+читается одним запросом к VIEW stats_summary:
+
+    fetch_summary(client)      — одна строка итогов (для /stats и панелей);
+    fetch_daily(client, days)  — строки stats_daily за последние дни;
+    refresh(client, since)     — ручной пересчёт (без pg_cron / после импорта).
+
+Путь ответа (llm / digest / rejected / empty / faq) бот пишет в
+conversations.source — из него берутся «без LLM» и «отклонено».
+
+Ручной пересчёт всей истории:
+    python stats_rollup.py --full
+"""
+
+import argparse
+import sys
+from datetime import date, timedelta
+
+SUMMARY_FIELDS = (
+    "users_total", "messages_total", "messages_today", "digest_total", "ktru_total",
+    "likes_total", "dislikes_total", "feedback_total", "rejections_total",
+    "rejections_today", "banned",
+)
+
+
+def fetch_summary(client) -> dict:
+    """Итоги одной строкой; отсутствующие поля — 0 (пустая stats_daily)."""
+    rows = client.table("stats_summary").select("*").limit(1).execute().data or []
+    row = rows[0] if rows else {}
+    summary = {field: int(row.get(field) or 0) for field in SUMMARY_FIELDS}
+    summary["refreshed_at"] = row.get("refreshed_at")
+    return summary
+
+
+def fetch_daily(client, days: int = 30) -> list[dict]:
+    since = (date.today() - timedelta(days=days - 1)).isoformat()
+    return (
+        client.table("stats_daily").select("*").gte("day", since)
+        .order("day", desc=True).order("source").execute().data
+        or []
+    )
+
+
+def refresh(client, since: date | None = None) -> None:
+    """Пересчитать дни начиная с since (None — вся история)."""
+    client.rpc("refresh_stats_daily", {"p_since": since.isoformat() if since else None}).execute()
+
+
+def format_summary(summary: dict) -> str:
+    """Блок итогов для /stats."""
+    return (
+        f"👥 Пользователей: {summary['users_total']}\n"
+        f"💬 Сообщений: {summary['messages_total']} (сегодня {summary['messages_today']}, "
+        f"без LLM {summary['digest_total']})\n"
+        f"📋 С КТРУ: {summary['ktru_total']}\n"
+        f"⛔ Забанено: {summary['banned']}\n"
+        f"⭐ Отзывов: {summary['feedback_total']} "
+        f"(👍 {summary['likes_total']} / 👎 {summary['dislikes_total']})\n"
+        f"🚫 Отклонено проверкой: {summary['rejections_total']} "
+        f"(сегодня {summary['rejections_today']})"
+    )
+
+
+def main() -> int:
+    sys.stdout.reconfigure(encoding="utf-8")
+    parser = argparse.ArgumentParser(description="Пересчёт stats_daily")
+    parser.add_argument("--full", action="store_true", help="пересчитать всю историю")
+    parser.add_argument("--days", type=int, default=2, help="сколько последних дней пересчитать")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from clients import get_supabase
+
+    load_dotenv()
+    client = get_supabase()
+    refresh(client, None if args.full else date.today() - timedelta(days=args.days - 1))
+    print(format_summary(fetch_summary(client)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
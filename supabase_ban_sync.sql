@@ -0,0 +1,37 @@
+-- ============================================================
+-- Инкрементальная синхронизация банов (ban_sync.py)
+-- Запустить в Supabase SQL Editor после supabase_users.sql
+--
+-- Бот не перечитывает всю таблицу users: раз в несколько секунд
+-- он запрашивает только строки с ban_updated_at новее последнего
+-- водяного знака. Колонку обновляет триггер — при любом изменении
+-- is_banned (бот, Flask-панель, admin/index.html, SQL Editor).
+-- last_seen/message_count её не трогают, поэтому дельта остаётся
+-- маленькой даже при активной переписке.
+-- ============================================================
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS is_banned BOOLEAN DEFAULT FALSE;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS ban_updated_at TIMESTAMPTZ DEFAULT NOW();
+
+-- ─── Триггер: ban_updated_at меняется только вместе с is_banned ─
+CREATE OR REPLACE FUNCTION users_touch_ban_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR NEW.is_banned IS DISTINCT FROM OLD.is_banned THEN
+        -- clock_timestamp(), а не NOW(): время изменения, а не начала транзакции
+        NEW.ban_updated_at := clock_timestamp();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_users_ban_updated_at ON users;
+CREATE TRIGGER trg_users_ban_updated_at
+    BEFORE INSERT OR UPDATE OF is_banned ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION users_touch_ban_updated_at();
+
+-- Индекс для запроса «изменения после водяного знака»
+CREATE INDEX IF NOT EXISTS idx_users_ban_updated_at ON users(ban_updated_at);
+-- Частичный индекс для полной загрузки списка забаненных
+CREATE INDEX IF NOT EXISTS idx_users_banned ON users(chat_id) WHERE is_banned;
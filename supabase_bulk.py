@@ -0,0 +1,117 @@
+"""
+supabase_bulk.py — Пакетные операции с таблицей chunks через Supabase REST.
+
+Вместо PATCH /rest/v1/chunks?id=eq.X на каждый чанк:
+  - fetch_chunk_columns() — текущие значения колонок всех чанков (постранично);
+  - bulk_update_chunks()  — одно RPC bulk_update_chunks на пачку изменений
+                            (SQL-функция из supabase_bulk.sql).
+
+Используется build_anchor_map.py, update_urls.py и clean_obsolete.py.
+"""
+
+import json
+import os
+import urllib.error
+import urllib.request
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Сколько изменений отправлять одним RPC (ограничение на размер тела запроса)
+BULK_BATCH_SIZE = 500
+# Размер страницы при чтении (PostgREST по умолчанию отдаёт до 1000 строк)
+FETCH_PAGE_SIZE = 1000
+
+
+class SupabaseBulkError(Exception):
+    """Ошибка пакетного запроса к Supabase REST."""
+
+
+def _credentials() -> tuple[str, str]:
+    supabase_url = os.environ.get("SUPABASE_URL")
+    supabase_key = os.environ.get("SUPABASE_KEY")
+    if not supabase_url or not supabase_key:
+        raise SupabaseBulkError("Missing SUPABASE_URL or SUPABASE_KEY in .env")
+    return supabase_url.rstrip("/"), supabase_key
+
+
+def _request(method: str, path: str, body=None, headers: dict | None = None):
+    supabase_url, supabase_key = _credentials()
+    data = None if body is None else json.dumps(body, ensure_ascii=False).encode("utf-8")
+    req = urllib.request.Request(
+        f"{supabase_url}{path}",
+        data=data,
+        method=method,
+        headers={
+            "Content-Type": "application/json",
+            "apikey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+            **(headers or {}),
+        },
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            raw = resp.read()
+            return json.loads(raw) if raw else None
+    except urllib.error.HTTPError as e:
+        raise SupabaseBulkError(f"HTTP {e.code}: {e.read().decode()[:200]}") from e
+    except urllib.error.URLError as e:
+        raise SupabaseBulkError(str(e.reason)) from e
+
+
+def fetch_chunk_columns(columns: tuple[str, ...] = ("id", "official_url")) -> dict[str, dict]:
+    """Возвращает {id: {колонка: значение}} для всех чанков в Supabase."""
+    select = ",".join(dict.fromkeys(("id",) + tuple(columns)))
+    rows: dict[str, dict] = {}
+    offset = 0
+    while True:
+        page = _request(
+            "GET",
+            f"/rest/v1/chunks?select={select}&order=id",
+            headers={"Range": f"{offset}-{offset + FETCH_PAGE_SIZE - 1}"},
+        ) or []
+        for row in page:
+            rows[row["id"]] = row
+        if len(page) < FETCH_PAGE_SIZE:
+            return rows
+        offset += FETCH_PAGE_SIZE
+
+
+def bulk_update_chunks(updates: list[dict], batch_size: int = BULK_BATCH_SIZE) -> int:
+    """
+    Применяет изменения [{"id": ..., <колонка>: <значение>}, ...] пачками
+    через RPC bulk_update_chunks. Возвращает число обновлённых строк.
+    """
+    updated = 0
+    for start in range(0, len(updates), batch_size):
+        batch = updates[start:start + batch_size]
+        result = _request("POST", "/rest/v1/rpc/bulk_update_chunks", {"updates": batch})
+        updated += int(result or 0)
+    return updated
+
+
+def diff_column(chunks: list[dict], current: dict[str, dict], column: str) -> list[dict]:
+    """
+    Сравнивает значения колонки в чанках с текущими (из Supabase или JSON).
+    Возвращает [{"id", "old", "new"}] только для изменившихся чанков.
+    """
+    changes = []
+    for chunk in chunks:
+        cid = chunk.get("id")
+        if cid is None or column not in chunk:
+            continue
+        old = (current.get(cid) or {}).get(column)
+        if old != chunk[column]:
+            changes.append({"id": cid, "old": old, "new": chunk[column]})
+    return changes
+
+
+def print_diff(changes: list[dict], column: str, limit: int = 50) -> None:
+    """Печатает diff в формате, удобном для просмотра перед применением."""
+    print(f"\n[DIFF] {column}: {len(changes)} изменений")
+    for ch in changes[:limit]:
+        print(f"  [{ch['id']}]")
+        print(f"    - {ch['old']}")
+        print(f"    + {ch['new']}")
+    if len(changes) > limit:
+        print(f"  ... и ещё {len(changes) - limit}")
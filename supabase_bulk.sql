@@ -0,0 +1,31 @@
+-- ============================================================
+-- Пакетное обновление чанков одним запросом
+-- Запустить в Supabase SQL Editor
+-- ============================================================
+
+-- ─── Функция: bulk_update_chunks ─────────────────────────────
+-- Принимает JSON-массив [{"id": ..., "official_url": ..., "text": ..., "char_count": ...}]
+-- Обновляет только переданные поля (отсутствующие ключи не трогаются).
+-- Возвращает количество обновлённых строк.
+--
+-- Используется build_anchor_map.py / update_urls.py (official_url)
+-- и clean_obsolete.py (text, char_count) вместо PATCH по одному чанку.
+
+CREATE OR REPLACE FUNCTION bulk_update_chunks(updates JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    affected INTEGER;
+BEGIN
+    UPDATE chunks c
+    SET official_url = CASE WHEN u.doc ? 'official_url' THEN u.doc->>'official_url' ELSE c.official_url END,
+        text         = CASE WHEN u.doc ? 'text'         THEN u.doc->>'text'         ELSE c.text END,
+        char_count   = CASE WHEN u.doc ? 'char_count'   THEN (u.doc->>'char_count')::INTEGER ELSE c.char_count END
+    FROM jsonb_array_elements(updates) AS u(doc)
+    WHERE c.id = u.doc->>'id';
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$;
@@ -0,0 +1,22 @@
+-- ============================================================
+-- Курсорная пагинация переписки (admin_panel.py /api/messages)
+-- Запустить в Supabase SQL Editor после supabase_users.sql
+--
+-- Страница запрашивается не через OFFSET, а от последней показанной
+-- строки: (created_at, id) < (курсор), порядок created_at DESC, id DESC.
+-- Составные индексы отдают любую страницу чтением limit+1 строк —
+-- и для всей переписки, и для фильтра по пользователю.
+-- ============================================================
+
+CREATE INDEX IF NOT EXISTS idx_conversations_created_id
+    ON conversations(created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_conversations_chat_created_id
+    ON conversations(chat_id, created_at DESC, id DESC);
+
+-- Одиночные индексы покрываются составными (префикс) — лишняя запись на INSERT
+DROP INDEX IF EXISTS idx_conversations_chat_id;
+DROP INDEX IF EXISTS idx_conversations_created_at;
+
+-- Свежая статистика для count="estimated" (оценка планировщика)
+ANALYZE conversations;
@@ -0,0 +1,77 @@
+-- ============================================================
+-- Полнотекстовый поиск по переписке (admin_panel.py /api/messages/search)
+-- Запустить в Supabase SQL Editor после supabase_users.sql
+--
+-- fts — генерируемый tsvector: вопрос с весом A, ответ с весом B.
+-- Конфигурация simple, как у chunks (supabase_setup.sql); словоформы
+-- («демпинг» / «демпинга») находятся префиксным поиском: каждое
+-- слово запроса превращается в lexeme:*. Коды КТРУ разбираются тем же
+-- парсером, что и текст, поэтому находятся как есть.
+--
+-- Страницы — keyset по (rank, id), сниппеты ts_headline считаются
+-- только для возвращаемой страницы. Подсветка — управляющие символы
+-- \x02 / \x03, а не <mark>: сервер (admin_views._snippet) экранирует
+-- текст и только потом превращает их в теги, так что «<mark>» в самом
+-- вопросе или ответе остаётся текстом.
+-- ============================================================
+
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS fts tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(question, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(answer, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_conversations_fts ON conversations USING gin(fts);
+
+-- ─── Запрос пользователя → префиксный tsquery ────────────────
+CREATE OR REPLACE FUNCTION conversations_tsquery(p_query TEXT)
+RETURNS tsquery AS $$
+    SELECT to_tsquery('simple', string_agg(quote_literal(lexeme) || ':*', ' & '))
+    FROM unnest(tsvector_to_array(to_tsvector('simple', coalesce(p_query, '')))) AS lexeme;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ─── Поиск с рангом и подсвеченными фрагментами ──────────────
+-- p_after_rank / p_after_id — последняя строка предыдущей страницы
+CREATE OR REPLACE FUNCTION search_conversations(
+    p_query      TEXT,
+    p_chat_id    BIGINT DEFAULT NULL,
+    p_after_rank REAL   DEFAULT NULL,
+    p_after_id   BIGINT DEFAULT NULL,
+    p_limit      INT    DEFAULT 20
+)
+RETURNS TABLE (
+    id               BIGINT,
+    chat_id          BIGINT,
+    created_at       TIMESTAMPTZ,
+    chunks_used      INTEGER,
+    ktru_found       BOOLEAN,
+    rank             REAL,
+    question_snippet TEXT,
+    answer_snippet   TEXT
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH q AS (
+        SELECT conversations_tsquery(p_query) AS tsq,
+               'StartSel=' || chr(2) || ', StopSel=' || chr(3)
+               || ', MaxWords=35, MinWords=10, MaxFragments=2' AS opts
+    ),
+    page AS (
+        SELECT c.id, c.chat_id, c.created_at, c.chunks_used, c.ktru_found,
+               c.question, c.answer, ts_rank(c.fts, q.tsq) AS rank
+        FROM conversations c, q
+        WHERE q.tsq IS NOT NULL
+          AND c.fts @@ q.tsq
+          AND (p_chat_id IS NULL OR c.chat_id = p_chat_id)
+          AND (p_after_rank IS NULL
+               OR ts_rank(c.fts, q.tsq) < p_after_rank
+               OR (ts_rank(c.fts, q.tsq) = p_after_rank AND c.id < p_after_id))
+        ORDER BY rank DESC, c.id DESC
+        LIMIT p_limit
+    )
+    SELECT p.id, p.chat_id, p.created_at, p.chunks_used, p.ktru_found, p.rank,
+           ts_headline('simple', p.question, q.tsq, q.opts),
+           ts_headline('simple', p.answer, q.tsq, q.opts)
+    FROM page p, q
+    ORDER BY p.rank DESC, p.id DESC;
+$$;
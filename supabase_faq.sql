@@ -0,0 +1,57 @@
+-- ============================================================
+-- FAQ: быстрые ответы бота (faq_index.py) и управление из панели
+-- Запустить в Supabase SQL Editor
+--
+-- Бот держит FAQ в памяти и перечитывает таблицу, когда меняется
+-- число строк или max(updated_at) — updated_at обновляет триггер.
+-- hit_count — сколько раз вопрос пользователя совпал с записью
+-- (бот присылает накопленные счётчики через faq_add_hits).
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS faq (
+    id          BIGSERIAL PRIMARY KEY,
+    question    TEXT NOT NULL,
+    answer      TEXT NOT NULL,
+    tags        TEXT[] DEFAULT '{}',
+    is_active   BOOLEAN DEFAULT TRUE,               -- FALSE — скрыть без удаления
+    hit_count   INTEGER DEFAULT 0,                  -- ответов бота из этой записи
+    created_at  TIMESTAMPTZ DEFAULT NOW(),
+    updated_at  TIMESTAMPTZ DEFAULT NOW()
+);
+
+ALTER TABLE faq ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT TRUE;
+ALTER TABLE faq ADD COLUMN IF NOT EXISTS hit_count INTEGER DEFAULT 0;
+ALTER TABLE faq ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+
+CREATE INDEX IF NOT EXISTS idx_faq_updated_at ON faq(updated_at DESC);
+
+-- ─── Триггер: updated_at при изменении вопроса/ответа ────────
+-- hit_count сюда не входит: счётчики не должны заставлять бота
+-- перечитывать FAQ
+CREATE OR REPLACE FUNCTION faq_touch_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.question IS DISTINCT FROM OLD.question
+       OR NEW.answer IS DISTINCT FROM OLD.answer
+       OR NEW.is_active IS DISTINCT FROM OLD.is_active THEN
+        NEW.updated_at := NOW();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_faq_updated_at ON faq;
+CREATE TRIGGER trg_faq_updated_at
+    BEFORE UPDATE ON faq
+    FOR EACH ROW EXECUTE FUNCTION faq_touch_updated_at();
+
+-- ─── Счётчики попаданий: {"<id>": n, ...} ─────────────────────
+CREATE OR REPLACE FUNCTION faq_add_hits(p_hits JSONB)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE faq f
+    SET hit_count = f.hit_count + h.value::INTEGER
+    FROM jsonb_each_text(p_hits) AS h
+    WHERE f.id = h.key::BIGINT;
+END;
+$$ LANGUAGE plpgsql;
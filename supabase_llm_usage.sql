@@ -0,0 +1,86 @@
+-- ============================================================
+-- Учёт токенов и стоимости вызовов Claude (llm_usage.py, /cost)
+-- Запустить в Supabase SQL Editor после supabase_users.sql
+--
+-- Одна строка — один вызов Claude (включая повторы после rate limit
+-- и ответы, отменённые новым вопросом: токены за них тоже оплачены).
+-- Бот пишет строки пачками (UsageRecorder), стоимость считает по
+-- прайсу модели в момент вызова.
+--
+-- sections — размер секций контекста в символах
+-- ({"ktru": 1200, "law": 5400, ...}): по нему видно, какой шаг
+-- поиска раздувает промпт.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS llm_usage (
+    id                 BIGSERIAL PRIMARY KEY,
+    created_at         TIMESTAMPTZ DEFAULT NOW(),
+    chat_id            BIGINT,
+    model              TEXT NOT NULL,
+    source             TEXT,                      -- conversations.source ответа
+    input_tokens       INTEGER DEFAULT 0,         -- без кэша
+    output_tokens      INTEGER DEFAULT 0,
+    cache_read_tokens  INTEGER DEFAULT 0,
+    cache_write_tokens INTEGER DEFAULT 0,
+    context_chars      INTEGER DEFAULT 0,
+    sections           JSONB DEFAULT '{}',
+    cost_usd           NUMERIC(12, 6) DEFAULT 0,
+    cancelled          BOOLEAN DEFAULT FALSE
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_usage_created_at ON llm_usage(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_llm_usage_chat ON llm_usage(chat_id, created_at DESC);
+
+-- ─── По дням (Asia/Almaty, как stats_daily) ──────────────────
+CREATE OR REPLACE VIEW llm_usage_daily AS
+SELECT
+    (created_at AT TIME ZONE 'Asia/Almaty')::DATE AS day,
+    COUNT(*)                                      AS calls,
+    COUNT(DISTINCT chat_id)                       AS chats,
+    SUM(input_tokens)                             AS input_tokens,
+    SUM(output_tokens)                            AS output_tokens,
+    SUM(cache_read_tokens)                        AS cache_read_tokens,
+    SUM(cache_write_tokens)                       AS cache_write_tokens,
+    ROUND(AVG(context_chars))::INTEGER            AS avg_context_chars,
+    SUM(cost_usd)                                 AS cost_usd,
+    COUNT(*) FILTER (WHERE cancelled)             AS cancelled
+FROM llm_usage
+GROUP BY 1;
+
+-- ─── Самые дорогие чаты за p_days дней ───────────────────────
+CREATE OR REPLACE FUNCTION llm_usage_top_chats(p_days INT DEFAULT 7, p_limit INT DEFAULT 10)
+RETURNS TABLE (
+    chat_id           BIGINT,
+    username          TEXT,
+    first_name        TEXT,
+    calls             BIGINT,
+    tokens            BIGINT,
+    max_context_chars INTEGER,
+    cost_usd          NUMERIC
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT u.chat_id, usr.username, usr.first_name,
+           COUNT(*),
+           SUM(u.input_tokens + u.output_tokens + u.cache_read_tokens + u.cache_write_tokens),
+           MAX(u.context_chars),
+           SUM(u.cost_usd)
+    FROM llm_usage u
+    LEFT JOIN users usr ON usr.chat_id = u.chat_id
+    WHERE u.created_at >= NOW() - make_interval(days => p_days)
+    GROUP BY u.chat_id, usr.username, usr.first_name
+    ORDER BY SUM(u.cost_usd) DESC
+    LIMIT p_limit;
+$$;
+
+-- ─── Средний размер секций контекста за p_days дней ──────────
+CREATE OR REPLACE FUNCTION llm_usage_sections(p_days INT DEFAULT 7)
+RETURNS TABLE (section TEXT, calls BIGINT, avg_chars INTEGER, max_chars INTEGER)
+LANGUAGE sql STABLE
+AS $$
+    SELECT s.key, COUNT(*), ROUND(AVG(s.value::INTEGER))::INTEGER, MAX(s.value::INTEGER)
+    FROM llm_usage u, jsonb_each_text(u.sections) AS s
+    WHERE u.created_at >= NOW() - make_interval(days => p_days)
+    GROUP BY s.key
+    ORDER BY 3 DESC;
+$$;
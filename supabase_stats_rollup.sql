@@ -0,0 +1,109 @@
+-- ============================================================
+-- Сводная статистика по дням (stats_rollup.py)
+-- Запустить в Supabase SQL Editor после supabase_users.sql,
+-- supabase_setup.sql (feedback) и supabase_ban_sync.sql (is_banned)
+--
+-- /stats, admin_panel /api/stats и обзор admin/index.html раньше
+-- делали по 4–5 точных COUNT(*) по users/conversations/feedback на
+-- каждый показ. Теперь счётчики лежат в stats_daily (строка на день
+-- и источник), а сводку отдаёт stats_summary одним запросом.
+--
+-- source — откуда событие:
+--   llm / digest / rejected / empty / faq — ответы (messages, ktru_found) по
+--       conversations.source: ответ Claude, дайджест без LLM, ответ,
+--       отклонённый AnswerRejectionSystem, «ничего не найдено», ответ из FAQ;
+--   bot — новые пользователи и отзывы.
+--
+-- refresh_stats_daily пересчитывает последние дни из исходных таблиц
+-- (pg_cron, каждые 5 минут).
+-- ============================================================
+
+-- ─── Путь ответа в переписке ─────────────────────────────────
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS source TEXT DEFAULT 'llm';
+
+-- ─── Таблица счётчиков ───────────────────────────────────────
+CREATE TABLE IF NOT EXISTS stats_daily (
+    day          DATE NOT NULL,
+    source       TEXT NOT NULL,
+    messages     INTEGER NOT NULL DEFAULT 0,    -- вопросов с ответом
+    ktru_found   INTEGER NOT NULL DEFAULT 0,    -- из них с найденным КТРУ
+    new_users    INTEGER NOT NULL DEFAULT 0,    -- users.first_seen в этот день
+    likes        INTEGER NOT NULL DEFAULT 0,
+    dislikes     INTEGER NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (day, source)
+);
+
+-- Индекс по забаненным: stats_summary.banned без прохода по users
+CREATE INDEX IF NOT EXISTS idx_users_banned ON users(chat_id) WHERE is_banned;
+
+-- ─── Пересчёт дней начиная с p_since (NULL — вся история) ────
+-- Дни считаются по времени Астаны
+CREATE OR REPLACE FUNCTION refresh_stats_daily(p_since DATE DEFAULT CURRENT_DATE - 1)
+RETURNS VOID AS $$
+DECLARE
+    since_ts TIMESTAMPTZ := COALESCE(p_since, DATE '1970-01-01')::TIMESTAMP AT TIME ZONE 'Asia/Almaty';
+    since_day DATE := COALESCE(p_since, DATE '1970-01-01');
+BEGIN
+    -- Обнуляем пересчитываемые колонки: удалённые строки не должны оставаться в сумме
+    UPDATE stats_daily
+    SET messages = 0, ktru_found = 0, new_users = 0, likes = 0, dislikes = 0
+    WHERE day >= since_day;
+
+    INSERT INTO stats_daily (day, source, messages, ktru_found, new_users, likes, dislikes, refreshed_at)
+    SELECT day, source, SUM(messages), SUM(ktru_found), SUM(new_users), SUM(likes), SUM(dislikes), NOW()
+    FROM (
+        SELECT (created_at AT TIME ZONE 'Asia/Almaty')::DATE AS day,
+               COALESCE(source, 'llm') AS source,
+               COUNT(*) AS messages,
+               COUNT(*) FILTER (WHERE ktru_found) AS ktru_found,
+               0 AS new_users, 0 AS likes, 0 AS dislikes
+        FROM conversations WHERE created_at >= since_ts
+        GROUP BY 1, 2
+        UNION ALL
+        SELECT (first_seen AT TIME ZONE 'Asia/Almaty')::DATE, 'bot', 0, 0, COUNT(*), 0, 0
+        FROM users WHERE first_seen >= since_ts
+        GROUP BY 1
+        UNION ALL
+        SELECT (created_at AT TIME ZONE 'Asia/Almaty')::DATE, 'bot', 0, 0, 0,
+               COUNT(*) FILTER (WHERE rating = 'like'),
+               COUNT(*) FILTER (WHERE rating = 'dislike')
+        FROM feedback WHERE created_at >= since_ts
+        GROUP BY 1
+    ) t
+    GROUP BY day, source
+    ON CONFLICT (day, source) DO UPDATE SET
+        messages     = EXCLUDED.messages,
+        ktru_found   = EXCLUDED.ktru_found,
+        new_users    = EXCLUDED.new_users,
+        likes        = EXCLUDED.likes,
+        dislikes     = EXCLUDED.dislikes,
+        refreshed_at = EXCLUDED.refreshed_at;
+
+    UPDATE stats_daily SET refreshed_at = NOW() WHERE day >= since_day;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ─── VIEW: сводка одной строкой ───────────────────────────────
+CREATE OR REPLACE VIEW stats_summary AS
+SELECT
+    COALESCE(SUM(new_users), 0)                                 AS users_total,
+    COALESCE(SUM(messages), 0)                                  AS messages_total,
+    COALESCE(SUM(messages) FILTER (WHERE day = today), 0)       AS messages_today,
+    COALESCE(SUM(messages) FILTER (WHERE source = 'digest'), 0) AS digest_total,
+    COALESCE(SUM(ktru_found), 0)                                AS ktru_total,
+    COALESCE(SUM(likes), 0)                                     AS likes_total,
+    COALESCE(SUM(dislikes), 0)                                  AS dislikes_total,
+    COALESCE(SUM(likes + dislikes), 0)                          AS feedback_total,
+    COALESCE(SUM(messages) FILTER (WHERE source = 'rejected'), 0) AS rejections_total,
+    COALESCE(SUM(messages) FILTER (WHERE source = 'rejected' AND day = today), 0) AS rejections_today,
+    (SELECT COUNT(*) FROM users WHERE is_banned)                AS banned,
+    MAX(refreshed_at)                                           AS refreshed_at
+FROM stats_daily, (SELECT (NOW() AT TIME ZONE 'Asia/Almaty')::DATE AS today) d;
+
+-- ─── Расписание (pg_cron: Database → Extensions → pg_cron) ────
+CREATE EXTENSION IF NOT EXISTS pg_cron;
+SELECT cron.schedule('refresh-stats-daily', '*/5 * * * *', $$SELECT refresh_stats_daily()$$);
+
+-- Первичное заполнение всей истории
+SELECT refresh_stats_daily(NULL);
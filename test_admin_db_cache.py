@@ -0,0 +1,93 @@
+"""
+Тестирование кэша чтений AdminDB (admin_db_cache.py)
+Test: повторное чтение без обращения к БД, сброс после записи, статистика, прозрачный прокси
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from admin_db_cache import CachedAdminDB
+
+
+class FakeAdminDB:
+    """AdminDB-подобный объект: считает обращения к «Supabase»."""
+
+    def __init__(self):
+        self.calls = []
+        self.settings = {"rate_limit": 5}
+        self.supabase = object()
+
+    def get_settings(self):
+        self.calls.append("get_settings")
+        return dict(self.settings)
+
+    def update_settings(self, **values):
+        self.calls.append("update_settings")
+        self.settings.update(values)
+        return {"success": True}
+
+    def get_users(self, page=1, limit=50, search=None):
+        self.calls.append(("get_users", page, search))
+        return {"users": [], "page": page}
+
+    def ban_user(self, user_id, reason=""):
+        self.calls.append("ban_user")
+        return {"success": True}
+
+    def log_admin_action(self, **kwargs):
+        self.calls.append("log")
+
+
+def test_read_through_and_invalidate():
+    """Тест: второе чтение из кэша; update_settings сбрасывает get_settings"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Read-through и сброс по записи")
+    print("=" * 80)
+
+    raw = FakeAdminDB()
+    db = CachedAdminDB(raw)
+    assert db.get_settings() == db.get_settings() == {"rate_limit": 5}
+    assert raw.calls.count("get_settings") == 1
+
+    db.update_settings(rate_limit=10)
+    assert db.get_settings() == {"rate_limit": 10}
+    assert raw.calls.count("get_settings") == 2
+
+    stats = db.cache_stats()
+    assert stats["methods"]["get_settings"] == {"hits": 1, "misses": 2}
+    print(f"  [OK] hit_rate={stats['hit_rate']}")
+
+
+def test_arguments_are_part_of_key():
+    raw = FakeAdminDB()
+    db = CachedAdminDB(raw)
+    db.get_users(page=1)
+    db.get_users(page=2)
+    db.get_users(page=1)
+    assert [c for c in raw.calls if c[0] == "get_users"] == [("get_users", 1, None), ("get_users", 2, None)]
+
+    computed = []
+    db.cached("dashboard_stats", lambda: computed.append(1) or {"banned": 0})
+    db.ban_user(42, reason="spam")                  # сбрасывает get_users и dashboard_stats
+    db.get_users(page=1)
+    db.cached("dashboard_stats", lambda: computed.append(1) or {"banned": 1})
+    assert len(computed) == 2 and raw.calls.count(("get_users", 1, None)) == 2
+
+
+def test_passthrough_and_disabled():
+    raw = FakeAdminDB()
+    db = CachedAdminDB(raw, enabled=False)
+    assert db.supabase is raw.supabase
+    db.log_admin_action(admin_id=1, action="LOGIN")
+    db.get_settings()
+    db.get_settings()
+    assert raw.calls == ["log", "get_settings", "get_settings"]
+
+
+if __name__ == "__main__":
+    test_read_through_and_invalidate()
+    test_arguments_are_part_of_key()
+    test_passthrough_and_disabled()
+    print("\n[SUCCESS] Все тесты пройдены")
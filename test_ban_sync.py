@@ -0,0 +1,143 @@
+"""
+Тестирование синхронизации банов (ban_sync.py)
+Test: полная загрузка, дельты по водяному знаку ban_updated_at, откат без миграции
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ban_sync import BanSync
+from state_backend import MemoryStateBackend
+
+T0 = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeQuery:
+    """Минимальная имитация postgrest-запроса поверх списка строк."""
+
+    def __init__(self, rows, log, has_column=True):
+        self.rows = rows
+        self.log = log
+        self.has_column = has_column
+        self.filters = []
+        self.negate = False
+        self.sort = None
+        self.window = (0, None)
+
+    def select(self, columns):
+        if "ban_updated_at" in columns and not self.has_column:
+            raise RuntimeError("column users.ban_updated_at does not exist")
+        return self
+
+    @property
+    def not_(self):
+        self.negate = True
+        return self
+
+    def is_(self, column, value):
+        self.filters.append(lambda r: (r.get(column) is None) != self.negate)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def gte(self, column, value):
+        self.log.append(("gte", value))
+        self.filters.append(lambda r: r[column] is not None and r[column] >= value)
+        return self
+
+    def order(self, column, desc=False):
+        self.sort = (column, desc)
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end + 1)
+        return self
+
+    def limit(self, n):
+        self.window = (0, n)
+        return self
+
+    def execute(self):
+        rows = [r for r in self.rows if all(f(r) for f in self.filters)]
+        if self.sort:
+            rows.sort(key=lambda r: r[self.sort[0]], reverse=self.sort[1])
+        start, end = self.window
+        return type("Result", (), {"data": [dict(r) for r in rows[start:end]]})()
+
+
+class FakeClient:
+    def __init__(self, rows, has_column=True):
+        self.rows = rows
+        self.has_column = has_column
+        self.log = []
+
+    def table(self, name):
+        assert name == "users"
+        return FakeQuery(self.rows, self.log, self.has_column)
+
+
+def _row(chat_id, banned, ts):
+    return {"chat_id": chat_id, "is_banned": banned, "ban_updated_at": ts.isoformat()}
+
+
+def test_incremental_sync():
+    """Тест: после полной загрузки применяются только изменения"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Дельты по водяному знаку")
+    print("=" * 80)
+
+    rows = [_row(1, True, T0), _row(2, False, T0 + timedelta(seconds=1)), _row(3, True, T0)]
+    client = FakeClient(rows)
+    state = MemoryStateBackend()
+    sync = BanSync(client, state, overlap=5)
+
+    assert sync.full_load() == 2
+    assert state.has_member("banned", 1) and state.has_member("banned", 3)
+    assert sync.watermark == T0 + timedelta(seconds=1)
+
+    # Бан из админ-панели и разбан
+    rows[1].update(is_banned=True, ban_updated_at=(T0 + timedelta(seconds=30)).isoformat())
+    rows[0].update(is_banned=False, ban_updated_at=(T0 + timedelta(seconds=31)).isoformat())
+    assert sync.poll_changes() == (1, 1)
+    assert state.has_member("banned", 2) and not state.has_member("banned", 1)
+    assert sync.watermark == T0 + timedelta(seconds=31)
+    # Запрос шёл от водяного знака минус перекрытие
+    assert client.log[-1] == ("gte", (T0 - timedelta(seconds=4)).isoformat())
+
+    # Повторный опрос без изменений ничего не меняет
+    assert sync.poll_changes() == (0, 0)
+    print("  [OK]")
+
+
+def test_fallback_without_migration():
+    """Тест: без колонки ban_updated_at — только полная загрузка"""
+    client = FakeClient([{"chat_id": 5, "is_banned": True}], has_column=False)
+    state = MemoryStateBackend()
+    sync = BanSync(client, state)
+    assert sync.full_load() == 1
+    assert sync.incremental is False and state.has_member("banned", 5)
+
+
+def test_empty_table_sets_watermark():
+    """Тест: без банов полная загрузка не повторяется на каждом опросе"""
+    rows = [{"chat_id": 7, "is_banned": False, "ban_updated_at": None}]
+    client = FakeClient(rows)
+    state = MemoryStateBackend()
+    sync = BanSync(client, state)
+    assert sync.full_load() == 0 and sync.watermark is not None
+
+    rows.append(_row(8, True, T0))
+    assert sync.poll_changes() == (1, 0)
+    assert state.has_member("banned", 8) and sync.watermark == T0
+
+
+if __name__ == "__main__":
+    test_incremental_sync()
+    test_fallback_without_migration()
+    test_empty_table_sets_watermark()
+    print("\n[SUCCESS] Все тесты пройдены")
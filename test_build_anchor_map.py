@@ -0,0 +1,67 @@
+"""
+Тестирование индекса якорей adilet.zan.kz (build_anchor_map.AnchorIndex)
+Test: bisect-поиск якорей по статьям/пунктам и diff URL перед bulk-обновлением
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from build_anchor_map import PRAVILA_BASE, ZAKON_BASE, AnchorIndex, get_pravila_url, get_zakon_url, load_anchor_index
+from supabase_bulk import diff_column
+
+
+def test_anchor_index_lookup():
+    """Тест: точный поиск и разрешение диапазона пунктов"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: AnchorIndex")
+    print("=" * 80)
+
+    index = AnchorIndex({"3": "z10", "25": "z90", "46": "z150"})
+    assert index.exact(25) == "z90"
+    assert index.exact(24) is None
+    # Первый пункт диапазона без якоря — берём первый якорь внутри диапазона
+    assert index.resolve_range(20, 30) == "z90"
+    assert index.resolve_range(26, 45) is None
+
+    assert get_pravila_url([20, 30], "pravila_gl2", index) == f"{PRAVILA_BASE}#z90"
+    assert get_pravila_url([20, 30], "pravila_pril1", index) == PRAVILA_BASE
+    assert get_zakon_url(3, {"3": "z10"}) == f"{ZAKON_BASE}#z10"
+    print("  [OK] exact / resolve_range / URL")
+
+
+def test_saved_map_loads():
+    """Тест: data/anchor_map.json загружается в индекс"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 2: data/anchor_map.json")
+    print("=" * 80)
+
+    zakon_index, pravila_index = load_anchor_index()
+    print(f"  Статей: {len(zakon_index)}, пунктов: {len(pravila_index)}")
+    assert len(zakon_index) > 0 and len(pravila_index) > 0
+    assert zakon_index.keys == sorted(zakon_index.keys)
+
+
+def test_url_diff():
+    """Тест: в bulk-обновление попадают только изменившиеся URL"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 3: diff_column")
+    print("=" * 80)
+
+    chunks = [
+        {"id": "a", "official_url": "u1"},
+        {"id": "b", "official_url": "u2-new"},
+    ]
+    current = {"a": {"official_url": "u1"}, "b": {"official_url": "u2"}}
+    assert diff_column(chunks, current, "official_url") == [
+        {"id": "b", "old": "u2", "new": "u2-new"}
+    ]
+    print("  [OK] 1 изменение из 2")
+
+
+if __name__ == "__main__":
+    test_anchor_index_lookup()
+    test_saved_map_loads()
+    test_url_diff()
+    print("\n[SUCCESS] Все тесты пройдены")
@@ -0,0 +1,107 @@
+"""
+Тестирование учёта ответов по чатам (chat_tasks.py)
+Test: отмена устаревшего ответа в потоке, очередь, /clear, очистка записей
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chat_tasks import ChatTaskTracker
+
+
+class Cancelled(Exception):
+    pass
+
+
+def fake_answer(question, started: threading.Event, should_cancel):
+    """Имитация answer_question: «генерирует» 200 шагов, проверяя отмену."""
+    started.set()
+    for _ in range(200):
+        if should_cancel():
+            raise Cancelled(question)
+        threading.Event().wait(0.005)
+    return f"ответ: {question}"
+
+
+def test_newer_question_cancels():
+    """Тест: второй вопрос прерывает генерацию первого"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Политика cancel")
+    print("=" * 80)
+
+    async def ask(tracker, question, started, results):
+        async with tracker.track(1) as ticket:
+            try:
+                results.append(await asyncio.to_thread(fake_answer, question, started, ticket.is_cancelled))
+            except Cancelled:
+                results.append(f"отменён: {question}")
+
+    async def scenario():
+        tracker = ChatTaskTracker("cancel")
+        results = []
+        first_started = threading.Event()
+        first = asyncio.create_task(ask(tracker, "первый", first_started, results))
+        while not first_started.is_set():
+            await asyncio.sleep(0.001)
+        await ask(tracker, "второй", threading.Event(), results)
+        await first
+        return tracker, results
+
+    tracker, results = asyncio.run(scenario())
+    assert results == ["отменён: первый", "ответ: второй"]
+    assert tracker.cancelled == 1 and len(tracker) == 0
+    print("  [OK]")
+
+
+def test_queue_policy():
+    """Тест: queue — ответы одного чата по очереди, другие чаты параллельно"""
+    async def ask(tracker, chat_id, question, log):
+        async with tracker.track(chat_id) as ticket:
+            log.append(("start", question))
+            await asyncio.sleep(0.02)
+            assert not ticket.is_cancelled()
+            log.append(("end", question))
+
+    async def scenario():
+        tracker = ChatTaskTracker("queue")
+        log = []
+        await asyncio.gather(ask(tracker, 1, "a", log), ask(tracker, 1, "b", log),
+                             ask(tracker, 2, "c", log))
+        return tracker, log
+
+    tracker, log = asyncio.run(scenario())
+    assert log.index(("end", "a")) < log.index(("start", "b"))
+    assert log.index(("start", "c")) < log.index(("end", "a"))
+    assert tracker._queues == {} and len(tracker) == 0
+
+
+def test_explicit_cancel():
+    async def scenario():
+        tracker = ChatTaskTracker()
+        async with tracker.track(5) as ticket:
+            assert tracker.active(5) and not ticket.is_cancelled()
+            assert tracker.cancel(5)
+            assert ticket.is_cancelled()
+        assert not tracker.cancel(5)
+
+    asyncio.run(scenario())
+
+
+def test_invalid_policy():
+    try:
+        ChatTaskTracker("drop")
+    except ValueError:
+        return
+    raise AssertionError("ожидался ValueError")
+
+
+if __name__ == "__main__":
+    test_newer_question_cancels()
+    test_queue_policy()
+    test_explicit_cancel()
+    test_invalid_policy()
+    print("\n[SUCCESS] Все тесты пройдены")
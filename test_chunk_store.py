@@ -0,0 +1,103 @@
+"""
+Тестирование бинарного хранилища чанков (chunk_store.py)
+Test: JSON → .gzcs → JSON round-trip, поиск по id, zero-copy доступ к тексту
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chunk_store import ChunkStore, ChunkStoreError, default_json_paths, json_to_store, write_store
+
+
+def test_roundtrip_all_data_files():
+    """Тест: каждый data/chunks_*.json восстанавливается без потерь"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Round-trip всех файлов data/chunks_*.json")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in default_json_paths():
+            with open(path, encoding="utf-8") as f:
+                original = json.load(f)
+            out = os.path.join(tmp, "store.gzcs")
+            json_to_store([path], out)
+            with ChunkStore.open(out) as store:
+                restored = store.to_list()
+            print(f"  [OK] {os.path.basename(path):45} {len(original):4} чанков")
+            assert restored == original, f"Round-trip не совпал: {path}"
+
+
+def test_lookup_and_zero_copy():
+    """Тест: поиск по id (bisect) и чтение текста из mmap"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 2: Поиск по id и zero-copy текст")
+    print("=" * 80)
+
+    chunks = [
+        {"id": "b", "text": "Второй", "punkt_range": [3, 5], "article_num": None},
+        {"id": "a", "text": "Первый", "metadata": {"k": 1}},
+        {"id": "b", "text": "Дубль из другого файла", "char_count": 22},
+        {"id": "c", "text": None, "punkt_range": [1, 2, 3]},
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "store.gzcs")
+        write_store(chunks, out)
+        with ChunkStore.open(out) as store:
+            assert len(store) == 4
+            assert store.get("a")["metadata"] == {"k": 1}
+            assert [r.text for r in store.get_all("b")] == ["Второй", "Дубль из другого файла"]
+            assert store.get("zzz") is None
+            assert "c" in store
+
+            view = store.get("a").view("text")
+            assert isinstance(view, memoryview)
+            assert str(view, "utf-8") == "Первый"
+            view.release()
+
+            # Нестандартный punkt_range и None сохраняются как есть
+            assert store.get("c").to_dict() == chunks[3]
+            assert store.to_list() == chunks
+            print("  [OK] get / get_all / view / to_dict")
+
+
+def test_rejects_foreign_file():
+    """Тест: чужой файл не открывается"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 3: Защита от чужих файлов")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bad = os.path.join(tmp, "bad.gzcs")
+        with open(bad, "wb") as f:
+            f.write(b"not a chunk store at all, definitely not" * 2)
+        try:
+            ChunkStore.open(bad)
+        except ChunkStoreError as e:
+            print(f"  [OK] {e}")
+        else:
+            raise AssertionError("Ожидалась ChunkStoreError")
+
+
+def main():
+    tests = [
+        ("Round-trip data/", test_roundtrip_all_data_files),
+        ("Поиск и zero-copy", test_lookup_and_zero_copy),
+        ("Чужой файл", test_rejects_foreign_file),
+    ]
+    failed = 0
+    for name, fn in tests:
+        try:
+            fn()
+        except AssertionError as e:
+            failed += 1
+            print(f"[FAIL] {name}: {e}")
+    print(f"\nВсего: {len(tests) - failed}/{len(tests)} тестов пройдено")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
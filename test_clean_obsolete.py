@@ -0,0 +1,76 @@
+"""
+Тестирование чистки устаревших норм (clean_obsolete.py)
+Test: единый матчер строк, параллельная обработка файлов, отчёт и пакет для Supabase
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from clean_obsolete import build_report, clean_chunk_text, clean_chunk_text_lines, clean_files, collect_updates
+
+TEXT = (
+    "Глава 2. Порядок закупок\n"
+    "10. Заказчик размещает объявление.\n"
+    "11. Исключен приказом Министра финансов РК от 01.02.2025 № 50.\n"
+    "  Сноска. Пункт 12 – в редакции приказа МФ РК от 01.02.2025 № 50.\n"
+    "12. Пункт утратил силу\n"
+    "13. Срок подачи заявок — не менее пяти рабочих дней.\n"
+    "Примечание. Приложение 3 – в редакции приказа"
+)
+
+
+def test_single_pass_matcher():
+    """Тест: удаляются только строки-маркеры устаревших норм"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Единый матчер устаревших строк")
+    print("=" * 80)
+
+    cleaned, removed = clean_chunk_text_lines(TEXT)
+    for line in removed:
+        print(f"  удалено: {line}")
+    assert cleaned == (
+        "Глава 2. Порядок закупок\n"
+        "10. Заказчик размещает объявление.\n"
+        "13. Срок подачи заявок — не менее пяти рабочих дней."
+    )
+    assert len(removed) == 4
+    # «утратил» и «силу» на разных строках — это не маркер
+    assert clean_chunk_text("Норма утратил\nсилу") == ("Норма утратил\nсилу", 0)
+
+
+def test_parallel_files_and_report():
+    """Тест: несколько файлов, отчёт и изменения для bulk-обновления"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 2: Параллельная обработка файлов")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for n in range(3):
+            path = os.path.join(tmp, f"chunks_{n}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump([{"id": f"c{n}", "text": TEXT}, {"id": f"ok{n}", "text": "Чистый текст"}],
+                          f, ensure_ascii=False)
+            paths.append(path)
+
+        results = clean_files(paths, workers=2)
+        report = build_report(results)
+        assert report["total_chunks_cleaned"] == 3
+        assert report["total_lines_removed"] == 12
+        assert [u["id"] for u in collect_updates(results)] == ["c0", "c1", "c2"]
+
+        with open(paths[0], encoding="utf-8") as f:
+            saved = json.load(f)
+        assert "утратил" not in saved[0]["text"]
+        assert saved[0]["char_count"] == len(saved[0]["text"])
+        print(f"  [OK] {report['total_chunks_cleaned']} чанков, {report['total_lines_removed']} строк")
+
+
+if __name__ == "__main__":
+    test_single_pass_matcher()
+    test_parallel_files_and_report()
+    print("\n[SUCCESS] Все тесты пройдены")
@@ -0,0 +1,74 @@
+"""
+Тестирование ленивых клиентов (clients.py)
+Test: import rag без .env и без импорта SDK, один клиент на все потоки, понятная ошибка конфигурации
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import clients
+from clients import LazyClient, MissingConfigError, require_env
+
+
+def test_import_rag_is_lazy():
+    """Тест: import rag не требует переменных окружения и не тянет anthropic/supabase"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Холодный импорт rag")
+    print("=" * 80)
+
+    env = {k: v for k, v in os.environ.items()
+           if k not in ("ANTHROPIC_API_KEY", "SUPABASE_URL", "SUPABASE_KEY")}
+    code = (
+        "import sys, rag\n"
+        "print('anthropic' in sys.modules, 'supabase' in sys.modules, len(rag.SYSTEM_PROMPT) > 0)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    assert out.stdout.split() == ["False", "False", "True"]
+    print("  [OK]")
+
+
+def test_single_instance_across_threads():
+    """Тест: при одновременном первом обращении из потоков клиент создаётся один раз"""
+    created = []
+
+    class Client:
+        def __init__(self):
+            time.sleep(0.01)
+            created.append(self)
+
+        def ident(self):
+            return id(self)
+
+    proxy = LazyClient(lambda: clients._get("test-client", Client))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(proxy.ident())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(created) == 1 and set(results) == {id(created[0])}
+    assert clients.initialized("test-client")
+    clients._clients.pop("test-client")
+
+
+def test_missing_config():
+    os.environ.pop("BENCH_MISSING_VAR", None)
+    try:
+        require_env("BENCH_MISSING_VAR")
+    except MissingConfigError as e:
+        assert "BENCH_MISSING_VAR" in str(e)
+        return
+    raise AssertionError("ожидалась MissingConfigError")
+
+
+if __name__ == "__main__":
+    test_import_rag_is_lazy()
+    test_single_instance_across_threads()
+    test_missing_config()
+    print("\n[SUCCESS] Все тесты пройдены")
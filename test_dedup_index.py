@@ -0,0 +1,125 @@
+"""
+Тестирование поиска почти-дубликатов чанков (dedup_index.py)
+Test: MinHash-кластеры по data/ и дедупликация контекста при ответе
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dedup_index import DedupIndex, chunk_text, collapse_chunks, drop_near_duplicates
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LAW_TEXT = (
+    "72. Заказчику запрещается предъявлять к потенциальному поставщику требования "
+    "о наличии трудовых ресурсов, за исключением случаев, предусмотренных настоящими "
+    "Правилами, а также требовать документы, не предусмотренные конкурсной документацией."
+)
+
+
+def test_conflicting_norms_variants_cluster():
+    """Тест: одинаковые конфликтные чанки из разных файлов попадают в один кластер"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Кластеры по chunks_conflicting_norms*.json")
+    print("=" * 80)
+
+    index = DedupIndex(threshold=0.8)
+    for name in ("chunks_conflicting_norms.json", "chunks_conflicting_norms_extended.json"):
+        with open(os.path.join(BASE_DIR, "data", name), encoding="utf-8") as f:
+            for chunk in json.load(f):
+                index.add(chunk["id"], chunk_text(chunk))
+
+    clusters = [[index.keys[i] for i in c] for c in index.clusters()]
+    print(f"  Кластеров: {len(clusters)}")
+    assert ["conflict_discrimination_009", "conflict_discrimination_009"] in clusters
+
+
+def test_collapse_keeps_first():
+    """Тест: при схлопывании остаётся первый чанк кластера"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 2: collapse_chunks")
+    print("=" * 80)
+
+    chunks = [
+        {"id": "pravila_p72", "text": LAW_TEXT},
+        {"id": "all_p72", "text": LAW_TEXT + " "},
+        {"id": "other", "text": "Совсем другой текст про электронный магазин и оферты поставщиков."},
+    ]
+    unique, mapping = collapse_chunks(chunks)
+    assert [c["id"] for c in unique] == ["pravila_p72", "other"]
+    assert mapping == {"all_p72": "pravila_p72"}
+    print(f"  [OK] {mapping}")
+
+
+def test_query_time_dedup():
+    """Тест: повторы между секциями контекста отбрасываются"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 3: drop_near_duplicates при ответе на вопрос")
+    print("=" * 80)
+
+    law = [{"id": "pravila_gl5", "text": LAW_TEXT + " Дополнительный абзац главы про сроки."}]
+    conflict = [
+        {"id": "pravila_gl5", "text": "тот же id"},                     # точный повтор по id
+        {"id": "conflict_punkt72", "text": LAW_TEXT},                   # целиком входит в главу
+        {"id": "conflict_new", "text": "Статья 9 Закона гарантирует право на участие всем потенциальным поставщикам."},
+    ]
+    platform, law_out, conflict_out = drop_near_duplicates([[], law, conflict])
+    assert platform == []
+    assert [c["id"] for c in law_out] == ["pravila_gl5"]
+    assert [c["id"] for c in conflict_out] == ["conflict_new"]
+    print("  [OK] Осталось:", [c["id"] for c in law_out + conflict_out])
+
+
+def test_ingest_stores_collapsed_chunks():
+    """Тест: ingest.py dedup → store кладёт в хранилище только уникальные чанки"""
+    import ingest
+    from chunk_store import ChunkStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, "chunks_pravila.json"), os.path.join(tmp, "chunks_all.json")]
+        with open(paths[0], "w", encoding="utf-8") as f:
+            json.dump([{"id": "pravila_p72", "text": LAW_TEXT}], f, ensure_ascii=False)
+        with open(paths[1], "w", encoding="utf-8") as f:
+            json.dump([{"id": "all_p72", "text": LAW_TEXT + " "},
+                       {"id": "other", "text": "Совсем другой текст про электронный магазин."}],
+                      f, ensure_ascii=False)
+
+        saved = ingest.default_json_paths, ingest.DEFAULT_STORE_PATH, ingest.DEDUP_MAP_PATH
+        ingest.default_json_paths = lambda: paths
+        ingest.DEFAULT_STORE_PATH = os.path.join(tmp, "chunks.gzcs")
+        ingest.DEDUP_MAP_PATH = os.path.join(tmp, "dedup_map.json")
+        try:
+            ingest.run(["dedup", "store"])
+            with ChunkStore.open(ingest.DEFAULT_STORE_PATH) as store:
+                assert sorted(r.id for r in store) == ["other", "pravila_p72"]
+            with open(ingest.DEDUP_MAP_PATH, encoding="utf-8") as f:
+                assert json.load(f) == {"all_p72": "pravila_p72"}
+        finally:
+            ingest.default_json_paths, ingest.DEFAULT_STORE_PATH, ingest.DEDUP_MAP_PATH = saved
+    print("  [OK]")
+
+
+def main():
+    tests = [
+        ("Кластеры data/", test_conflicting_norms_variants_cluster),
+        ("Схлопывание", test_collapse_keeps_first),
+        ("Контекст ответа", test_query_time_dedup),
+        ("Стадия dedup в ingest.py", test_ingest_stores_collapsed_chunks),
+    ]
+    failed = 0
+    for name, fn in tests:
+        try:
+            fn()
+        except AssertionError as e:
+            failed += 1
+            print(f"[FAIL] {name}: {e}")
+    print(f"\nВсего: {len(tests) - failed}/{len(tests)} тестов пройдено")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,143 @@
+"""
+Тестирование режима «только поиск» (degraded_mode.py)
+Test: circuit breaker (closed → open → half_open), дайджест без LLM, переключение и уведомления
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from degraded_mode import CircuitBreaker, DegradedMode, build_digest
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_cycle():
+    """Тест: серия ошибок размыкает, пробный вызов после паузы замыкает"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Circuit breaker")
+    print("=" * 80)
+
+    clock = Clock()
+    b = CircuitBreaker(error_rate=0.5, max_failures=3, reset_timeout=60, clock=clock)
+    for _ in range(2):
+        b.record_failure()
+    assert b.state == "closed" and b.allow()
+    b.record_failure()
+    assert b.state == "open" and not b.allow()
+
+    clock.now = 61
+    assert b.state == "half_open"
+    assert b.allow() and not b.allow()       # только один пробный вызов
+    b.record_failure()
+    assert b.state == "open"
+
+    clock.now = 130
+    assert b.allow()
+    b.record_success()
+    assert b.state == "closed" and b.allow()
+    print("  [OK]")
+
+
+def test_breaker_error_rate_and_cancel():
+    """Тест: доля ошибок в окне; отменённый пробный вызов не блокирует breaker"""
+    clock = Clock()
+    b = CircuitBreaker(error_rate=0.5, max_failures=100, reset_timeout=10, clock=clock)
+    for i in range(6):
+        (b.record_failure if i % 2 else b.record_success)()
+    assert b.state == "open" and b.error_rate_now() == 0.5
+
+    clock.now = 11
+    assert b.allow()
+    b.record_cancelled()
+    assert b.allow()
+
+
+def test_digest():
+    """Тест: дайджест содержит перечни ТРУ, заголовки, ссылки и фрагменты"""
+    ktru = [{"perechen_type": "msb", "nazvanie": "Бумага офисная", "sposob": "у субъектов МСБ"}]
+    meta = {"msb": {"npa": "Приказ МФ РК №677", "url": "https://adilet.zan.kz/rus/docs/V2400035226"}}
+    law = [
+        {"id": 1, "document_short": "Закон о ГЗ", "article_title": "Статья 16",
+         "official_url": "https://adilet.zan.kz/rus/docs/Z2400000106",
+         "text": "Заказчик осуществляет оплату в течение 30 рабочих дней. " + "Дальше. " * 100},
+        {"id": 1, "document_short": "Закон о ГЗ", "text": "дубль"},
+    ]
+    text = build_digest(ktru, [("Инструкции", []), ("Нормативные документы", law)], meta)
+    assert "Бумага офисная" in text and "[Приказ МФ РК №677](https://adilet.zan.kz" in text
+    assert "[Закон о ГЗ, Статья 16](https://adilet.zan.kz/rus/docs/Z2400000106)" in text
+    assert "в течение 30 рабочих дней." in text and "дубль" not in text
+    assert "Инструкции" not in text
+    assert len(text) < 1500
+
+
+def test_mode_switch_and_alert():
+    """Тест: режим по очереди и breaker, уведомление при входе и выходе"""
+    async def scenario():
+        alerts = []
+
+        async def alert(text):
+            alerts.append(text)
+
+        clock = Clock()
+        breaker = CircuitBreaker(max_failures=1, reset_timeout=60, clock=clock)
+        depth = [0]
+        mode = DegradedMode(breaker, lambda: depth[0], max_queue=10, alert=alert)
+        assert mode.check() is None
+        depth[0] = 12
+        assert mode.check() == "overload"
+        depth[0] = 0
+        breaker.record_failure()
+        assert mode.check() == "llm_unavailable"
+        breaker.record_success()
+        assert mode.check() is None
+        await asyncio.sleep(0)
+        return alerts
+
+    alerts = asyncio.run(scenario())
+    # Вход в режим, смена причины (подавлена ALERT_COOLDOWN), возврат в норму
+    assert len(alerts) == 2 and "overload" in alerts[0] and "штатный" in alerts[1]
+
+
+def test_only_digests_are_counted():
+    """Тест: при разомкнутом breaker «ничего не найдено» не считается ответом без LLM"""
+    import bot
+    import rag
+
+    breaker = CircuitBreaker(max_failures=1)
+    breaker.record_failure()
+    results = {"пусто": rag.Retrieval(),
+               "закон": rag.Retrieval(law_chunks=[{"id": 1, "text": "Статья 16. Оплата."}])}
+    saved = bot.degraded, rag.retrieve, rag.llm_breaker
+    bot.degraded = DegradedMode(breaker, lambda: 0)
+    rag.retrieve = lambda question, should_cancel=None: results[question]
+    rag.llm_breaker = breaker
+    ticket = SimpleNamespace(is_cancelled=lambda: False)
+    try:
+        _, chunks, _, source = asyncio.run(
+            bot.generate_answer(1, "пусто", [], ticket, bot.Priority.QUESTION))
+        assert (chunks, source) == (0, "empty") and bot.degraded.digest_answers == 0
+
+        _, _, _, source = asyncio.run(
+            bot.generate_answer(1, "закон", [], ticket, bot.Priority.QUESTION))
+        assert source == "digest" and bot.degraded.digest_answers == 1
+    finally:
+        bot.degraded, rag.retrieve, rag.llm_breaker = saved
+
+
+if __name__ == "__main__":
+    test_breaker_cycle()
+    test_breaker_error_rate_and_cancel()
+    test_digest()
+    test_mode_switch_and_alert()
+    test_only_digests_are_counted()
+    print("\n[SUCCESS] Все тесты пройдены")
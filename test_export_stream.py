@@ -0,0 +1,115 @@
+"""
+Тестирование потоковой выгрузки (export_stream.py)
+Test: keyset-страницы без пропусков, фильтры, CSV/NDJSON, потоковый gzip
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from export_stream import EXPORT_COLUMNS, export, iter_rows
+
+
+class FakeClient:
+    """Таблица conversations из n строк; запоминает фильтры и число запросов."""
+
+    def __init__(self, n):
+        self.rows = [{"id": i, "chat_id": i % 3, "created_at": f"2026-01-{1 + i % 28:02d}",
+                      "question": f"вопрос, {i}", "answer": "ответ\nс переносом",
+                      "chunks_used": 4, "ktru_found": False, "source": "llm"}
+                     for i in range(1, n + 1)]
+        self.filters = []
+        self.requests = 0
+
+    def table(self, name):
+        self.requests += 1
+        return FakeQuery(self, list(self.rows))
+
+
+class FakeQuery:
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+
+    def select(self, columns):
+        return self
+
+    def _filter(self, name, column, value, predicate):
+        self.client.filters.append((name, column, value))
+        self.rows = [r for r in self.rows if predicate(r[column], value)]
+        return self
+
+    def gt(self, column, value):
+        return self._filter("gt", column, value, lambda a, b: a > b)
+
+    def gte(self, column, value):
+        return self._filter("gte", column, value, lambda a, b: a >= b)
+
+    def lt(self, column, value):
+        return self._filter("lt", column, value, lambda a, b: a < b)
+
+    def eq(self, column, value):
+        return self._filter("eq", column, value, lambda a, b: a == b)
+
+    def order(self, column):
+        self.rows.sort(key=lambda r: r[column])
+        return self
+
+    def limit(self, n):
+        self.rows = self.rows[:n]
+        return self
+
+    def execute(self):
+        return type("Result", (), {"data": self.rows})()
+
+
+def test_keyset_pages():
+    """Тест: 2500 строк страницами по 1000 — каждая ровно один раз, 3 запроса"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Keyset-выгрузка")
+    print("=" * 80)
+
+    client = FakeClient(2500)
+    ids = [row["id"] for row in iter_rows(client, "conversations", batch_size=1000)]
+    assert ids == list(range(1, 2501)) and client.requests == 3
+    print(f"  [OK] {len(ids)} строк за {client.requests} запроса")
+
+
+def test_filters():
+    client = FakeClient(100)
+    rows = list(iter_rows(client, "conversations", since="2026-01-10", until="2026-01-20", chat_id=1))
+    assert rows and all(r["chat_id"] == 1 and "2026-01-10" <= r["created_at"] < "2026-01-20" for r in rows)
+    assert ("eq", "chat_id", 1) in client.filters
+
+
+def test_csv_gzip_roundtrip():
+    """Тест: CSV с запятыми и переносами строк переживает потоковый gzip"""
+    data = b"".join(export(FakeClient(50), "conversations", "csv", gzip=True))
+    reader = csv.DictReader(io.StringIO(gzip.decompress(data).decode("utf-8")))
+    assert tuple(reader.fieldnames) == EXPORT_COLUMNS["conversations"]
+    rows = list(reader)
+    assert len(rows) == 50 and rows[0]["question"] == "вопрос, 1"
+    assert rows[0]["answer"] == "ответ\nс переносом"
+
+
+def test_ndjson():
+    lines = b"".join(export(FakeClient(3), "conversations")).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+    try:
+        list(export(FakeClient(1), "users"))
+    except ValueError:
+        return
+    raise AssertionError("ожидалась ValueError для неизвестной таблицы")
+
+
+if __name__ == "__main__":
+    test_keyset_pages()
+    test_filters()
+    test_csv_gzip_roundtrip()
+    test_ndjson()
+    print("\n[SUCCESS] Все тесты пройдены")
@@ -0,0 +1,135 @@
+"""
+Тестирование FAQ до RAG (faq_index.py)
+Test: точное и нечёткое совпадение, порог, счётчики попаданий, перезагрузка по подписи таблицы
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from faq_index import FaqIndex, FaqSync, normalize
+
+FAQ_ROWS = [
+    {"id": 1, "question": "Как зарегистрироваться на портале госзакупок?",
+     "answer": "Нужна ЭЦП юридического лица…"},
+    {"id": 2, "question": "Что такое КТРУ?", "answer": "Классификатор товаров, работ и услуг."},
+    {"id": 3, "question": "Какой срок подачи заявки в запросе ценовых предложений?",
+     "answer": "Не менее пяти рабочих дней."},
+]
+
+
+def test_exact_and_fuzzy_match():
+    """Тест: регистр/пунктуация не важны; близкая формулировка — fuzzy; чужой вопрос — мимо"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Точное и нечёткое совпадение")
+    print("=" * 80)
+
+    index = FaqIndex(threshold=0.6)
+    assert index.load(FAQ_ROWS) == 3
+    assert normalize("  Что  такое КТРУ?!") == "что такое ктру"
+
+    match = index.match("что такое ктру")
+    assert match.entry.id == 2 and match.kind == "exact" and match.score == 1.0
+
+    match = index.match("Какой срок подачи заявки при запросе ценовых предложений")
+    assert match.entry.id == 3 and match.kind == "fuzzy"
+    print(f"  [OK] fuzzy score={match.score}")
+
+    assert index.match("Как рассчитывается неустойка за просрочку поставки?") is None
+    assert index.match("ктру") is None           # одно слово — только точное совпадение
+
+
+def test_negation_is_not_a_match():
+    """Тест: вопрос с «не» — противоположный, готовый ответ на него не отдаётся"""
+    index = FaqIndex()
+    index.load([{"id": 10, "question": "Можно ли указывать товарный знак в техспецификации?",
+                 "answer": "Нет, кроме случаев, предусмотренных Правилами."}])
+    assert index.match("Можно ли не указывать товарный знак в техспецификации?") is None
+    assert index.match("можно ли указывать товарный знак в техспецификации").kind == "exact"
+
+
+def test_threshold_and_hit_counts():
+    index = FaqIndex(threshold=0.99)
+    index.load(FAQ_ROWS)
+    assert index.match("Какой срок подачи заявки при запросе ценовых предложений") is None
+
+    index.match("Что такое КТРУ")
+    index.match("что такое ктру?")
+    assert (index.hits, index.misses) == (2, 1)
+    assert index.take_hit_counts() == {2: 2}
+    assert index.take_hit_counts() == {}
+    assert "3 записей" in index.format_stats()
+
+
+class FakeFaqClient:
+    """Таблица faq и RPC faq_add_hits поверх списков."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.loads = 0
+        self.rpc_calls = []
+
+    def table(self, name):
+        return FakeQuery(self)
+
+    def rpc(self, name, params):
+        self.rpc_calls.append((name, params))
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=None))
+
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+        self.signature = False
+
+    def select(self, columns, count=None):
+        self.signature = count == "exact"
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def order(self, column, desc=False):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def execute(self):
+        rows = self.client.rows
+        if self.signature:
+            latest = max((r["updated_at"] for r in rows), default=None)
+            return SimpleNamespace(data=[{"updated_at": latest}] if rows else [], count=len(rows))
+        self.client.loads += 1
+        return SimpleNamespace(data=[r for r in rows if r.get("is_active", True)], count=None)
+
+
+def test_sync_reloads_only_on_change():
+    rows = [dict(r, updated_at="2026-03-01T10:00:00") for r in FAQ_ROWS]
+    client = FakeFaqClient(rows)
+    index = FaqIndex()
+    sync = FaqSync(client, index)
+
+    assert sync.refresh() is True and len(index) == 3
+    assert sync.refresh() is False and client.loads == 1
+
+    rows[1] = dict(rows[1], answer="Каталог КТРУ", updated_at="2026-03-01T11:00:00")
+    assert sync.refresh() is True
+    assert index.match("Что такое КТРУ?").entry.answer == "Каталог КТРУ"
+
+    rows.pop(0)                                  # удаление меняет число строк
+    assert sync.refresh() is True and len(index) == 2
+
+    assert sync.flush_hits() == 1
+    assert client.rpc_calls == [("faq_add_hits", {"p_hits": {"2": 1}})]
+    assert sync.flush_hits() == 0
+
+
+if __name__ == "__main__":
+    test_exact_and_fuzzy_match()
+    test_negation_is_not_a_match()
+    test_threshold_and_hit_counts()
+    test_sync_reloads_only_on_change()
+    print("\n[SUCCESS] Все тесты пройдены")
@@ -0,0 +1,79 @@
+"""
+Тестирование кэшируемых JSON-ответов (http_cache.py, admin_views.py)
+Test: ETag и 304, выбор сжатия по Accept-Encoding, одна выборка на вкладку
+"""
+
+import gzip
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import admin_views
+from http_cache import MIN_COMPRESS_SIZE, CachedBody, build_response, choose_encoding
+
+
+def test_etag_and_304():
+    """Тест: повтор с If-None-Match — 304 без тела; тело сжимается один раз"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: ETag / 304 / gzip")
+    print("=" * 80)
+
+    payload = {"rows": [{"question": "Как подать заявку?" * 20, "id": i} for i in range(50)]}
+    cached = CachedBody.from_payload(payload)
+    status, headers, body = build_response(cached, None, "gzip, deflate")
+    assert status == 200 and headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body)) == payload
+    print(f"  [OK] {len(cached.body)} → {len(body)} байт gzip")
+
+    assert cached.encoded("gzip") is body                     # сжатие закэшировано
+    status, headers, body = build_response(cached, f'"x", {headers["ETag"]}', "gzip")
+    assert status == 304 and body == b"" and "Content-Encoding" not in headers
+    status, _, _ = build_response(cached, 'W/"другой"', "gzip")
+    assert status == 200
+
+
+def test_choose_encoding():
+    big = MIN_COMPRESS_SIZE * 2
+    assert choose_encoding(None, big) is None
+    assert choose_encoding("gzip", 10) is None                 # маленький ответ не сжимаем
+    assert choose_encoding("gzip;q=0, identity", big) is None
+    assert choose_encoding("*", big) == "gzip"
+    assert choose_encoding("br", big) in ("br", None)          # brotli — необязательный пакет
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def table(self, name):
+        self.calls.append(name)
+        return self
+
+    def __getattr__(self, name):
+        def method(*args, **kwargs):
+            self.calls.append((name, args))
+            return self
+        return method
+
+    def execute(self):
+        return type("Result", (), {"data": [{"id": 1}], "count": 51})()
+
+
+def test_users_view_server_search():
+    """Тест: поиск пользователей уходит в один or-фильтр, chat_id — точное совпадение"""
+    client = FakeClient()
+    page = admin_views.users(client, page=2, search='12345')
+    assert page["pages"] == 3 and page["page"] == 2
+    calls = dict(c for c in client.calls if isinstance(c, tuple))
+    or_expr = calls["or_"][0]
+    assert 'username.ilike."*12345*"' in or_expr and "chat_id.eq.12345" in or_expr
+    assert calls["range"] == (50, 74)
+
+
+if __name__ == "__main__":
+    test_etag_and_304()
+    test_choose_encoding()
+    test_users_view_server_search()
+    print("\n[SUCCESS] Все тесты пройдены")
@@ -0,0 +1,87 @@
+"""
+Тестирование манифеста базы знаний (kb_manifest.py)
+Test: инкрементальное обновление статистики и сообщения бота из манифеста
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_bot_messages import build_messages
+from kb_manifest import load_manifest, manifest_statistics, update_manifest
+
+
+def _write(path, chunks):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chunks, f, ensure_ascii=False)
+
+
+def test_incremental_update():
+    """Тест: перечитываются только изменившиеся файлы"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Инкрементальное обновление манифеста")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest_path = os.path.join(tmp, "kb_manifest.json")
+        zakon = os.path.join(tmp, "chunks_zakon.json")
+        _write(zakon, [{"id": "z1", "document_name": "Закон", "source_platform": "law"}])
+        _write(os.path.join(tmp, "chunks_tax.json"), [{"id": "t1"}, {"id": "t2"}])
+
+        manifest, changed = update_manifest(tmp, manifest_path)
+        assert changed == ["tax", "zakon"]
+        assert manifest["total_chunks"] == 3
+        assert manifest["files"]["zakon"]["document_name"] == "Закон"
+
+        # Повторный запуск — ничего не изменилось, файл манифеста не трогаем
+        mtime = os.stat(manifest_path).st_mtime_ns
+        manifest, changed = update_manifest(tmp, manifest_path)
+        assert changed == [] and os.stat(manifest_path).st_mtime_ns == mtime
+
+        # mtime изменился, содержимое то же — статистика не меняется
+        os.utime(zakon, ns=(mtime + 10**9, mtime + 10**9))
+        _, changed = update_manifest(tmp, manifest_path)
+        assert changed == []
+
+        # Свежий clone: другие mtime и нет локального кэша — манифест не меняется
+        os.remove(os.path.join(tmp, "kb_manifest.stat.json"))
+        os.utime(zakon, ns=(mtime + 2 * 10**9, mtime + 2 * 10**9))
+        mtime = os.stat(manifest_path).st_mtime_ns
+        _, changed = update_manifest(tmp, manifest_path)
+        assert changed == [] and os.stat(manifest_path).st_mtime_ns == mtime
+        assert "mtime_ns" not in load_manifest(manifest_path)["files"]["zakon"]
+
+        # Новый чанк и удалённый файл
+        _write(zakon, [{"id": "z1", "document_name": "Закон"}, {"id": "z2"}])
+        os.remove(os.path.join(tmp, "chunks_tax.json"))
+        manifest, changed = update_manifest(tmp, manifest_path)
+        assert changed == ["zakon", "tax"]
+        assert manifest["total_chunks"] == 2
+        assert load_manifest(manifest_path) == manifest
+        print(f"  [OK] изменено: {changed}")
+
+
+def test_messages_from_manifest():
+    """Тест: /start собирается из статистики манифеста"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 2: Сообщения бота из манифеста")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _write(os.path.join(tmp, "chunks_zakon.json"),
+               [{"id": f"z{i}", "document_name": "Закон о закупках"} for i in range(7)])
+        manifest, _ = update_manifest(tmp, os.path.join(tmp, "kb_manifest.json"))
+        start_msg, help_msg, sources_msg = build_messages(*manifest_statistics(manifest))
+        assert "📄 Закон о закупках (7 разделов)" in start_msg
+        assert "В базе: 7+ разделов" in start_msg
+        assert help_msg and sources_msg
+        print("  [OK] START_MESSAGE содержит актуальную статистику")
+
+
+if __name__ == "__main__":
+    test_incremental_update()
+    test_messages_from_manifest()
+    print("\n[SUCCESS] Все тесты пройдены")
@@ -0,0 +1,115 @@
+"""
+Тестирование курсорной пагинации и TTL-кэша (keyset_pagination.py, ttl_cache.py)
+Test: страницы без пропусков и повторов при равных created_at, возврат назад, кэш счётчиков
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from keyset_pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from ttl_cache import TTLCache
+
+
+class FakeQuery:
+    """Минимальный postgrest select-builder поверх списка строк."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.orders = []
+        self.n = None
+        self.filters = []
+
+    def or_(self, expr):
+        self.filters.append(expr)
+        # created_at.lt."X",and(created_at.eq."X",id.lt.N)
+        op = expr.split(".")[1]
+        ts = expr.split('"')[1]
+        row_id = int(expr.rsplit(".", 1)[1].rstrip(")"))
+        key = (ts, row_id)
+        if op == "lt":
+            self.rows = [r for r in self.rows if (r["created_at"], r["id"]) < key]
+        else:
+            self.rows = [r for r in self.rows if (r["created_at"], r["id"]) > key]
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, n):
+        self.n = n
+        return self
+
+    def execute(self):
+        desc = self.orders[0][1]
+        rows = sorted(self.rows, key=lambda r: (r["created_at"], r["id"]), reverse=desc)
+        return type("Result", (), {"data": rows[: self.n]})()
+
+
+# 25 строк, по пять с одинаковым created_at — id разрешает равенство
+ROWS = [{"id": i, "created_at": f"2026-01-0{1 + i // 5}T10:00:00+00:00"} for i in range(25)]
+
+
+def test_walk_forward_and_back():
+    """Тест: проход вперёд покрывает все строки ровно один раз, назад — те же страницы"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Keyset-страницы вперёд и назад")
+    print("=" * 80)
+
+    pages, cursor = [], None
+    while True:
+        page = keyset_page(FakeQuery(ROWS), 7, cursor)
+        pages.append(page)
+        if not page["has_more"]:
+            break
+        cursor = page["next_cursor"]
+
+    seen = [r["id"] for p in pages for r in p["rows"]]
+    assert seen == list(range(24, -1, -1)), seen
+    assert [len(p["rows"]) for p in pages] == [7, 7, 7, 4]
+    assert pages[0]["prev_cursor"] is None and pages[-1]["next_cursor"] is None
+
+    back = keyset_page(FakeQuery(ROWS), 7, pages[2]["prev_cursor"], direction="prev")
+    assert [r["id"] for r in back["rows"]] == [r["id"] for r in pages[1]["rows"]]
+    assert back["next_cursor"] == pages[1]["next_cursor"]
+    print(f"  [OK] {len(pages)} страниц, возврат назад совпал")
+
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor("2026-01-01T10:00:00.123+00:00", 42)
+    assert decode_cursor(cursor) == ("2026-01-01T10:00:00.123+00:00", 42)
+    for bad in ("", "abc", encode_cursor("x", 1)[:-3]):
+        try:
+            decode_cursor(bad)
+        except InvalidCursor:
+            continue
+        raise AssertionError(f"ожидалась InvalidCursor для {bad!r}")
+
+
+def test_ttl_cache():
+    """Тест: счётчик считается один раз за TTL, после истечения — заново"""
+    now = [0.0]
+    cache = TTLCache(ttl=30, maxsize=2, clock=lambda: now[0])
+    calls = []
+
+    def count():
+        calls.append(1)
+        return len(calls) * 100
+
+    assert cache.get_or_set("all", count) == 100
+    assert cache.get_or_set("all", count) == 100
+    now[0] = 31
+    assert cache.get_or_set("all", count) == 200
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("all") is None and len(cache) == 2   # вытеснен по maxsize
+    assert cache.invalidate(lambda k: k == "a") == 1 and cache.get("b") == 2
+
+
+if __name__ == "__main__":
+    test_walk_forward_and_back()
+    test_cursor_roundtrip()
+    test_ttl_cache()
+    print("\n[SUCCESS] Все тесты пройдены")
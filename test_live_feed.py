@@ -0,0 +1,106 @@
+"""
+Тестирование живой ленты админ-панели (live_feed.py)
+Test: раздача всем подписчикам, повтор по Last-Event-ID, отключение медленного клиента, один опрос на всех
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from live_feed import Broadcaster, FeedPoller
+
+
+def test_fanout_and_replay():
+    """Тест: событие получают все подписчики; переподключение догоняет из буфера"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Раздача и повтор по Last-Event-ID")
+    print("=" * 80)
+
+    feed = Broadcaster(replay=3, client_queue=10)
+    subs = [feed.subscribe()[0] for _ in range(5)]
+    event = feed.publish("conversation", {"id": 1})
+    assert all(s.get(timeout=0).id == event.id for s in subs)
+
+    for i in range(2, 6):
+        feed.publish("conversation", {"id": i})
+    _, missed, gap = feed.subscribe(last_event_id=3)
+    assert [e.id for e in missed] == [4, 5] and not gap
+    _, missed, gap = feed.subscribe(last_event_id=1)     # 2 уже вытеснен из буфера
+    assert gap
+    _, _, gap = feed.subscribe(last_event_id=99)         # id из прошлого запуска
+    assert gap
+    print(f"  [OK] подписчиков: {feed.subscribers}")
+
+
+def test_slow_client_dropped():
+    """Тест: переполненная очередь не блокирует publish — клиент получает resync"""
+    feed = Broadcaster(replay=10, client_queue=2)
+    stream = feed.stream(heartbeat=0.01)
+    assert next(stream).startswith("retry:")
+    fast = feed.subscribe()[0]
+    for i in range(3):
+        feed.publish("feedback", {"id": i})
+        fast.get(timeout=0)                                   # fast читает сразу
+    assert feed.dropped == 1 and feed.subscribers == 1       # остался только fast
+    rest = list(stream)
+    assert rest[-1].startswith("event: resync")
+
+
+class FakeClient:
+    def __init__(self, tables):
+        self.tables = tables
+        self.requests = 0
+
+    def table(self, name):
+        self.requests += 1
+        return FakeQuery(self.tables[name])
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+        self.desc = False
+
+    def select(self, columns):
+        return self
+
+    def gt(self, column, value):
+        self.rows = [r for r in self.rows if r["id"] > value]
+        return self
+
+    def order(self, column, desc=False):
+        self.desc = desc
+        return self
+
+    def limit(self, n):
+        self.rows = sorted(self.rows, key=lambda r: r["id"], reverse=self.desc)[:n]
+        return self
+
+    def execute(self):
+        return type("Result", (), {"data": self.rows})()
+
+
+def test_poller_publishes_new_rows():
+    """Тест: после водяного знака — только новые строки; отклонённый ответ — rejection"""
+    tables = {"conversations": [{"id": 1, "source": "llm"}], "feedback": []}
+    feed = Broadcaster()
+    sub = feed.subscribe()[0]
+    poller = FeedPoller(FakeClient(tables), feed)
+    assert poller.poll_once() == 0                            # старое не публикуется
+
+    tables["conversations"] += [{"id": 2, "source": "llm", "answer": "x" * 900},
+                                {"id": 3, "source": "rejected"}]
+    tables["feedback"].append({"id": 7, "rating": "like"})
+    assert poller.poll_once() == 3
+    events = [sub.get(timeout=0) for _ in range(3)]
+    assert [e.type for e in events] == ["conversation", "rejection", "feedback"]
+    assert len(events[0].data["answer"]) == 500
+    assert poller.poll_once() == 0
+
+
+if __name__ == "__main__":
+    test_fanout_and_replay()
+    test_slow_client_dropped()
+    test_poller_publishes_new_rows()
+    print("\n[SUCCESS] Все тесты пройдены")
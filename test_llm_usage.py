@@ -0,0 +1,148 @@
+"""
+Тестирование учёта токенов Claude (llm_usage.py, rag._generate)
+Test: токены из usage, стоимость, строки llm_usage, пачечная запись, токены отменённого потока
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import rag
+from llm_usage import UsageRecorder, cost_usd, format_cost, usage_from_response, usage_rows
+from rag import AnswerCancelled
+
+USAGE = SimpleNamespace(input_tokens=1200, output_tokens=300,
+                        cache_read_input_tokens=4000, cache_creation_input_tokens=None)
+
+
+def test_usage_and_cost():
+    """Тест: поля usage Anthropic → строка llm_usage со стоимостью и секциями"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Токены и стоимость вызова")
+    print("=" * 80)
+
+    row = usage_from_response(USAGE)
+    assert row == {"input_tokens": 1200, "output_tokens": 300,
+                   "cache_read_tokens": 4000, "cache_write_tokens": 0}
+    # Haiku 4.5: 1200·$1 + 300·$5 + 4000·$0.10 за миллион
+    assert cost_usd("claude-haiku-4-5-20251001", row) == 0.0031
+    assert cost_usd("unknown-model", row) == 0.0
+
+    meta = {"source": "llm", "sections": {"law": 5000, "history": 800},
+            "usage": [{"model": "claude-haiku-4-5-20251001", **row, "cancelled": False}]}
+    [usage] = usage_rows(42, meta)
+    assert usage["chat_id"] == 42 and usage["context_chars"] == 5800
+    assert usage["cost_usd"] == 0.0031 and usage["source"] == "llm"
+    assert usage_rows(42, {"source": "digest"}) == []
+    print(f"  [OK] cost=${usage['cost_usd']}")
+
+
+class FakeInsertClient:
+    def __init__(self, fail_after: int | None = None):
+        self.batches = []
+        self.fail_after = fail_after
+
+    def table(self, name):
+        return SimpleNamespace(insert=lambda rows: SimpleNamespace(execute=lambda: self._insert(rows)))
+
+    def _insert(self, rows):
+        if self.fail_after is not None and len(self.batches) >= self.fail_after:
+            raise RuntimeError("Supabase недоступен")
+        self.batches.append(list(rows))
+
+
+def test_recorder_batches_and_keeps_rows_on_error():
+    client = FakeInsertClient(fail_after=1)
+    recorder = UsageRecorder(client, batch_size=2)
+    recorder.record([{"n": i} for i in range(5)])
+    try:
+        recorder.flush()
+        raise AssertionError("ожидалась ошибка записи")
+    except RuntimeError:
+        pass
+    assert client.batches == [[{"n": 0}, {"n": 1}]] and recorder.written == 2
+
+    client.fail_after = None
+    assert recorder.flush() == 3
+    assert client.batches[1:] == [[{"n": 2}, {"n": 3}], [{"n": 4}]]
+    assert recorder.flush() == 0
+
+
+class FakeStream:
+    def __init__(self, parts):
+        self.parts = parts
+        self.current_message_snapshot = SimpleNamespace(usage=SimpleNamespace(input_tokens=900, output_tokens=1))
+
+    @property
+    def text_stream(self):
+        for part in self.parts:
+            self.current_message_snapshot.usage.output_tokens += 1
+            yield part
+
+
+class FakeAnthropic:
+    def __init__(self):
+        self.messages = SimpleNamespace(create=self.create, stream=self.stream)
+
+    def create(self, **params):
+        return SimpleNamespace(content=[SimpleNamespace(text="ответ")], usage=USAGE)
+
+    @contextmanager
+    def stream(self, **params):
+        yield FakeStream(["а", "б", "в"])
+
+
+def test_generate_records_usage_including_cancelled():
+    original = rag.anthropic_client
+    rag.anthropic_client = FakeAnthropic()
+    try:
+        usage = []
+        assert rag._generate([], [], None, usage) == "ответ"
+        assert usage[0]["input_tokens"] == 1200 and usage[0]["cancelled"] is False
+
+        assert rag._generate([], [], lambda: False, usage) == "абв"
+        assert usage[1]["output_tokens"] == 4 and usage[1]["cancelled"] is False
+
+        calls = iter([False, True])
+        try:
+            rag._generate([], [], lambda: next(calls), usage)
+            raise AssertionError("ожидалась отмена")
+        except AnswerCancelled:
+            pass
+        assert usage[2]["cancelled"] is True and usage[2]["input_tokens"] == 900
+
+        def broken():
+            raise RuntimeError("обрыв потока")
+        try:
+            rag._generate([], [], broken, usage)
+            raise AssertionError("ожидалась ошибка")
+        except RuntimeError:
+            pass
+        assert usage[3]["cancelled"] is False          # ошибка — не отмена пользователем
+    finally:
+        rag.anthropic_client = original
+
+
+def test_format_cost():
+    report = {
+        "days": 7,
+        "totals": {"calls": 3, "cancelled": 1, "input_tokens": 10, "output_tokens": 5,
+                   "cache_read_tokens": 100, "cache_write_tokens": 0, "cost_usd": 1.5},
+        "daily": [{"day": "2026-03-01", "cost_usd": "1.5", "calls": 3, "avg_context_chars": 6000}],
+        "top_chats": [{"chat_id": 42, "username": "ivan", "cost_usd": "1.5", "calls": 3,
+                       "max_context_chars": 9000}],
+        "sections": [{"section": "law", "avg_chars": 5000, "max_chars": 8000}],
+    }
+    text = format_cost(report)
+    assert "$1.50" in text and "42 @ivan" in text and "law: 5000 / 8000" in text
+
+
+if __name__ == "__main__":
+    test_usage_and_cost()
+    test_recorder_batches_and_keeps_rows_on_error()
+    test_generate_records_usage_including_cancelled()
+    test_format_cost()
+    print("\n[SUCCESS] Все тесты пройдены")
@@ -0,0 +1,107 @@
+"""
+Тестирование склейки сообщений (message_coalescer.py)
+Test: серия → один вызов, предел ожидания, разные чаты, /clear, остановка
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from message_coalescer import MessageCoalescer, merge_texts
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, chat_id, text, payloads):
+        self.calls.append((chat_id, text, payloads))
+
+
+def test_merge_texts():
+    assert merge_texts(["Здравствуйте", " ", "срок оплаты?", "срок оплаты?"]) == \
+        "Здравствуйте\nсрок оплаты?"
+
+
+def test_burst_single_call():
+    """Тест: три быстрых сообщения — один вызов"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Серия сообщений → один вопрос")
+    print("=" * 80)
+
+    async def scenario():
+        rec = Recorder()
+        c = MessageCoalescer(rec, window=0.05, max_wait=1)
+        for part in ["Здравствуйте", "по omarket", "какой срок оплаты?"]:
+            await c.submit(1, part, part)
+            await asyncio.sleep(0.01)
+        await c.submit(2, "другой чат", "x")
+        assert rec.calls == []
+        await asyncio.sleep(0.15)
+        return rec.calls
+
+    calls = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert calls[0] == (1, "Здравствуйте\nпо omarket\nкакой срок оплаты?",
+                        ["Здравствуйте", "по omarket", "какой срок оплаты?"])
+    assert calls[1][:2] == (2, "другой чат")
+    print("  [OK]")
+
+
+def test_max_wait_and_limits():
+    """Тест: непрерывный поток не ждёт дольше max_wait; max_parts — сразу"""
+    async def scenario():
+        rec = Recorder()
+        c = MessageCoalescer(rec, window=0.05, max_wait=0.12, max_parts=100)
+        for i in range(10):
+            await c.submit(1, f"часть {i}")
+            await asyncio.sleep(0.03)
+        await asyncio.sleep(0.1)
+        streamed = len(rec.calls)
+
+        rec2 = Recorder()
+        c2 = MessageCoalescer(rec2, window=10, max_parts=3)
+        for i in range(3):
+            await c2.submit(1, f"часть {i}")
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return streamed, rec2.calls
+
+    streamed, immediate = asyncio.run(scenario())
+    assert 2 <= streamed <= 4
+    assert len(immediate) == 1 and immediate[0][1] == "часть 0\nчасть 1\nчасть 2"
+
+
+def test_discard_and_stop():
+    async def scenario():
+        rec = Recorder()
+        c = MessageCoalescer(rec, window=10)
+        await c.submit(1, "будет сброшено")
+        assert c.discard(1) and len(c) == 0
+        await c.submit(2, "ответим при остановке")
+        await c.stop()
+        return rec.calls
+
+    calls = asyncio.run(scenario())
+    assert [(chat, text) for chat, text, _ in calls] == [(2, "ответим при остановке")]
+
+
+def test_disabled():
+    async def scenario():
+        rec = Recorder()
+        c = MessageCoalescer(rec, window=0)
+        await c.submit(1, "сразу")
+        return rec.calls
+
+    assert len(asyncio.run(scenario())) == 1
+
+
+if __name__ == "__main__":
+    test_merge_texts()
+    test_burst_single_call()
+    test_max_wait_and_limits()
+    test_discard_and_stop()
+    test_disabled()
+    print("\n[SUCCESS] Все тесты пройдены")
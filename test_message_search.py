@@ -0,0 +1,64 @@
+"""
+Тестирование полнотекстового поиска по переписке (admin_views.search_messages)
+Test: параметры RPC, курсор (ранг, id) для следующей страницы, экранирование сниппетов
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from admin_views import search_messages
+from keyset_pagination import decode_cursor
+
+
+class FakeClient:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        return self
+
+    def execute(self):
+        return type("Result", (), {"data": [dict(r) for r in self.rows]})()
+
+
+ROWS = [{"id": 10 - i, "chat_id": 1, "rank": 0.5 - i * 0.1,
+         "question_snippet": "Что такое \x02демпинг\x03? <script>x</script> <mark>",
+         "answer_snippet": "\x02Демпинг\x03 — цена ниже"} for i in range(3)]
+
+
+def test_search_page_and_cursor():
+    """Тест: limit+1 в RPC, next_cursor из последней строки страницы"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Поиск по переписке")
+    print("=" * 80)
+
+    client = FakeClient(ROWS)
+    page = search_messages(client, "демпинг", chat_id=1, limit=2)
+    name, params = client.calls[0]
+    assert name == "search_conversations" and params["p_limit"] == 3 and params["p_chat_id"] == 1
+    assert [r["id"] for r in page["results"]] == [10, 9]
+    assert decode_cursor(page["next_cursor"]) == (0.4, 9)
+
+    client = FakeClient(ROWS[2:])
+    last = search_messages(client, "демпинг", cursor=page["next_cursor"], limit=2)
+    params = client.calls[0][1]
+    assert (params["p_after_rank"], params["p_after_id"]) == (0.4, 9)
+    assert last["next_cursor"] is None
+    print("  [OK] две страницы")
+
+
+def test_snippet_escaped():
+    snippet = search_messages(FakeClient(ROWS[:1]), "демпинг")["results"][0]["question_snippet"]
+    assert "<mark>демпинг</mark>" in snippet and "<script>" not in snippet
+    # «<mark>» из текста самого вопроса — не подсветка
+    assert snippet.endswith("&lt;mark&gt;") and snippet.count("<mark>") == 1
+
+
+if __name__ == "__main__":
+    test_search_page_and_cursor()
+    test_snippet_escaped()
+    print("\n[SUCCESS] Все тесты пройдены")
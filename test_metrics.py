@@ -0,0 +1,115 @@
+"""
+Тестирование метрик Prometheus (metrics.py)
+Test: формат counter/gauge/histogram с метками, callback-метрики, задержка Supabase RPC, lag event loop
+"""
+
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import metrics
+from metrics import Registry, callback, counter, gauge, histogram, instrument_rpc
+
+
+def test_exposition_format():
+    """Тест: текстовый формат 0.0.4 — HELP/TYPE, метки, накопительные бакеты"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Формат /metrics")
+    print("=" * 80)
+
+    registry = Registry()
+    rejections = counter("rejections_total", "Rejected answers.", ["reason_code"], registry=registry)
+    rejections.labels(reason_code="LOW_CONFIDENCE").inc()
+    rejections.labels(reason_code="LOW_CONFIDENCE").inc(2)
+    queue = gauge("queue_depth", "Queued.", registry=registry)
+    queue.set(4)
+    latency = histogram("rpc_seconds", "RPC latency.", ["rpc"], buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.labels(rpc="search_chunks").observe(value)
+    callback("lookups_total", "Lookups.", "counter", lambda: {("faq", "hit"): 7},
+             labels=["cache", "result"], registry=registry)
+    callback("rss_bytes", "RSS.", "gauge", lambda: 1024, registry=registry)
+
+    text = registry.render()
+    print(text)
+    assert "# TYPE rejections_total counter" in text
+    assert 'rejections_total{reason_code="LOW_CONFIDENCE"} 3' in text
+    assert "queue_depth 4" in text
+    # Граница бакета включительно (le): 0.05 и 0.1 — в le="0.1"
+    assert 'rpc_seconds_bucket{rpc="search_chunks",le="0.1"} 2' in text
+    assert 'rpc_seconds_bucket{rpc="search_chunks",le="1"} 3' in text
+    assert 'rpc_seconds_bucket{rpc="search_chunks",le="+Inf"} 4' in text
+    assert 'rpc_seconds_count{rpc="search_chunks"} 4' in text
+    assert 'lookups_total{cache="faq",result="hit"} 7' in text
+    assert "rss_bytes 1024" in text
+    assert text.endswith("\n")
+
+    # Повторная регистрация возвращает ту же метрику, а не сбрасывает её
+    assert counter("rejections_total", "Rejected answers.", ["reason_code"], registry=registry) is rejections
+
+
+def test_label_escaping_and_missing_labels():
+    registry = Registry()
+    errors = counter("errors_total", "Errors.", ["message"], registry=registry)
+    errors.labels(message='bad "quote"\n').inc()
+    assert r'errors_total{message="bad \"quote\"\n"} 1' in registry.render()
+    try:
+        errors.inc()
+        raise AssertionError("ожидалась ошибка: метка не задана")
+    except ValueError:
+        pass
+
+
+def test_instrument_rpc():
+    class FakeClient:
+        def rpc(self, name, params):
+            def execute():
+                if params.get("fail"):
+                    raise RuntimeError("timeout")
+                return SimpleNamespace(data=[name])
+            return SimpleNamespace(execute=execute, params=params)
+
+        def table(self, name):
+            return f"table:{name}"
+
+    client = instrument_rpc(FakeClient())
+    assert client.table("users") == "table:users"
+    assert client.rpc("faq_add_hits", {}).execute().data == ["faq_add_hits"]
+    try:
+        client.rpc("faq_add_hits", {"fail": True}).execute()
+        raise AssertionError("ожидалась ошибка RPC")
+    except RuntimeError:
+        pass
+
+    text = metrics.REGISTRY.render()
+    assert 'supabase_rpc_errors_total{rpc="faq_add_hits"}' in text
+    assert 'supabase_rpc_duration_seconds_count{rpc="faq_add_hits"}' in text
+    assert "process_resident_memory_bytes" in text
+
+
+def test_loop_lag_monitor():
+    async def scenario():
+        monitor = metrics.LoopLagMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.05)                      # блокируем loop — таймер проснётся позже
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+
+    lag = metrics.EVENT_LOOP_LAG.labels()
+    slow = lambda: sum(lag.counts[lag.buckets.index(0.01) + 1:])     # замеры дольше 10 мс
+    slow_before = slow()
+    asyncio.run(scenario())
+    assert slow() > slow_before
+
+
+if __name__ == "__main__":
+    test_exposition_format()
+    test_label_escaping_and_missing_labels()
+    test_instrument_rpc()
+    test_loop_lag_monitor()
+    print("\n[SUCCESS] Все тесты пройдены")
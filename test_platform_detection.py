@@ -39,7 +39,7 @@ for question, expected, reason in test_questions:
     if detected != expected:
         ambiguous_count += 1
     print(f"{status} {question}")
-    print(f"    Expected: {expected:10s} Got: {detected}")
+    print(f"    Expected: {str(expected):10s} Got: {detected}")
 
 print(f"\n{'='*70}")
 print(f"RESULT: {ambiguous_count} ambiguous/uncertain detections")
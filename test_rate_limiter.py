@@ -0,0 +1,94 @@
+"""
+Тестирование ограничения частоты сообщений (rate_limiter.py)
+Test: GCRA со всплеском и паузой, тарифы, очистка неактивных чатов, общее хранилище
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rate_limiter import RateLimiter, RateTier
+from state_backend import SQLiteStateBackend
+
+TIERS = {
+    "admin":   RateTier("admin", None),
+    "trusted": RateTier("trusted", 20, 60, 0),
+    "default": RateTier("default", 5, 60, 300),
+}
+
+
+def test_burst_and_cooldown():
+    """Тест: 5 сообщений подряд, затем пауза 300 сек"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Всплеск и пауза (default)")
+    print("=" * 80)
+
+    limiter = RateLimiter(TIERS)
+    decisions = [limiter.check(1, now=1000 + i) for i in range(6)]
+    assert [d.allowed for d in decisions] == [True] * 5 + [False]
+    assert decisions[-1].cooldown and decisions[-1].retry_after == 300
+
+    # Во время паузы отказ с оставшимся временем
+    d = limiter.check(1, now=1100)
+    assert not d.allowed and d.retry_after == 205
+    # После паузы снова можно писать
+    assert limiter.check(1, now=1306).allowed
+    print("  [OK]")
+
+
+def test_gcra_without_cooldown():
+    """Тест: без паузы — одно сообщение каждые window/limit секунд"""
+    limiter = RateLimiter(TIERS)
+    for i in range(20):
+        assert limiter.check(2, "trusted", now=0).allowed
+    d = limiter.check(2, "trusted", now=0)
+    assert not d.allowed and d.retry_after == 3.0   # 60 / 20
+    assert limiter.check(2, "trusted", now=3.0).allowed
+    assert not limiter.check(2, "trusted", now=3.5).allowed
+
+
+def test_admin_unlimited():
+    limiter = RateLimiter(TIERS)
+    assert all(limiter.check(3, "admin", now=0).allowed for _ in range(1000))
+    assert len(limiter) == 0
+
+
+def test_idle_eviction():
+    """Тест: память ограничена активными чатами"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 2: Очистка неактивных чатов")
+    print("=" * 80)
+
+    limiter = RateLimiter(TIERS)
+    for chat_id in range(100_000):
+        limiter.check(chat_id, now=10_000 + chat_id / 1000)
+    print(f"  После 100 000 чатов за 100 сек: {len(limiter)} записей")
+    assert len(limiter) <= 15 * 1000    # в окне 12 сек × 1000 чатов/сек
+
+    limiter.check("late", now=20_000)
+    assert len(limiter) == 1
+    print("  [OK]")
+
+
+def test_shared_store():
+    """Тест: два лимитера на одном SQLite делят лимит"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteStateBackend(os.path.join(tmp, "state.sqlite3"))
+        a, b = RateLimiter(TIERS, store=store), RateLimiter(TIERS, store=store)
+        results = [(a if i % 2 else b).check(7, now=500 + i).allowed for i in range(6)]
+        assert results == [True] * 5 + [False]
+        assert not a.check(7, now=600).allowed
+        a.reset(7)
+        assert b.check(7, now=600).allowed
+        store.close()
+
+
+if __name__ == "__main__":
+    test_burst_and_cooldown()
+    test_gcra_without_cooldown()
+    test_admin_unlimited()
+    test_idle_eviction()
+    test_shared_store()
+    print("\n[SUCCESS] Все тесты пройдены")
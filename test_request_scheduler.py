@@ -0,0 +1,109 @@
+"""
+Тестирование планировщика запросов (request_scheduler.py)
+Test: приоритеты, резерв слотов, round-robin по чатам, отмена ожидания, метрики
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from request_scheduler import Priority, RequestScheduler
+
+
+async def _job(scheduler, priority, chat_id, order, hold=0.01):
+    async with scheduler.slot(priority, chat_id):
+        order.append((priority.name, chat_id))
+        await asyncio.sleep(hold)
+
+
+def test_priority_order():
+    """Тест: при занятом слоте первым обслуживается более важный класс"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Приоритеты")
+    print("=" * 80)
+
+    async def scenario():
+        s = RequestScheduler(workers=1, reserved=0)
+        order = []
+        first = asyncio.create_task(_job(s, Priority.QUESTION, 1, order, hold=0.02))
+        await asyncio.sleep(0)
+        jobs = [
+            _job(s, Priority.CLARIFICATION, 2, order),
+            _job(s, Priority.QUESTION, 3, order),
+            _job(s, Priority.CACHED, 4, order),
+            _job(s, Priority.ADMIN, 5, order),
+        ]
+        tasks = [asyncio.create_task(j) for j in jobs]
+        await asyncio.sleep(0)
+        assert s.snapshot()["queued"] == 4
+        await asyncio.gather(first, *tasks)
+        return order, s.snapshot()
+
+    order, snap = asyncio.run(scenario())
+    assert [p for p, _ in order] == ["QUESTION", "ADMIN", "CACHED", "QUESTION", "CLARIFICATION"]
+    assert snap["busy"] == 0 and snap["queued"] == 0
+    assert snap["classes"]["clarification"]["wait_max"] > snap["classes"]["admin"]["wait_max"]
+    print("  [OK]")
+
+
+def test_reserved_slot():
+    """Тест: генерации не занимают резерв — admin проходит без ожидания"""
+    async def scenario():
+        s = RequestScheduler(workers=2, reserved=1)
+        order = []
+        questions = [asyncio.create_task(_job(s, Priority.QUESTION, i, order, hold=0.05))
+                     for i in range(3)]
+        await asyncio.sleep(0)
+        assert s.snapshot()["busy"] == 1       # вторая генерация ждёт, резерв свободен
+        await _job(s, Priority.ADMIN, 0, order, hold=0)
+        assert order[1] == ("ADMIN", 0)
+        await asyncio.gather(*questions)
+        return s.snapshot()
+
+    snap = asyncio.run(scenario())
+    assert snap["classes"]["admin"]["wait_max"] < 0.01
+    assert snap["classes"]["question"]["served"] == 3
+
+
+def test_round_robin_by_chat():
+    """Тест: чат с пятью вопросами не блокирует остальных"""
+    async def scenario():
+        s = RequestScheduler(workers=1, reserved=0)
+        order = []
+        blocker = asyncio.create_task(_job(s, Priority.QUESTION, 0, order))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(_job(s, Priority.QUESTION, 1, order)) for _ in range(5)]
+        tasks += [asyncio.create_task(_job(s, Priority.QUESTION, 2, order))]
+        await asyncio.gather(blocker, *tasks)
+        return [chat for _, chat in order]
+
+    assert asyncio.run(scenario())[:4] == [0, 1, 2, 1]
+
+
+def test_cancelled_waiter():
+    async def scenario():
+        s = RequestScheduler(workers=1, reserved=0)
+        order = []
+        blocker = asyncio.create_task(_job(s, Priority.QUESTION, 0, order, hold=0.02))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(_job(s, Priority.QUESTION, 1, order))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await blocker
+        await asyncio.gather(waiting, return_exceptions=True)
+        await _job(s, Priority.QUESTION, 2, order)
+        return order, s.snapshot()
+
+    order, snap = asyncio.run(scenario())
+    assert [chat for _, chat in order] == [0, 2]
+    assert snap["busy"] == 0 and snap["classes"]["question"]["abandoned"] == 1
+
+
+if __name__ == "__main__":
+    test_priority_order()
+    test_reserved_slot()
+    test_round_robin_by_chat()
+    test_cancelled_waiter()
+    print("\n[SUCCESS] Все тесты пройдены")
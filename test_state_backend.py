@@ -0,0 +1,129 @@
+"""
+Тестирование общего состояния бота (state_backend.py)
+Test: одинаковая семантика Memory/SQLite, атомарные обновления между процессами
+"""
+
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from conversation_context import ConversationContext
+from state_backend import MemoryStateBackend, SQLiteStateBackend, StateBackend
+
+
+def _check_backend(state):
+    # ключ-значение, TTL и атомарный pop
+    state.set("pending_dislike", 42, {"question": "q", "answer": "a", "message_id": 7})
+    assert state.get("pending_dislike", 42)["message_id"] == 7
+    assert state.pop("pending_dislike", 42)["answer"] == "a"
+    assert state.pop("pending_dislike", 42) is None
+    state.set("clarification", 1, {"question": "x"}, ttl=0.05)
+    time.sleep(0.1)
+    assert state.get("clarification", 1) is None
+
+    # множества
+    assert state.add_member("registered", 5) is True
+    assert state.add_member("registered", 5) is False
+    state.replace_members("banned", [1, 2, 3])
+    state.remove_member("banned", 2)
+    assert state.has_member("banned", 1) and not state.has_member("banned", 2)
+    assert state.count_members("banned") == 2
+
+    # атомарное обновление: счётчик, результат fn и удаление значением None
+    def incr(value):
+        value = (value or 0) + 1
+        return value, value * 10
+    assert [state.atomic_update("counter", "c1", incr) for _ in range(3)] == [10, 20, 30]
+    assert state.get("counter", "c1") == 3
+    assert state.atomic_update("counter", "c1", lambda v: (None, v)) == 3
+    assert state.get("counter", "c1") is None
+
+    # история обрезается до последних max_items
+    for i in range(4):
+        state.append_history(9, [{"role": "user", "content": f"q{i}"},
+                                 {"role": "assistant", "content": f"a{i}"}], max_items=4)
+    assert [m["content"] for m in state.get_history(9)] == ["q2", "a2", "q3", "a3"]
+    state.clear_history(9)
+    assert state.get_history(9) == []
+
+
+def _json_roundtrip(value):
+    state = MemoryStateBackend()
+    state.set("dialog", 42, value)
+    return state.get("dialog", 42)
+
+
+def test_memory_backend():
+    """Тест: MemoryStateBackend"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: MemoryStateBackend")
+    print("=" * 80)
+    _check_backend(MemoryStateBackend())
+
+    # Интерфейс абстрактный: бэкенд без всех методов не создаётся
+    class Partial(StateBackend):
+        def get(self, ns, key, default=None):
+            return default
+    for cls in (StateBackend, Partial):
+        try:
+            cls()
+            raise AssertionError(f"{cls.__name__} не должен создаваться")
+        except TypeError:
+            pass
+    print("  [OK]")
+
+
+def test_sqlite_backend():
+    """Тест: SQLiteStateBackend (та же семантика)"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 2: SQLiteStateBackend")
+    print("=" * 80)
+    with tempfile.TemporaryDirectory() as tmp:
+        state = SQLiteStateBackend(os.path.join(tmp, "state.sqlite3"))
+        _check_backend(state)
+        state.close()
+    print("  [OK]")
+
+
+def _incr_many(path: str) -> int:
+    state = SQLiteStateBackend(path)
+    for _ in range(50):
+        state.atomic_update("counter", "shared", lambda v: ((v or 0) + 1, None))
+    state.close()
+    return 50
+
+
+def test_sqlite_atomic_across_processes():
+    """Тест: 4 процесса × 50 инкрементов — ни одно обновление не потеряно"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 3: atomic_update в нескольких процессах")
+    print("=" * 80)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "state.sqlite3")
+        SQLiteStateBackend(path).close()
+        with Pool(4) as pool:
+            total = sum(pool.map(_incr_many, [path] * 4))
+        value = SQLiteStateBackend(path).get("counter", "shared")
+    print(f"  Счётчик: {value} из {total}")
+    assert value == total
+
+
+def test_conversation_context_roundtrip():
+    """Тест: контекст диалога сериализуется в JSON и обратно"""
+    ctx = ConversationContext(42)
+    ctx.update_context("Как работать в omarket?", "omarket", "platform", 0.9)
+    restored = ConversationContext.from_dict(_json_roundtrip(ctx.to_dict()))
+    assert restored.get_assumed_platform() == "omarket"
+    assert restored.conversation_history[0]["question"] == "Как работать в omarket?"
+
+
+if __name__ == "__main__":
+    test_memory_backend()
+    test_sqlite_backend()
+    test_sqlite_atomic_across_processes()
+    test_conversation_context_roundtrip()
+    print("\n[SUCCESS] Все тесты пройдены")
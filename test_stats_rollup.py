@@ -0,0 +1,80 @@
+"""
+Тестирование сводной статистики (stats_rollup.py)
+Test: /stats читает одну строку stats_summary, пустая сводка — нули, путь ответа из answer_question
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stats_rollup import SUMMARY_FIELDS, fetch_summary, format_summary
+
+
+class FakeClient:
+    """Запоминает запрошенные таблицы; отдаёт rows на любой select."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.tables = []
+
+    def table(self, name):
+        self.tables.append(name)
+        return self
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def execute(self):
+        return type("Result", (), {"data": self.rows})()
+
+
+def test_summary_single_query():
+    """Тест: сводка — один запрос к stats_summary, числа приводятся к int"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Сводка из stats_summary")
+    print("=" * 80)
+
+    client = FakeClient([{
+        "users_total": 12, "messages_total": "340", "messages_today": 7, "digest_total": 3,
+        "ktru_total": 40, "likes_total": 20, "dislikes_total": 5, "feedback_total": 25,
+        "rejections_total": 9, "rejections_today": 1, "banned": 2,
+        "refreshed_at": "2026-10-19T10:00:00+00:00",
+    }])
+    summary = fetch_summary(client)
+    assert client.tables == ["stats_summary"]
+    assert summary["messages_total"] == 340 and summary["banned"] == 2
+    text = format_summary(summary)
+    assert "Пользователей: 12" in text and "👍 20 / 👎 5" in text
+    print(text)
+
+
+def test_empty_summary():
+    summary = fetch_summary(FakeClient([]))
+    assert all(summary[f] == 0 for f in SUMMARY_FIELDS)
+    assert summary["refreshed_at"] is None
+
+
+def test_answer_source_reported():
+    """Тест: answer_question пишет путь ответа в meta (conversations.source)"""
+    import rag
+    from rag import Retrieval
+
+    original = rag.retrieve
+    rag.retrieve = lambda question, should_cancel=None: Retrieval()
+    try:
+        meta = {}
+        rag.answer_question("вопрос", [], meta=meta)
+        assert meta["source"] == "empty"
+    finally:
+        rag.retrieve = original
+
+
+if __name__ == "__main__":
+    test_summary_single_query()
+    test_empty_summary()
+    test_answer_source_reported()
+    print("\n[SUCCESS] Все тесты пройдены")
@@ -0,0 +1,115 @@
+"""
+Тестирование рендерера Markdown → Telegram HTML (telegram_html.py)
+Test: примеры разметки и свойства разбиения на случайных текстах
+"""
+
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram_html import html_to_text, md_to_html, render_parts
+
+ALLOWED_TAGS = {"a", "b", "i", "code"}
+ENTITY_RE = re.compile(r"&(?!(?:amp|lt|gt|quot|#x27|#\d+);)")
+TAG_RE = re.compile(r"<(/?)([a-z]+)[^>]*>")
+
+WORDS = ["закупка", "Статья", "п.", "12", "<тег>", "A&B", "демпинг", "Закон", "x_y", "5*3"]
+
+
+def _well_formed(part: str) -> bool:
+    stack = []
+    for m in TAG_RE.finditer(part):
+        closing, name = m.groups()
+        if name not in ALLOWED_TAGS:
+            return False
+        if closing:
+            if not stack or stack.pop() != name:
+                return False
+        else:
+            stack.append(name)
+    return not stack
+
+
+def _random_markdown(rng: random.Random) -> str:
+    out = []
+    for _ in range(rng.randint(1, 400)):
+        r = rng.random()
+        word = rng.choice(WORDS)
+        if r < 0.1:
+            out.append(f"**{word} {rng.choice(WORDS)}**")
+        elif r < 0.15:
+            out.append(f"*{word}*")
+        elif r < 0.2:
+            out.append(f"`{word}`")
+        elif r < 0.25:
+            out.append(f"[{word}](https://adilet.zan.kz/rus/docs/Z2400000106#z{rng.randint(1, 999)})")
+        elif r < 0.3:
+            out.append(word + ".")
+        elif r < 0.33:
+            out.append("\n")
+        elif r < 0.35:
+            out.append("\n\n")
+        else:
+            out.append(word)
+    return " ".join(out)
+
+
+def test_render_examples():
+    """Тест: базовые конструкции"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Примеры разметки")
+    print("=" * 80)
+
+    assert md_to_html("**Статья 5** и *курсив*") == "<b>Статья 5</b> и <i>курсив</i>"
+    assert md_to_html("[Закон](https://adilet.zan.kz/rus/docs/Z2400000106#z5)") == (
+        '<a href="https://adilet.zan.kz/rus/docs/Z2400000106#z5">Закон</a>'
+    )
+    assert md_to_html("`a<b>` & _текст_") == "<code>a&lt;b&gt;</code> &amp; <i>текст</i>"
+    assert md_to_html("**жирный с *курсивом* внутри**") == "<b>жирный с <i>курсивом</i> внутри</b>"
+    assert md_to_html("snake_case_name") == "snake_case_name"
+    # Незакрытая разметка остаётся текстом
+    assert md_to_html("**не закрыто\nдальше**") == "**не закрыто\nдальше**"
+    print("  [OK]")
+
+
+def test_split_properties():
+    """Тест: каждая часть <= лимита, валидный HTML, текст не теряется"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 2: Свойства разбиения (случайные тексты)")
+    print("=" * 80)
+
+    rng = random.Random(33)
+    for n in range(400):
+        text = _random_markdown(rng)
+        limit = rng.choice([160, 300, 700, 4096])
+        parts = render_parts(text, limit)
+        for part in parts:
+            assert len(part) <= limit, (n, len(part), limit)
+            assert _well_formed(part), (n, part)
+            assert not ENTITY_RE.search(part), (n, part)
+        joined = "".join(html_to_text(p) for p in parts)
+        expected = html_to_text(md_to_html(text))
+        assert re.sub(r"\s+", "", joined) == re.sub(r"\s+", "", expected), n
+    print("  [OK] 400 случайных текстов")
+
+
+def test_split_prefers_paragraphs():
+    """Тест: длинный ответ режется по абзацам, а не посреди ссылки"""
+    paragraph = "**Статья 10.** Заказчик размещает [объявление](https://goszakup.gov.kz). " * 20
+    text = "\n\n".join([paragraph] * 6)
+    parts = render_parts(text)
+    assert len(parts) > 1
+    for part in parts:
+        assert len(part) <= 4096 and _well_formed(part)
+        assert part.startswith("<b>Статья 10.</b>")
+    print(f"  [OK] {len(parts)} частей по границам абзацев")
+
+
+if __name__ == "__main__":
+    test_render_examples()
+    test_split_properties()
+    test_split_prefers_paragraphs()
+    print("\n[SUCCESS] Все тесты пройдены")
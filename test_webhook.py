@@ -0,0 +1,101 @@
+"""
+Тестирование webhook-режима (webhook.py, async_http.py)
+Test: проверка secret token, постановка обновлений в очередь, /healthz и /readyz
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram.ext import Application
+
+from webhook import WebhookServer
+
+SECRET = "test_secret-123"
+
+UPDATE = {
+    "update_id": 1001,
+    "message": {
+        "message_id": 5,
+        "date": 1700000000,
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "Тест"},
+        "text": "Что такое демпинг?",
+    },
+}
+
+
+async def _request(port, method, path, body=b"", headers=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost", "Connection: close",
+             f"Content-Length: {len(body)}"]
+    lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), payload
+
+
+async def _scenario():
+    app = Application.builder().token("123456:TEST").build()
+    server = WebhookServer(app, url="https://bot.example.com", secret=SECRET, port=0)
+    await server.http.start()
+    port = server.http.port
+    body = json.dumps(UPDATE).encode()
+    try:
+        status, _ = await _request(port, "POST", "/telegram", body,
+                                   {"X-Telegram-Bot-Api-Secret-Token": "wrong"})
+        assert status == 403
+        assert app.update_queue.qsize() == 0
+
+        status, _ = await _request(port, "POST", "/telegram", body,
+                                   {"X-Telegram-Bot-Api-Secret-Token": SECRET})
+        assert status == 200
+        update = app.update_queue.get_nowait()
+        assert update.update_id == 1001 and update.message.text == "Что такое демпинг?"
+
+        status, _ = await _request(port, "POST", "/telegram", b"{not json",
+                                   {"X-Telegram-Bot-Api-Secret-Token": SECRET})
+        assert status == 400
+
+        assert (await _request(port, "GET", "/healthz"))[0] == 200
+        # Приложение не запущено — реплика не готова
+        status, payload = await _request(port, "GET", "/readyz")
+        assert status == 503 and json.loads(payload)["ready"] is False
+
+        assert (await _request(port, "GET", "/telegram"))[0] == 405
+        assert (await _request(port, "GET", "/nope"))[0] == 404
+    finally:
+        await server.http.stop()
+
+
+def test_webhook_endpoints():
+    """Тест: эндпоинты встроенного сервера"""
+    print("\n" + "=" * 80)
+    print("ТЕСТ 1: Webhook-сервер")
+    print("=" * 80)
+    asyncio.run(_scenario())
+    print("  [OK] 403 / 200 / 400 / healthz / readyz / 405 / 404")
+
+
+def test_secret_validation():
+    """Тест: недопустимый WEBHOOK_SECRET отклоняется при запуске"""
+    app = Application.builder().token("123456:TEST").build()
+    for bad in ("", "пробел есть", "x" * 257):
+        try:
+            WebhookServer(app, url="https://bot.example.com", secret=bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"секрет {bad!r} принят")
+    print("  [OK] некорректные секреты отклонены")
+
+
+if __name__ == "__main__":
+    test_webhook_endpoints()
+    test_secret_validation()
+    print("\n[SUCCESS] Все тесты пройдены")
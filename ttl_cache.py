@@ -0,0 +1,76 @@
+"""
+ttl_cache.py — Небольшой потокобезопасный кэш с временем жизни записей.
+
+Используется Flask-панелью (admin_panel.py) для дорогих, но не критичных к
+свежести значений — например, числа сообщений для пагинации: COUNT(*) по
+conversations на каждый запрос страницы стоит дороже самой страницы.
+
+    counts = TTLCache(ttl=30)
+    total = counts.get_or_set(("conversations", chat_id), lambda: count_rows(...))
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+_MISSING = object()
+
+
+class TTLCache:
+    """LRU-словарь с истечением по времени. Значение None тоже кэшируется."""
+
+    def __init__(self, ttl: float, maxsize: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self._data: OrderedDict = OrderedDict()   # key → (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= self.clock():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        with self._lock:
+            self._data[key] = (self.clock() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any], ttl: float | None = None) -> Any:
+        """
+        Значение из кэша или compute(). compute вызывается без блокировки:
+        при одновременном промахе значение может посчитаться дважды — для
+        счётчиков это дешевле, чем держать блокировку на время запроса к БД.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, predicate: Callable[[Hashable], bool] | None = None) -> int:
+        """Удаляет все записи (или только ключи, для которых predicate(key) истинно)."""
+        with self._lock:
+            if predicate is None:
+                removed = len(self._data)
+                self._data.clear()
+                return removed
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
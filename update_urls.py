@@ -6,14 +6,19 @@ Logika yakorey na adilet.zan.kz:
   Zakon:      #st{N}  -- uzhe est
   Pravila:    #p{N}   -- pervyy punkt diapazona, naprimer #p3, #p212
   Prilozhenie: bez yakoryay, bazovyy URL
+
+Zapusk:
+    python update_urls.py --dry-run   # tolko diff s Supabase, nichego ne pishet
+    python update_urls.py             # JSON + odin bulk update v Supabase
 """
 
+import argparse
 import json
 import os
-import urllib.request
-import urllib.error
 from dotenv import load_dotenv
 
+from supabase_bulk import SupabaseBulkError, bulk_update_chunks, diff_column, fetch_chunk_columns, print_diff
+
 load_dotenv()
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -38,7 +43,7 @@ def build_pravila_url(chunk):
     return PRAVILA_BASE
 
 
-def update_json_file():
+def update_json_file(write=True):
     with open(CHUNKS_PATH, encoding="utf-8") as f:
         chunks = json.load(f)
 
@@ -50,61 +55,44 @@ def update_json_file():
                 chunk["official_url"] = new_url
                 updated += 1
 
-    with open(CHUNKS_PATH, "w", encoding="utf-8") as f:
-        json.dump(chunks, f, ensure_ascii=False, indent=2)
-
-    print(f"[OK] JSON updated: {updated} Pravila chunks got anchor URLs")
+    if write:
+        with open(CHUNKS_PATH, "w", encoding="utf-8") as f:
+            json.dump(chunks, f, ensure_ascii=False, indent=2)
+        print(f"[OK] JSON updated: {updated} Pravila chunks got anchor URLs")
+    else:
+        print(f"[DRY-RUN] JSON: {updated} Pravila chunks would get anchor URLs")
     return chunks
 
 
-def update_supabase(chunks):
-    supabase_url = os.environ.get("SUPABASE_URL")
-    supabase_key = os.environ.get("SUPABASE_KEY")
+def update_supabase(chunks, dry_run=False):
+    rules_chunks = [c for c in chunks if c.get("source_type") == "rules"]
+    print(f"\nComparing {len(rules_chunks)} Pravila chunks with Supabase...")
 
-    if not supabase_url or not supabase_key:
-        print("[ERR] Missing SUPABASE_URL or SUPABASE_KEY in .env")
+    try:
+        current = fetch_chunk_columns(("id", "official_url"))
+    except SupabaseBulkError as e:
+        print(f"[ERR] {e}")
         return
 
-    rules_chunks = [c for c in chunks if c.get("source_type") == "rules"]
-    print(f"\nUpdating {len(rules_chunks)} Pravila chunks in Supabase...")
-
-    ok = 0
-    errors = 0
-
-    for chunk in rules_chunks:
-        chunk_id = chunk["id"]
-        new_url = chunk["official_url"]
-
-        payload = json.dumps({"official_url": new_url}).encode("utf-8")
-        req = urllib.request.Request(
-            f"{supabase_url}/rest/v1/chunks?id=eq.{chunk_id}",
-            data=payload,
-            method="PATCH",
-            headers={
-                "Content-Type": "application/json",
-                "apikey": supabase_key,
-                "Authorization": f"Bearer {supabase_key}",
-                "Prefer": "return=minimal",
-            },
-        )
-        try:
-            with urllib.request.urlopen(req) as resp:
-                if resp.status in (200, 204):
-                    ok += 1
-                else:
-                    print(f"  [WARN] [{chunk_id}] status {resp.status}")
-                    errors += 1
-        except urllib.error.HTTPError as e:
-            print(f"  [ERR] [{chunk_id}] HTTP {e.code}: {e.read().decode()[:120]}")
-            errors += 1
-        except Exception as e:
-            print(f"  [ERR] [{chunk_id}] {e}")
-            errors += 1
+    changes = [ch for ch in diff_column(rules_chunks, current, "official_url")
+               if ch["id"] in current]
+    print_diff(changes, "official_url")
+
+    if dry_run:
+        print("[DRY-RUN] Supabase not modified")
+        return
+    if not changes:
+        print("[OK] Supabase already up to date")
+        return
+
+    try:
+        ok = bulk_update_chunks([{"id": ch["id"], "official_url": ch["new"]} for ch in changes])
+    except SupabaseBulkError as e:
+        print(f"[ERR] Bulk update failed: {e}")
+        return
 
     print("=" * 50)
-    print(f"[OK] Success: {ok}/{len(rules_chunks)}")
-    if errors:
-        print(f"[ERR] Errors: {errors}")
+    print(f"[OK] Success: {ok}/{len(changes)}")
 
 
 def preview(chunks):
@@ -115,6 +103,11 @@ def preview(chunks):
 
 
 if __name__ == "__main__":
-    chunks = update_json_file()
+    parser = argparse.ArgumentParser(description="Anchor URLs for Pravila chunks")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print diff only, do not write JSON or Supabase")
+    args = parser.parse_args()
+
+    chunks = update_json_file(write=not args.dry_run)
     preview(chunks)
-    update_supabase(chunks)
+    update_supabase(chunks, dry_run=args.dry_run)
@@ -0,0 +1,152 @@
+"""
+webhook.py — Приём обновлений Telegram через webhook вместо long polling.
+
+В polling-режиме поток обновлений принадлежит одному процессу, а при rolling
+restart два процесса конфликтуют (telegram.error.Conflict). В webhook-режиме
+Telegram сам присылает обновления POST-запросом, поэтому несколько реплик за
+балансировщиком делят нагрузку, а перезапуск не вызывает конфликтов.
+
+Эндпоинты встроенного сервера (async_http.py):
+    POST {WEBHOOK_PATH} — обновление от Telegram; проверяется заголовок
+                          X-Telegram-Bot-Api-Secret-Token
+    GET  /healthz       — процесс жив
+    GET  /readyz        — реплика готова принимать трафик (503 при остановке
+                          или переполненной очереди обновлений)
+    + дополнительные маршруты routes (bot.py добавляет GET /metrics, если задан METRICS_TOKEN)
+
+Переменные окружения (.env):
+    WEBHOOK_URL           — публичный адрес сервиса, например https://bot.example.com
+    WEBHOOK_PATH          — путь для обновлений (по умолчанию /telegram)
+    WEBHOOK_SECRET        — секрет для X-Telegram-Bot-Api-Secret-Token (1–256 символов A-Z a-z 0-9 _ -)
+    PORT                  — порт сервера (Railway задаёт сам; по умолчанию 8080)
+    WEBHOOK_MAX_BACKLOG   — при такой длине очереди /readyz отвечает 503 (по умолчанию 100)
+"""
+
+import asyncio
+import hmac
+import logging
+import os
+import re
+import signal
+
+from telegram import Update
+from telegram.ext import Application
+
+from async_http import HttpServer, Request, Response
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+_SECRET_RE = re.compile(r"^[A-Za-z0-9_-]{1,256}$")
+
+
+class WebhookServer:
+    """Встроенный HTTP-сервер: кладёт обновления Telegram в app.update_queue."""
+
+    def __init__(self, app: Application, url: str, secret: str,
+                 path: str = "/telegram", host: str = "0.0.0.0", port: int = 8080,
+                 max_backlog: int = 100, routes: dict | None = None):
+        if not _SECRET_RE.match(secret or ""):
+            raise ValueError("WEBHOOK_SECRET: 1–256 символов из A-Z, a-z, 0-9, _ и -")
+        if not path.startswith("/"):
+            path = "/" + path
+        self.app = app
+        self.url = url.rstrip("/") + path
+        self.path = path
+        self.secret = secret
+        self.max_backlog = max_backlog
+        self._stopping = False
+        self._ready = False
+        self.http = HttpServer(
+            {
+                ("POST", path): self.handle_update,
+                ("GET", "/healthz"): self.healthz,
+                ("GET", "/readyz"): self.readyz,
+                **(routes or {}),
+            },
+            host=host,
+            port=port,
+        )
+
+    # ─── Эндпоинты ────────────────────────────────────────────────────────────
+
+    async def handle_update(self, request: Request) -> Response:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token.encode(), self.secret.encode()):
+            logger.warning(f"[webhook] Неверный secret token от {request.remote}")
+            return Response(403, b"Forbidden")
+        if self._stopping:
+            # Telegram повторит доставку — её примет другая реплика
+            return Response(503, b"Shutting down")
+        try:
+            update = Update.de_json(request.json(), self.app.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"[webhook] Некорректное обновление: {e}")
+            return Response(400, b"Bad Request")
+        await self.app.update_queue.put(update)
+        return Response(200, b"")
+
+    async def healthz(self, request: Request) -> Response:
+        return Response.text("ok")
+
+    async def readyz(self, request: Request) -> Response:
+        backlog = self.app.update_queue.qsize()
+        ready = self._ready and not self._stopping and self.app.running and backlog < self.max_backlog
+        return Response.json({"ready": ready, "backlog": backlog}, 200 if ready else 503)
+
+    # ─── Жизненный цикл ───────────────────────────────────────────────────────
+
+    async def run(self, allowed_updates=Update.ALL_TYPES) -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows
+
+        await self.app.initialize()
+        if self.app.post_init:
+            await self.app.post_init(self.app)
+        await self.app.start()
+        await self.http.start()
+        await self.app.bot.set_webhook(
+            url=self.url,
+            secret_token=self.secret,
+            allowed_updates=allowed_updates,
+        )
+        self._ready = True
+        logger.info(f"[webhook] Бот запущен (webhook): {self.url}")
+
+        try:
+            await stop.wait()
+        finally:
+            # Сначала перестаём считаться готовыми, затем дорабатываем очередь.
+            # delete_webhook не вызываем: остальные реплики продолжают работу.
+            self._stopping = True
+            await self.http.stop()
+            await self.app.stop()
+            if self.app.post_stop:
+                await self.app.post_stop(self.app)
+            await self.app.shutdown()
+            if self.app.post_shutdown:
+                await self.app.post_shutdown(self.app)
+            logger.info("[webhook] Остановлен")
+
+
+def run_webhook(app: Application, allowed_updates=Update.ALL_TYPES,
+                routes: dict | None = None) -> None:
+    """Запуск webhook-режима с настройками из переменных окружения."""
+    url = os.getenv("WEBHOOK_URL")
+    if not url:
+        raise ValueError("WEBHOOK_URL не задан в .env (нужен для BOT_MODE=webhook)")
+    server = WebhookServer(
+        app,
+        url=url,
+        secret=os.getenv("WEBHOOK_SECRET", ""),
+        path=os.getenv("WEBHOOK_PATH", "/telegram"),
+        port=int(os.getenv("PORT", "8080")),
+        max_backlog=int(os.getenv("WEBHOOK_MAX_BACKLOG", "100")),
+        routes=routes,
+    )
+    asyncio.get_event_loop().run_until_complete(server.run(allowed_updates))